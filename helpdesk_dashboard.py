@@ -1,21 +1,83 @@
+from __future__ import annotations
+
+import argparse
+import importlib
 import os
+import sys
 import socket
 import platform
 import subprocess
 import shutil
-import tkinter as tk
-from tkinter import ttk, messagebox
+import signal
+import queue
+import threading
 from pathlib import Path
+from array import array
+from collections import Counter, deque, namedtuple
+from contextlib import contextmanager
+import csv
 import datetime
+import hashlib
+import heapq
+import io
+import json
+import math
+import mmap
+import re
+import stat
+import struct
+import tempfile
+import time
+import weakref
+import zlib
 
 # =============================
 #   DEPENDENCY
 # =============================
 
-try:
-    import psutil
-except ImportError:
-    psutil = None
+class _LazyModule:
+    """
+    Stand-in for an optional module that is imported on first use.
+    Truthiness tells whether the import worked, so `if psutil:` keeps working.
+    """
+
+    def __init__(self, name: str):
+        self._name = name
+        self._module = None
+        self._tried = False
+
+    def _load(self):
+        if not self._tried:
+            self._tried = True
+            try:
+                self._module = importlib.import_module(self._name)
+            except ImportError:
+                self._module = None
+        return self._module
+
+    def __bool__(self):
+        return self._load() is not None
+
+    def __getattr__(self, attr):
+        module = self._load()
+        if module is None:
+            raise AttributeError(f"{self._name} is not installed")
+        return getattr(module, attr)
+
+
+# psutil is only imported when a collector first needs it, and tkinter only
+# when the GUI starts, so headless runs (see main) stay fast and never touch Tk.
+psutil = _LazyModule("psutil")
+
+tk = ttk = messagebox = None
+
+
+def _load_tk():
+    global tk, ttk, messagebox
+    if tk is None:
+        import tkinter
+        from tkinter import ttk as _ttk, messagebox as _messagebox
+        tk, ttk, messagebox = tkinter, _ttk, _messagebox
 
 
 # =============================
@@ -23,531 +85,5845 @@ except ImportError:
 # =============================
 
 def show_info(title: str, text: str):
+    _load_tk()
     messagebox.showinfo(title, text)
 
 
 def show_error(title: str, text: str):
+    _load_tk()
     messagebox.showerror(title, text)
 
 
+# =============================
+#   COMMAND RUNNER
+# =============================
+
+# A str runs through the shell; a list runs the program directly.
+CommandResult = namedtuple("CommandResult", ["returncode", "stdout", "stderr"])
+
+
+class SubprocessRunner:
+    """Default backend: real child processes."""
+
+    def run(self, cmd, encoding: str = None, timeout: float = None) -> CommandResult:
+        """Run to completion and capture stdout/stderr as text. Raises TimeoutExpired."""
+        proc = subprocess.run(
+            cmd,
+            capture_output=True,
+            text=True,
+            encoding=encoding,
+            errors="ignore",
+            timeout=timeout,
+            shell=isinstance(cmd, str)
+        )
+        return CommandResult(proc.returncode, proc.stdout or "", proc.stderr or "")
+
+    async def run_async(self, cmd: list, encoding: str = None,
+                        timeout: float = None) -> CommandResult:
+        """
+        run() for asyncio code: the child is awaited on the event loop instead
+        of tying up a thread, so many can run at once. `cmd` must be a list.
+        Raises TimeoutExpired after killing the child.
+        """
+        import asyncio
+        flags = {}
+        if sys.platform == "win32":
+            flags["creationflags"] = getattr(subprocess, "CREATE_NO_WINDOW", 0)
+        proc = await asyncio.create_subprocess_exec(
+            *cmd, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE, **flags
+        )
+        try:
+            out, err = await asyncio.wait_for(proc.communicate(), timeout)
+        except asyncio.TimeoutError:
+            proc.kill()
+            await proc.wait()
+            raise subprocess.TimeoutExpired(cmd, timeout) from None
+        encoding = encoding or "utf-8"
+        return CommandResult(proc.returncode, out.decode(encoding, "ignore"),
+                             err.decode(encoding, "ignore"))
+
+    def open(self, cmd):
+        """Start the command; the result has a binary .stdout (stderr merged in) and .wait()."""
+        return subprocess.Popen(
+            cmd,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT,
+            shell=isinstance(cmd, str),
+            # Own process group on POSIX so kill_tree can take the whole group down.
+            start_new_session=(os.name != "nt")
+        )
+
+    def kill_tree(self, proc):
+        """
+        Kill a command started by open() together with everything it spawned;
+        with shell=True the real tool is a grandchild that proc.kill() misses.
+        """
+        if proc.poll() is not None:
+            return
+        if psutil:
+            try:
+                parent = psutil.Process(proc.pid)
+                for child in parent.children(recursive=True):
+                    try:
+                        child.kill()
+                    except psutil.Error:
+                        pass
+            except psutil.Error:
+                pass
+        elif os.name == "nt":
+            subprocess.run(["taskkill", "/F", "/T", "/PID", str(proc.pid)],
+                           capture_output=True)
+        else:
+            try:
+                os.killpg(proc.pid, signal.SIGKILL)
+            except OSError:
+                pass
+        try:
+            proc.kill()
+        except OSError:
+            pass
+
+
+# One recorded command for ReplayRunner. `size` (bytes) repeats or truncates
+# `output`; `latency` (seconds) is spread across the reads.
+Replay = namedtuple("Replay", ["output", "latency", "size", "returncode"],
+                    defaults=(b"", None, None, 0))
+
+
+class _ReplayStream:
+    def __init__(self, output: bytes, size: int, latency: float):
+        self._output = output
+        self._size = len(output) if size is None else size
+        self._pos = 0
+        self._latency = latency or 0.0
+        self.killed = False
+
+    def read(self, n: int = -1) -> bytes:
+        remaining = self._size - self._pos
+        if remaining <= 0 or not self._output or self.killed:
+            return b""
+        n = remaining if n is None or n < 0 else min(n, remaining)
+        if self._latency:
+            time.sleep(self._latency * n / self._size)
+        start = self._pos % len(self._output)
+        chunk = self._output[start:start + n]
+        while len(chunk) < n:
+            chunk += self._output[:n - len(chunk)]
+        self._pos += n
+        return chunk
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class _ReplayProcess:
+    def __init__(self, replay: Replay, latency: float):
+        self.returncode = None
+        self._returncode = replay.returncode
+        self.stdout = _ReplayStream(replay.output, replay.size, latency)
+
+    def wait(self, timeout=None) -> int:
+        self.returncode = self._returncode
+        return self.returncode
+
+    def poll(self):
+        return self.returncode
+
+    def kill(self):
+        self.stdout.killed = True
+        self._returncode = -9
+
+
+class ReplayRunner:
+    """
+    Serves recorded outputs instead of running anything, so the collection
+    pipeline can be exercised and benchmarked off Windows.
+
+    `recordings` maps a command (or any substring of it) to bytes or a
+    Replay. The first exact match wins, then the first key contained in the
+    command; unmatched commands get `default`. `latency` and `size` apply
+    to every Replay that does not set its own.
+    """
+
+    def __init__(self, recordings: dict = None, latency: float = 0.0, size: int = None,
+                 default=b""):
+        self.recordings = recordings or {}
+        self.latency = latency
+        self.size = size
+        self.default = default
+        self.calls = []
+        self._lock = threading.Lock()
+
+    def _lookup(self, cmd) -> Replay:
+        key = cmd if isinstance(cmd, str) else subprocess.list2cmdline(cmd)
+        with self._lock:
+            self.calls.append(key)
+        found = self.recordings.get(key)
+        if found is None:
+            found = next((v for k, v in self.recordings.items() if k in key), self.default)
+        if not isinstance(found, Replay):
+            found = Replay(found)
+        if found.size is None and self.size is not None:
+            found = found._replace(size=self.size)
+        if found.latency is None:
+            found = found._replace(latency=self.latency)
+        return found
+
+    def run(self, cmd, encoding: str = None, timeout: float = None) -> CommandResult:
+        replay = self._lookup(cmd)
+        proc = _ReplayProcess(replay, replay.latency)
+        out = proc.stdout.read()
+        return CommandResult(proc.wait(), out.decode(encoding or "utf-8", "ignore"), "")
+
+    async def run_async(self, cmd, encoding: str = None, timeout: float = None) -> CommandResult:
+        import asyncio
+        return await asyncio.to_thread(self.run, cmd, encoding, timeout)
+
+    def open(self, cmd):
+        replay = self._lookup(cmd)
+        return _ReplayProcess(replay, replay.latency)
+
+    def kill_tree(self, proc):
+        proc.kill()
+
+
+COMMAND_RUNNER = SubprocessRunner()
+
+
+def set_command_runner(runner):
+    """
+    Swap the backend every collector goes through; returns the previous one.
+    A backend provides run(), run_async() (used by the ICMP latency probe),
+    open() and kill_tree(), like SubprocessRunner.
+    """
+    global COMMAND_RUNNER
+    previous = COMMAND_RUNNER
+    COMMAND_RUNNER = runner
+    return previous
+
+
 # =============================
 #   TEMPERATURE
 # =============================
 
-def get_temperature_str() -> str:
-    """Try to read CPU temp via psutil. If not available -> N/A."""
-    if not psutil:
-        return "N/A"
+# Sensor names tried first, in order; otherwise the first sensor found is used.
+TEMP_PREFERRED = ("cpu-thermal", "cpu_thermal", "coretemp", "acpitz")
+# Re-run discovery this often even if reads keep working (sensors can appear late).
+TEMP_REDISCOVER_SECONDS = 300.0
+# Without a per-sensor file (non-Linux psutil), cache the full-scan value this long.
+TEMP_SCAN_TTL = 10.0
+SYSFS_CLASS = Path("/sys/class")
+
+
+def _read_millidegrees(path: Path) -> float:
+    with open(path, "rb") as f:
+        return int(f.read()) / 1000.0
+
+
+class TemperatureMonitor:
+    """
+    Finds the preferred CPU sensor once and then reads only that sensor.
+
+    On Linux the sensor is a single sysfs file (hwmon tempN_input or a
+    thermal zone), so a tick costs one small read instead of the full
+    psutil.sensors_temperatures() walk over every chip. Elsewhere the full
+    scan is the only API, so its result is cached for TEMP_SCAN_TTL.
+    A failed read or TEMP_REDISCOVER_SECONDS triggers discovery again.
+    """
+
+    def __init__(self, sysfs: Path = SYSFS_CLASS,
+                 rediscover_seconds: float = TEMP_REDISCOVER_SECONDS):
+        self.sysfs = sysfs
+        self.rediscover_seconds = rediscover_seconds
+        self.source = None  # human-readable description of the chosen sensor
+        self._reader = None
+        self._discovered_at = None
+        self._lock = threading.Lock()
+
+    def _sysfs_candidates(self):
+        """(name, path) of the first temp input of every hwmon chip, then thermal zones."""
+        found = []
+        for chip in sorted((self.sysfs / "hwmon").glob("hwmon*")):
+            try:
+                name = (chip / "name").read_text().strip()
+            except OSError:
+                continue
+            inputs = sorted(chip.glob("temp*_input"),
+                            key=lambda p: int(re.sub(r"\D", "", p.name) or 0))
+            if inputs:
+                found.append((name, inputs[0]))
+        for zone in sorted((self.sysfs / "thermal").glob("thermal_zone*")):
+            try:
+                name = (zone / "type").read_text().strip()
+            except OSError:
+                continue
+            found.append((name, zone / "temp"))
+        return found
+
+    def discover(self):
+        with self._lock:
+            self._discovered_at = time.monotonic()
+            self._reader = None
+            self.source = None
+
+            candidates = self._sysfs_candidates()
+            if candidates:
+                by_name = {}
+                for name, path in candidates:
+                    by_name.setdefault(name, path)
+                name = next((k for k in TEMP_PREFERRED if k in by_name), candidates[0][0])
+                path = by_name[name]
+                self._reader = lambda: _read_millidegrees(path)
+                self.source = f"{name} ({path})"
+                return
+
+            if not psutil or not hasattr(psutil, "sensors_temperatures"):
+                return
+            try:
+                temps = psutil.sensors_temperatures()
+            except Exception:
+                return
+            key = next((k for k in TEMP_PREFERRED if temps.get(k)), None)
+            if key is None:
+                key = next((k for k, entries in temps.items() if entries), None)
+            if key is None:
+                return
+
+            cache = {"at": time.monotonic(), "value": temps[key][0].current}
+
+            def read_scan():
+                if time.monotonic() - cache["at"] >= TEMP_SCAN_TTL:
+                    cache["value"] = psutil.sensors_temperatures()[key][0].current
+                    cache["at"] = time.monotonic()
+                return cache["value"]
+
+            self._reader = read_scan
+            self.source = f"{key} (psutil)"
+
+    def read(self):
+        """Current temperature of the chosen sensor in °C, or None."""
+        if (self._discovered_at is None
+                or time.monotonic() - self._discovered_at >= self.rediscover_seconds):
+            self.discover()
+        for attempt in (0, 1):
+            reader = self._reader
+            if reader is None:
+                return None
+            try:
+                return reader()
+            except Exception:
+                if attempt == 0:
+                    self.discover()
+        return None
+
+    def all_sensors(self) -> dict:
+        """
+        Every temperature sensor (per-core, NVMe, GPU, ...) as
+        {chip: [{"label", "current", "high", "critical"}]}. Full scan; call on demand only.
+        """
+        sensors = {}
+        for chip in sorted((self.sysfs / "hwmon").glob("hwmon*")):
+            try:
+                name = (chip / "name").read_text().strip()
+            except OSError:
+                continue
+            for inp in sorted(chip.glob("temp*_input")):
+                prefix = inp.name[:-len("_input")]
+
+                def opt(suffix, prefix=prefix, chip=chip):
+                    try:
+                        return _read_millidegrees(chip / f"{prefix}_{suffix}")
+                    except (OSError, ValueError):
+                        return None
+
+                try:
+                    label = (chip / f"{prefix}_label").read_text().strip()
+                except OSError:
+                    label = prefix
+                try:
+                    current = _read_millidegrees(inp)
+                except (OSError, ValueError):
+                    continue
+                sensors.setdefault(name, []).append({
+                    "label": label, "current": current,
+                    "high": opt("max"), "critical": opt("crit"),
+                })
+        if sensors:
+            return sensors
+
+        if psutil and hasattr(psutil, "sensors_temperatures"):
+            try:
+                for name, entries in psutil.sensors_temperatures().items():
+                    sensors[name] = [
+                        {"label": e.label or name, "current": e.current,
+                         "high": e.high, "critical": e.critical}
+                        for e in entries
+                    ]
+            except Exception:
+                pass
+        return sensors
+
+
+TEMPERATURE = TemperatureMonitor()
+
+
+def get_temperature_c():
+    """CPU temperature (°C) from the cached sensor. If not available -> None."""
+    return TEMPERATURE.read()
+
+
+def show_all_temperatures():
     try:
-        temps = psutil.sensors_temperatures()
-        if not temps:
-            return "N/A"
+        sensors = TEMPERATURE.all_sensors()
+        if not sensors:
+            show_error("Temperatures", "No temperature sensors found.")
+            return
+        lines = []
+        for chip, entries in sensors.items():
+            lines.append(f"{chip}:")
+            for e in entries:
+                lines.append(f"  {e['label']}: {format_temperature(e['current'])}")
+        show_info("Temperatures", "\n".join(lines))
+    except Exception as e:
+        show_error("Temperatures Error", str(e))
 
-        for key in ("cpu-thermal", "cpu_thermal", "coretemp", "acpitz"):
-            if key in temps and temps[key]:
-                return f"{temps[key][0].current:.1f}°C"
 
-        for entries in temps.values():
-            if entries:
-                return f"{entries[0].current:.1f}°C"
-    except Exception:
-        pass
-    return "N/A"
+def format_temperature(temp_c) -> str:
+    return "N/A" if temp_c is None else f"{temp_c:.1f}°C"
+
+
+def get_temperature_str() -> str:
+    """Try to read CPU temp via psutil. If not available -> N/A."""
+    return format_temperature(get_temperature_c())
 
 
 # =============================
 #   SYSTEM / NETWORK INFO
 # =============================
 
-def get_system_info():
+def system_info_data() -> dict:
+    info = {
+        "os": f"{platform.system()} {platform.release()}",
+        "version": platform.version(),
+        "computer_name": platform.node(),
+        "user": None,
+        "cpu": platform.processor() or "N/A",
+        "ram_total_gb": None,
+    }
     try:
-        if psutil:
-            ram_gb = round(psutil.virtual_memory().total / (1024 ** 3), 2)
-        else:
-            ram_gb = "N/A"
+        info["user"] = os.getlogin()
+    except Exception:
+        pass
+    if psutil:
+        info["ram_total_gb"] = round(psutil.virtual_memory().total / (1024 ** 3), 2)
+    return info
+
 
+def get_system_info():
+    try:
+        info = system_info_data()
         lines = [
-            f"OS: {platform.system()} {platform.release()}",
-            f"Version: {platform.version()}",
-            f"Computer Name: {platform.node()}",
+            f"OS: {info['os']}",
+            f"Version: {info['version']}",
+            f"Computer Name: {info['computer_name']}",
         ]
-        try:
-            lines.append(f"User: {os.getlogin()}")
-        except Exception:
-            pass
-        lines.append(f"CPU: {platform.processor() or 'N/A'}")
-        if isinstance(ram_gb, (int, float)):
-            lines.append(f"RAM: {ram_gb} GB (total)")
+        if info["user"]:
+            lines.append(f"User: {info['user']}")
+        lines.append(f"CPU: {info['cpu']}")
+        if info["ram_total_gb"] is not None:
+            lines.append(f"RAM: {info['ram_total_gb']} GB (total)")
         else:
-            lines.append(f"RAM: {ram_gb}")
+            lines.append("RAM: N/A")
 
         show_info("System Info", "\n".join(lines))
     except Exception as e:
         show_error("System Info Error", str(e))
 
 
-def get_network_info():
-    """Parse ipconfig /all to show IP, mask, gateway, DNS, MAC."""
+# Full refresh at least this often; the cheaper interface fingerprint
+# (names, up/down, addresses) is checked more often and forces a refresh
+# as soon as an adapter changes.
+NETWORK_TTL = 300.0
+NETWORK_CHECK_SECONDS = 5.0
+PROC_NET_ROUTE = Path("/proc/net/route")
+RESOLV_CONF = Path("/etc/resolv.conf")
+
+# gateway/dns are lists; ip/mask are the first IPv4 address of the adapter.
+Adapter = namedtuple(
+    "Adapter",
+    ["name", "ip", "mask", "ipv6", "gateway", "dns", "mac", "is_up", "speed_mb"],
+    defaults=((), (), (), "N/A", None, None)
+)
+NetworkSnapshot = namedtuple(
+    "NetworkSnapshot", ["hostname", "ip", "adapters", "source", "ipconfig", "taken_at"]
+)
+
+_IPCONFIG_FIELD_RE = re.compile(r"^\s+([^.:]+?)[ .]*:\s?(.*)$")
+
+
+def parse_ipconfig(text: str) -> list:
+    """
+    Split `ipconfig /all` output into one Adapter per "... adapter X:" block.
+    Multi-valued fields (gateways, DNS servers) continue on deeper-indented lines.
+    """
+    adapters = []
+    block = None
+    key = None
+
+    def finish():
+        if block is not None and block["name"]:
+            ipv4 = block["ipv4"]
+            adapters.append(Adapter(
+                name=block["name"],
+                ip=ipv4[0] if ipv4 else "N/A",
+                mask=block["mask"][0] if block["mask"] else "N/A",
+                ipv6=tuple(block["ipv6"]),
+                gateway=tuple(block["gateway"]),
+                dns=tuple(block["dns"]),
+                mac=block["mac"] or "N/A",
+                is_up=not block["disconnected"],
+            ))
+
+    for line in text.splitlines():
+        if not line.strip():
+            continue
+        if not line[0].isspace():
+            finish()
+            block = None
+            key = None
+            header = line.strip().rstrip(":")
+            if " adapter " in header:
+                block = {"name": header.split(" adapter ", 1)[1], "ipv4": [], "mask": [],
+                         "ipv6": [], "gateway": [], "dns": [], "mac": "",
+                         "disconnected": False}
+            continue
+        if block is None:
+            continue
+
+        indent = len(line) - len(line.lstrip())
+        m = None if indent > 10 else _IPCONFIG_FIELD_RE.match(line)
+        if m:
+            key, value = m.group(1).strip(), m.group(2).strip()
+        elif key:
+            value = line.strip()
+        else:
+            continue
+        value = re.sub(r"\((Preferred|Deprecated|Tentative)\)$", "", value)
+        if not value:
+            continue
+
+        if key in ("IPv4 Address", "IP Address"):
+            block["ipv4"].append(value)
+        elif key == "Subnet Mask":
+            block["mask"].append(value)
+        elif key in ("IPv6 Address", "Link-local IPv6 Address", "Temporary IPv6 Address"):
+            block["ipv6"].append(value.split("%")[0])
+        elif key == "Default Gateway":
+            block["gateway"].append(value)
+        elif key == "DNS Servers":
+            block["dns"].append(value)
+        elif key == "Physical Address":
+            block["mac"] = value
+        elif key == "Media State" and "disconnected" in value.lower():
+            block["disconnected"] = True
+    finish()
+    return adapters
+
+
+def _linux_gateways() -> dict:
+    """{interface: (gateway,)} for default routes in /proc/net/route."""
+    gateways = {}
     try:
-        hostname = socket.gethostname()
+        with open(PROC_NET_ROUTE) as f:
+            next(f, None)
+            for line in f:
+                fields = line.split()
+                if len(fields) > 2 and fields[1] == "00000000":
+                    gw = socket.inet_ntoa(struct.pack("<I", int(fields[2], 16)))
+                    gateways.setdefault(fields[0], ())
+                    gateways[fields[0]] += (gw,)
+    except (OSError, ValueError):
+        pass
+    return gateways
+
+
+def _resolv_conf_dns() -> tuple:
+    try:
+        with open(RESOLV_CONF) as f:
+            return tuple(line.split()[1] for line in f
+                         if line.startswith("nameserver") and len(line.split()) > 1)
+    except OSError:
+        return ()
+
+
+def _route_source_ip():
+    """Local address the OS would use for outbound traffic. Sends nothing."""
+    s = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    try:
+        s.connect(("8.8.8.8", 80))
+        return s.getsockname()[0]
+    except OSError:
+        return None
+    finally:
+        s.close()
+
+
+class NetworkIdentity:
+    """
+    One cached view of hostname, primary IP and every adapter, shared by the
+    live stats, the Network Info popup and the diagnostic report.
+
+    Adapters come from psutil.net_if_addrs()/net_if_stats(). psutil has no
+    gateway/DNS API, so those come from /proc/net/route and resolv.conf on
+    Linux and from a single `ipconfig /all` on Windows (which is also the
+    whole source when psutil is missing). The primary IP is the source
+    address of the default route, so no DNS lookup is ever made.
+    """
+
+    def __init__(self, ttl: float = NETWORK_TTL, check_seconds: float = NETWORK_CHECK_SECONDS,
+                 runner=None):
+        self.ttl = ttl
+        self.check_seconds = check_seconds
+        self.runner = runner
+        self._snapshot = None
+        self._fingerprint = None
+        self._checked_at = None
+        self._lock = threading.Lock()
+
+    def invalidate(self):
+        self._snapshot = None
+
+    def _interface_fingerprint(self):
+        if not psutil:
+            return None
+        try:
+            addrs = psutil.net_if_addrs()
+            stats = psutil.net_if_stats()
+        except Exception:
+            return None
+        return tuple(sorted(
+            (name, getattr(stats.get(name), "isup", None),
+             tuple(sorted(a.address for a in entries)))
+            for name, entries in addrs.items()
+        ))
+
+    def _ipconfig(self) -> str:
+        runner = self.runner or COMMAND_RUNNER
         try:
-            ip = socket.gethostbyname(hostname)
+            return runner.run(["ipconfig", "/all"], encoding="utf-8").stdout or ""
         except Exception:
-            ip = "N/A"
+            return ""
 
-        proc = subprocess.run(
-            ["ipconfig", "/all"],
-            capture_output=True,
-            text=True,
-            encoding="utf-8",
-            errors="ignore"
+    def _collect(self) -> NetworkSnapshot:
+        hostname = socket.gethostname()
+        ipconfig = None
+        adapters = []
+        source = "psutil"
+
+        if psutil:
+            addrs = psutil.net_if_addrs()
+            stats = psutil.net_if_stats()
+            if sys.platform == "win32":
+                ipconfig = self._ipconfig()
+                extra = {a.name: a for a in parse_ipconfig(ipconfig)}
+                gateways = {name: a.gateway for name, a in extra.items()}
+                dns = {name: a.dns for name, a in extra.items()}
+                default_dns = ()
+            else:
+                gateways = _linux_gateways()
+                dns = {}
+                default_dns = _resolv_conf_dns()
+
+            link = getattr(psutil, "AF_LINK", None)
+            for name, entries in addrs.items():
+                ipv4 = [a for a in entries if a.family == socket.AF_INET]
+                ipv6 = tuple(a.address.split("%")[0] for a in entries
+                             if a.family == getattr(socket, "AF_INET6", None))
+                mac = next((a.address for a in entries if a.family == link), None)
+                st = stats.get(name)
+                adapters.append(Adapter(
+                    name=name,
+                    ip=ipv4[0].address if ipv4 else "N/A",
+                    mask=(ipv4[0].netmask or "N/A") if ipv4 else "N/A",
+                    ipv6=ipv6,
+                    gateway=gateways.get(name, ()),
+                    dns=dns.get(name, default_dns),
+                    mac=mac.upper().replace(":", "-") if mac else "N/A",
+                    is_up=st.isup if st else None,
+                    speed_mb=st.speed if st and st.speed else None,
+                ))
+        else:
+            source = "ipconfig"
+            ipconfig = self._ipconfig()
+            adapters = parse_ipconfig(ipconfig)
+
+        ip = _route_source_ip()
+        if not ip:
+            ranked = sorted(
+                (a for a in adapters if a.ip != "N/A" and not a.ip.startswith("127.")),
+                key=lambda a: (not a.gateway, a.is_up is False),
+            )
+            ip = ranked[0].ip if ranked else "N/A"
+
+        return NetworkSnapshot(hostname, ip, tuple(adapters), source, ipconfig, time.time())
+
+    def snapshot(self) -> NetworkSnapshot:
+        """Cached snapshot; re-collected after `ttl` or when the interfaces change."""
+        now = time.monotonic()
+        snap = self._snapshot
+        if snap is not None and now - self._checked_at < self.check_seconds:
+            return snap
+        with self._lock:
+            snap = self._snapshot
+            now = time.monotonic()
+            if snap is not None and now - self._checked_at < self.check_seconds:
+                return snap
+            fingerprint = self._interface_fingerprint()
+            stale = (snap is None or fingerprint != self._fingerprint
+                     or time.time() - snap.taken_at >= self.ttl)
+            if stale:
+                snap = self._collect()
+                self._snapshot = snap
+                self._fingerprint = fingerprint
+            self._checked_at = now
+            return snap
+
+    def primary(self, snap: NetworkSnapshot = None) -> Adapter:
+        """Adapter that owns the primary IP (or an empty one)."""
+        snap = snap or self.snapshot()
+        return next((a for a in snap.adapters if a.ip == snap.ip), Adapter("N/A", snap.ip, "N/A"))
+
+
+NETWORK = NetworkIdentity()
+
+
+def network_info_data() -> dict:
+    """Primary adapter's IP, mask, gateway, DNS, MAC plus every adapter."""
+    snap = NETWORK.snapshot()
+    primary = NETWORK.primary(snap)
+    return {
+        "hostname": snap.hostname,
+        "ip": snap.ip,
+        "subnet_mask": primary.mask,
+        "gateway": ", ".join(primary.gateway) or "N/A",
+        "dns_server": ", ".join(primary.dns) or "N/A",
+        "mac": primary.mac,
+        "source": snap.source,
+        "adapters": [a._asdict() for a in snap.adapters],
+    }
+
+
+def _format_adapter(a: Adapter) -> list:
+    state = "" if a.is_up is None else (" (up)" if a.is_up else " (down)")
+    lines = [f"{a.name}{state}",
+             f"  IP Address: {a.ip}",
+             f"  Subnet Mask: {a.mask}"]
+    if a.ipv6:
+        lines.append(f"  IPv6: {', '.join(a.ipv6)}")
+    lines += [f"  Default Gateway: {', '.join(a.gateway) or 'N/A'}",
+              f"  DNS Servers: {', '.join(a.dns) or 'N/A'}",
+              f"  MAC Address: {a.mac}"]
+    if a.speed_mb:
+        lines.append(f"  Link Speed: {a.speed_mb} Mb/s")
+    return lines
+
+
+def network_info_text() -> str:
+    """Contents of Network_Info.txt: the shared snapshot, plus raw ipconfig if it was run."""
+    snap = NETWORK.snapshot()
+    out = [f"Hostname: {snap.hostname}", f"Primary IP: {snap.ip}",
+           f"Source: {snap.source}", ""]
+    for a in snap.adapters:
+        out += _format_adapter(a) + [""]
+    if snap.ipconfig:
+        out += ["----- ipconfig /all -----", snap.ipconfig]
+    return "\n".join(out) + "\n"
+
+
+def get_network_info():
+    """Show IP, mask, gateway, DNS, MAC for every adapter."""
+    try:
+        snap = NETWORK.snapshot()
+        out = [f"Hostname: {snap.hostname}", f"Primary IP: {snap.ip}", ""]
+        for a in snap.adapters:
+            if a.ip.startswith("127.") or a.name.lower().startswith(("lo", "loopback")):
+                continue
+            out += _format_adapter(a) + [""]
+        show_info("Network Info", "\n".join(out).rstrip())
+    except Exception as e:
+        show_error("Network Info Error", str(e))
+
+
+# =============================
+#   LATENCY PROBE
+# =============================
+
+# Extra targets ("host" or "host:port") probed after the gateway and DNS
+# servers of the primary adapter, e.g. internal file or domain servers.
+PROBE_TARGETS = ["8.8.8.8:443"]
+PROBE_MODE = "icmp"          # "icmp" (ping subprocess) or "tcp" (connect time)
+PROBE_COUNT = 4
+PROBE_INTERVAL = 0.5
+PROBE_TIMEOUT = 2.0
+# TCP ports used for the automatic targets in tcp mode.
+PROBE_GATEWAY_PORT = 80
+PROBE_DNS_PORT = 53
+PROBE_DEFAULT_PORT = 443
+
+ProbeTarget = namedtuple("ProbeTarget", ["label", "host", "port"])
+# One line of the live table; rtt_ms is the last reply (None = lost).
+# error is set when the target cannot be probed at all (e.g. no ping binary).
+ProbeStatus = namedtuple(
+    "ProbeStatus",
+    ["target", "sent", "received", "rtt_ms", "p50_ms", "p95_ms", "mode", "error"],
+    defaults=(None,)
+)
+
+_PING_TIME_RE = re.compile(r"time\s*[=<]\s*([\d.]+)\s*ms", re.IGNORECASE)
+
+
+def parse_probe_target(spec: str, label: str = None,
+                       default_port: int = PROBE_DEFAULT_PORT) -> ProbeTarget:
+    host, port = spec, default_port
+    if spec.count(":") == 1:
+        host, port = spec.rsplit(":", 1)
+        port = int(port)
+    elif spec.startswith("[") and "]:" in spec:
+        host, port = spec[1:].split("]:", 1)
+        port = int(port)
+    return ProbeTarget(label or spec, host, port)
+
+
+def default_probe_targets() -> list:
+    """Gateway(s), DNS servers of the primary adapter, then PROBE_TARGETS."""
+    targets = []
+    try:
+        primary = NETWORK.primary()
+        for gw in primary.gateway:
+            if ":" not in gw:
+                targets.append(ProbeTarget(f"Gateway {gw}", gw, PROBE_GATEWAY_PORT))
+        for dns in primary.dns:
+            if ":" not in dns:
+                targets.append(ProbeTarget(f"DNS {dns}", dns, PROBE_DNS_PORT))
+    except Exception:
+        pass
+    targets += [parse_probe_target(spec) for spec in PROBE_TARGETS]
+    seen = set()
+    return [t for t in targets if not ((t.host, t.port) in seen or seen.add((t.host, t.port)))]
+
+
+def _percentile(sorted_values, pct: float):
+    """Nearest-rank percentile of an already sorted list (None if empty)."""
+    if not sorted_values:
+        return None
+    rank = max(1, math.ceil(pct / 100 * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+async def _probe_tcp(target: ProbeTarget, timeout: float):
+    """Connect time in ms. A refused connection still proves the host answered."""
+    import asyncio
+    started = time.perf_counter()
+    try:
+        _, writer = await asyncio.wait_for(
+            asyncio.open_connection(target.host, target.port), timeout
         )
-        text = proc.stdout or ""
-        lines = text.splitlines()
-
-        subnet_mask = "N/A"
-        gateway = "N/A"
-        dns_server = "N/A"
-        mac = "N/A"
-
-        for line in lines:
-            l = line.strip()
-            if "Subnet Mask" in l and ":" in l:
-                subnet_mask = l.split(":", 1)[1].strip()
-            if "Default Gateway" in l and ":" in l:
-                gw = l.split(":", 1)[1].strip()
-                if gw:
-                    gateway = gw
-            if "DNS Servers" in l and ":" in l:
-                dns_server = l.split(":", 1)[1].strip()
-            if "Physical Address" in l and ":" in l:
-                mac = l.split(":", 1)[1].strip()
+    except ConnectionRefusedError:
+        return (time.perf_counter() - started) * 1000
+    except (OSError, asyncio.TimeoutError):
+        return None
+    rtt = (time.perf_counter() - started) * 1000
+    writer.close()
+    try:
+        await writer.wait_closed()
+    except OSError:
+        pass
+    return rtt
+
+
+async def _probe_icmp(target: ProbeTarget, timeout: float):
+    """One echo via the system ping; the RTT it prints, or wall time if it prints none."""
+    if sys.platform == "win32":
+        cmd = ["ping", "-n", "1", "-w", str(int(timeout * 1000)), target.host]
+    else:
+        cmd = ["ping", "-c", "1", "-W", str(max(1, math.ceil(timeout))), target.host]
+    started = time.perf_counter()
+    try:
+        result = await COMMAND_RUNNER.run_async(cmd, timeout=timeout + 1)
+    except subprocess.TimeoutExpired:
+        return None
+    if result.returncode != 0:
+        return None
+    m = _PING_TIME_RE.search(result.stdout)
+    # Windows answers "time<1ms" for sub-millisecond replies.
+    return float(m.group(1)) if m else (time.perf_counter() - started) * 1000
+
+
+async def _probe_one(target, mode, count, interval, timeout, on_status, cancel):
+    import asyncio
+    probe = _probe_tcp if mode == "tcp" else _probe_icmp
+    rtts = []
+    status = None
+    for sent in range(1, count + 1):
+        if cancel is not None and cancel.is_set():
+            break
+        started = time.monotonic()
+        try:
+            rtt = await probe(target, timeout)
+        except OSError as e:
+            # Counted as total loss for this target only; the others keep going.
+            status = ProbeStatus(target, sent, len(rtts), None, _percentile(rtts, 50),
+                                 _percentile(rtts, 95), mode, str(e))
+            on_status(status)
+            break
+        if rtt is not None:
+            rtts.append(rtt)
+            rtts.sort()
+        status = ProbeStatus(target, sent, len(rtts), rtt,
+                             _percentile(rtts, 50), _percentile(rtts, 95), mode)
+        on_status(status)
+        if sent < count:
+            await asyncio.sleep(max(0.0, interval - (time.monotonic() - started)))
+    return status
+
+
+async def probe_targets_async(targets, mode: str = PROBE_MODE, count: int = PROBE_COUNT,
+                              interval: float = PROBE_INTERVAL, timeout: float = PROBE_TIMEOUT,
+                              on_status=None, cancel: threading.Event = None) -> list:
+    """
+    Probe every target concurrently. `on_status(ProbeStatus)` is called after
+    each individual reply or loss, so results stream in as they arrive.
+    Returns the final ProbeStatus of each target in input order.
+    """
+    import asyncio
+    if mode not in ("icmp", "tcp"):
+        raise ValueError(f"unknown probe mode: {mode}")
+    on_status = on_status or (lambda status: None)
+    return await asyncio.gather(*(
+        _probe_one(t, mode, count, interval, timeout, on_status, cancel) for t in targets
+    ))
+
+
+def probe_targets(targets, **kwargs) -> list:
+    """Blocking wrapper around probe_targets_async() for threads and the CLI."""
+    import asyncio
+    return asyncio.run(probe_targets_async(targets, **kwargs))
+
+
+def format_probe_status(s: ProbeStatus) -> tuple:
+    """Table row: label, host, sent, loss %, last, p50, p95."""
+    def ms(v):
+        return "-" if v is None else f"{v:.1f} ms"
+    host = s.target.host if s.mode == "icmp" else f"{s.target.host}:{s.target.port}"
+    loss = 100.0 * (s.sent - s.received) / s.sent if s.sent else 0.0
+    last = "unavailable" if s.error else ("timeout" if s.rtt_ms is None else ms(s.rtt_ms))
+    return (s.target.label, host, s.sent, f"{loss:.0f}%", last, ms(s.p50_ms), ms(s.p95_ms))
+
+
+PROBE_COLUMNS = ("Target", "Host", "Sent", "Loss", "Last", "p50", "p95")
+
+
+def _pump_probe_events(window, tree, rows: dict, events: queue.Queue, cancel: threading.Event):
+    finished = False
+    while True:
+        try:
+            kind, payload = events.get_nowait()
+        except queue.Empty:
+            break
+        if kind == "status":
+            values = format_probe_status(payload)
+            key = (payload.target.host, payload.target.port)
+            if key in rows:
+                tree.item(rows[key], values=values)
+            else:
+                rows[key] = tree.insert("", "end", values=values)
+        elif kind == "done":
+            finished = True
+            window.title("Latency Probe (finished)")
+        elif kind == "error":
+            finished = True
+            show_error("Latency Probe Error", payload)
+    if not finished and window.winfo_exists():
+        window.after(100, _pump_probe_events, window, tree, rows, events, cancel)
+
+
+def show_latency_probe(targets=None):
+    """Open a window and fill it with live per-target results from a background probe."""
+    try:
+        _load_tk()
+        targets = targets or default_probe_targets()
+        window = tk.Toplevel()
+        window.title("Latency Probe")
+        tree = ttk.Treeview(window, columns=PROBE_COLUMNS, show="headings",
+                            height=max(3, len(targets)))
+        for col in PROBE_COLUMNS:
+            tree.heading(col, text=col)
+            tree.column(col, width=150 if col in ("Target", "Host") else 70, anchor="w")
+        tree.pack(fill="both", expand=True, padx=10, pady=10)
+
+        events = queue.Queue()
+        cancel = threading.Event()
+
+        def worker():
+            try:
+                probe_targets(targets, on_status=lambda s: events.put(("status", s)),
+                              cancel=cancel)
+                events.put(("done", None))
+            except Exception as e:
+                events.put(("error", str(e)))
+
+        def on_close():
+            cancel.set()
+            window.destroy()
+
+        window.protocol("WM_DELETE_WINDOW", on_close)
+        threading.Thread(target=worker, name="latency-probe", daemon=True).start()
+        _pump_probe_events(window, tree, {}, events, cancel)
+    except Exception as e:
+        show_error("Latency Probe Error", str(e))
+
 
+# =============================
+#   RAM HEALTH (POPUP)
+# =============================
+
+_RAM_STATUS_TEXT = {
+    "WARNING": "WARNING – High Memory Usage",
+    "CRITICAL": "CRITICAL – Memory Pressure",
+}
+
+
+def ram_health_data() -> dict:
+    """RAM totals and an OK / WARNING / CRITICAL status from the "ram" alert rules."""
+    vm = psutil.virtual_memory()
+    return {
+        "total_gb": round(vm.total / (1024 ** 3), 2),
+        "used_gb": round(vm.used / (1024 ** 3), 2),
+        "percent": vm.percent,
+        "status": threshold_status("ram", vm.percent),
+    }
+
+
+def check_ram_health():
+    try:
+        if not psutil:
+            show_error("RAM Health", "psutil is required.")
+            return
+
+        info = ram_health_data()
         out = [
-            f"Hostname: {hostname}",
-            f"IP Address: {ip}",
-            f"Subnet Mask: {subnet_mask}",
-            f"Default Gateway: {gateway}",
-            f"DNS Server: {dns_server}",
-            f"MAC Address: {mac}",
+            f"Total RAM: {info['total_gb']} GB",
+            f"Used RAM: {info['used_gb']} GB",
+            f"Usage: {info['percent']}%",
+            f"Status: {_RAM_STATUS_TEXT.get(info['status'], info['status'])}",
         ]
-        show_info("Network Info", "\n".join(out))
+        show_info("RAM Health", "\n".join(out))
     except Exception as e:
-        show_error("Network Info Error", str(e))
+        show_error("RAM Health Error", str(e))
+
 
+# =============================
+#   DISK INVENTORY / SMART STATUS
+# =============================
 
-def ping_google():
+# The inventory is cached this long for the popup and live view; a full
+# diagnostic invalidates it once so the report gets fresh data.
+DISK_INVENTORY_TTL = 300.0
+DISK_QUERY_TIMEOUT = 60
+
+# One PowerShell call for every field. Enums are converted to text here
+# because Windows PowerShell serializes them as numbers.
+DISK_CIM_SCRIPT = (
+    "$d = @(Get-CimInstance Win32_DiskDrive | Select-Object Index,Model,SerialNumber,Size,"
+    "FirmwareRevision,Status,InterfaceType,MediaType); "
+    "$p = @(Get-PhysicalDisk -ErrorAction SilentlyContinue | Select-Object DeviceId,"
+    "@{n='MediaType';e={\"$($_.MediaType)\"}},@{n='BusType';e={\"$($_.BusType)\"}},"
+    "@{n='HealthStatus';e={\"$($_.HealthStatus)\"}},"
+    "@{n='OperationalStatus';e={\"$($_.OperationalStatus)\"}}); "
+    "@{drives=$d; physical=$p} | ConvertTo-Json -Depth 3 -Compress"
+)
+DISK_CIM_COMMAND = ["powershell", "-NoProfile", "-NonInteractive", "-Command", DISK_CIM_SCRIPT]
+# /format:list prints Key=Value lines, so spaces in models or empty serials parse fine.
+DISK_WMIC_COMMAND = ("wmic diskdrive get Index,Model,SerialNumber,Size,FirmwareRevision,"
+                     "Status,InterfaceType,MediaType /format:list")
+
+# Text fields are "" when the source has no value; size is bytes or None.
+DiskRecord = namedtuple(
+    "DiskRecord",
+    ["index", "model", "serial", "size", "firmware", "status", "interface", "media_type",
+     "health", "operational"]
+)
+DiskInventorySnapshot = namedtuple(
+    "DiskInventorySnapshot", ["disks", "source", "raw", "taken_at", "error"]
+)
+
+
+def _text(value) -> str:
+    return "" if value is None else str(value).strip()
+
+
+def _int_or_none(value):
     try:
-        proc = subprocess.run(
-            ["ping", "8.8.8.8", "-n", "4"],
-            capture_output=True,
-            text=True,
-            shell=True
-        )
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def parse_disk_cim_json(text: str) -> list:
+    data = json.loads(text)
+    physical = {_int_or_none(p.get("DeviceId")): p for p in data.get("physical") or []}
+    disks = []
+    for d in data.get("drives") or []:
+        index = _int_or_none(d.get("Index"))
+        p = physical.get(index, {})
+        disks.append(DiskRecord(
+            index=index,
+            model=_text(d.get("Model")),
+            serial=_text(d.get("SerialNumber")),
+            size=_int_or_none(d.get("Size")),
+            firmware=_text(d.get("FirmwareRevision")),
+            status=_text(d.get("Status")),
+            interface=_text(p.get("BusType")) or _text(d.get("InterfaceType")),
+            media_type=_text(p.get("MediaType")) or _text(d.get("MediaType")),
+            health=_text(p.get("HealthStatus")),
+            operational=_text(p.get("OperationalStatus")),
+        ))
+    return sorted(disks, key=lambda r: (r.index is None, r.index))
+
+
+def parse_wmic_list(text: str) -> list:
+    """
+    `wmic ... /format:list` output -> one dict per instance. wmic ends lines
+    with \\r\\r\\n, which some decoders turn into an extra blank line after
+    every line, so an instance ends where the blank run is longer than the
+    one between its own lines, or where a key repeats.
+    """
+    entries, blank = [], 0
+    for line in text.replace("\r\r\n", "\n").splitlines():
+        key, sep, value = line.strip().partition("=")
+        if not sep:
+            blank += not line.strip()
+            continue
+        entries.append((blank, key.strip(), value.strip()))
+        blank = 0
+    gap = min((run for run, _, _ in entries[1:]), default=0)
+    blocks, current = [], {}
+    for run, key, value in entries:
+        if current and (key in current or run > gap):
+            blocks.append(current)
+            current = {}
+        current[key] = value
+    if current:
+        blocks.append(current)
+    return blocks
+
+
+def parse_disk_wmic(text: str) -> list:
+    disks = []
+    for d in parse_wmic_list(text):
+        disks.append(DiskRecord(
+            index=_int_or_none(d.get("Index")),
+            model=d.get("Model", ""),
+            serial=d.get("SerialNumber", ""),
+            size=_int_or_none(d.get("Size")),
+            firmware=d.get("FirmwareRevision", ""),
+            status=d.get("Status", ""),
+            interface=d.get("InterfaceType", ""),
+            media_type=d.get("MediaType", ""),
+            health="",
+            operational="",
+        ))
+    return sorted(disks, key=lambda r: (r.index is None, r.index))
+
+
+class DiskInventory:
+    """
+    Physical disk records from one CIM/PowerShell query (wmic as fallback),
+    cached so the SMART popup, the report files and any live view share
+    the same query. Concurrent callers wait for the one query in flight.
+    """
+
+    def __init__(self, ttl: float = DISK_INVENTORY_TTL, runner=None):
+        self.ttl = ttl
+        self.runner = runner
+        self._snapshot = None
+        self._lock = threading.Lock()
+
+    def invalidate(self):
+        self._snapshot = None
+
+    def _query(self) -> DiskInventorySnapshot:
+        runner = self.runner or COMMAND_RUNNER
+        errors = []
+        for source, cmd, parse in (("cim", DISK_CIM_COMMAND, parse_disk_cim_json),
+                                   ("wmic", DISK_WMIC_COMMAND, parse_disk_wmic)):
+            try:
+                result = runner.run(cmd, encoding="utf-8", timeout=DISK_QUERY_TIMEOUT)
+                disks = parse(result.stdout or "")
+            except Exception as e:
+                errors.append(f"{source}: {e}")
+                continue
+            if disks:
+                return DiskInventorySnapshot(tuple(disks), source, result.stdout, time.time(), None)
+            errors.append(f"{source}: no disks returned")
+        return DiskInventorySnapshot((), None, "", time.time(), "; ".join(errors))
+
+    def get(self) -> DiskInventorySnapshot:
+        snap = self._snapshot
+        if snap is not None and time.time() - snap.taken_at < self.ttl:
+            return snap
+        with self._lock:
+            snap = self._snapshot
+            if snap is None or time.time() - snap.taken_at >= self.ttl:
+                snap = self._query()
+                self._snapshot = snap
+            return snap
+
+
+DISKS = DiskInventory()
+
+
+def _or_na(value) -> str:
+    return value if value else "N/A"
+
+
+def format_disk_record(d: DiskRecord) -> list:
+    size = "N/A" if d.size is None else _format_bytes(d.size)
+    kind = " / ".join(v for v in (d.interface, d.media_type) if v) or "N/A"
+    lines = [f"Disk {'?' if d.index is None else d.index}: {_or_na(d.model)}",
+             f"  Serial: {_or_na(d.serial)}",
+             f"  Size: {size}",
+             f"  Type: {kind}",
+             f"  Firmware: {_or_na(d.firmware)}",
+             f"  Status: {_or_na(d.status)}"]
+    if d.health:
+        lines.append(f"  Health: {d.health}"
+                     + (f" ({d.operational})" if d.operational else ""))
+    return lines
+
+
+def check_smart_status():
+    try:
+        snap = DISKS.get()
+        if not snap.disks:
+            show_error("SMART Status", f"No SMART data found.\n{snap.error or ''}".strip())
+            return
+        lines = []
+        for d in snap.disks:
+            lines += format_disk_record(d) + [""]
+        show_info("SMART Status", "\n".join(lines).rstrip())
+    except Exception as e:
+        show_error("SMART Status Error", str(e))
+
+
+# =============================
+#   PROCESSES
+# =============================
+
+# Only these attributes are fetched per process; anything else (cmdline,
+# open files, ...) costs extra system calls on every sample.
+PROCESS_ATTRS = ["pid", "name", "username", "create_time", "cpu_times",
+                 "memory_info", "io_counters", "num_threads", "status"]
+PROCESS_SAMPLE_INTERVAL = 2.0
+# A report reuses the live table if it is younger than this; otherwise it
+# takes two samples this far apart so CPU% and rates are meaningful.
+PROCESS_REPORT_MAX_AGE = 10.0
+PROCESS_REPORT_SAMPLE_GAP = 1.0
+
+# cpu_percent is a share of the whole machine (0-100 across all cores);
+# rates are bytes/s since the previous sample, rss_delta is bytes.
+# The rate fields are None on a process's first sample or when access is denied.
+ProcessRow = namedtuple(
+    "ProcessRow",
+    ["pid", "name", "user", "status", "threads", "cpu_percent", "rss", "rss_delta",
+     "read_bps", "write_bps", "create_time"]
+)
+ProcessSnapshot = namedtuple("ProcessSnapshot", ["rows", "taken_at"])
+
+# Sort keys for top(); None sorts last.
+PROCESS_SORT_KEYS = {
+    "cpu": lambda r: r.cpu_percent if r.cpu_percent is not None else -1.0,
+    "ram": lambda r: r.rss if r.rss is not None else -1,
+    "io": lambda r: ((r.read_bps or 0) + (r.write_bps or 0)
+                     if r.read_bps is not None else -1.0),
+}
+
+
+class _Ticker:
+    """
+    Fixed-rate loop for a sampler thread. Ticks are due at start + k * interval,
+    so a slow tick does not push the later ones back; after a stall the missed
+    ticks are skipped rather than run in a burst. set_interval() and stop()
+    wake the loop at once. wall_s / cpu_s are the smoothed cost of one tick
+    (CPU is this thread's time only), late_s how late the last one started.
+    """
+
+    SMOOTHING = 0.2
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self.wall_s = None
+        self.cpu_s = None
+        self.late_s = 0.0
+        self._wake = threading.Event()
+
+    def set_interval(self, seconds: float):
+        if seconds != self.interval:
+            self.interval = seconds
+            self._wake.set()
+
+    def wake(self):
+        self._wake.set()
+
+    def run(self, stop: threading.Event, tick):
+        due = time.monotonic()
+        last = None
+        while not stop.is_set():
+            now = time.monotonic()
+            if now < due:
+                if self._wake.wait(due - now):
+                    self._wake.clear()
+                    if last is not None:
+                        due = last + self.interval
+                continue
+            self.late_s = now - due
+            cpu = time.thread_time()
+            try:
+                tick()
+            except Exception:
+                pass
+            last = now
+            wall = time.monotonic() - now
+            cpu = time.thread_time() - cpu
+            if self.wall_s is None:
+                self.wall_s, self.cpu_s = wall, cpu
+            else:
+                self.wall_s += self.SMOOTHING * (wall - self.wall_s)
+                self.cpu_s += self.SMOOTHING * (cpu - self.cpu_s)
+            due += self.interval
+            behind = time.monotonic() - due
+            if behind > 0:
+                due += math.ceil(behind / self.interval) * self.interval
+
+
+class ProcessTable:
+    """
+    Incremental process table. Each sample() walks psutil.process_iter()
+    once with PROCESS_ATTRS and turns the cumulative counters into rates
+    using the state kept from the previous sample (keyed by PID and start
+    time, so a reused PID starts fresh). Exited processes simply drop out.
+
+    `latest` is replaced by reference assignment, like StatsSampler.
+    """
+
+    def __init__(self, interval: float = PROCESS_SAMPLE_INTERVAL):
+        self.base_interval = interval
+        self.ticker = _Ticker(interval)
+        self.latest = None
+        self._state = {}
+        self._sampled_at = None
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self._cpus = None
+
+    def sample(self) -> ProcessSnapshot:
+        with self._lock:
+            if self._cpus is None:
+                self._cpus = psutil.cpu_count() or 1
+            now = time.monotonic()
+            dt = now - self._sampled_at if self._sampled_at is not None else None
+            prev = self._state
+            state = {}
+            rows = []
+            for proc in psutil.process_iter(PROCESS_ATTRS, ad_value=None):
+                info = proc.info
+                pid = info["pid"]
+                times, mem, io_ = info["cpu_times"], info["memory_info"], info["io_counters"]
+                cpu_total = times.user + times.system if times else None
+                rss = mem.rss if mem else None
+                read = io_.read_bytes if io_ else None
+                write = io_.write_bytes if io_ else None
+                state[pid] = (info["create_time"], cpu_total, rss, read, write)
+
+                cpu_pct = rss_delta = read_bps = write_bps = None
+                old = prev.get(pid)
+                if old is not None and old[0] == info["create_time"] and dt:
+                    if cpu_total is not None and old[1] is not None:
+                        cpu_pct = max(0.0, (cpu_total - old[1]) / dt / self._cpus * 100)
+                    if rss is not None and old[2] is not None:
+                        rss_delta = rss - old[2]
+                    if read is not None and old[3] is not None:
+                        read_bps = max(0.0, (read - old[3]) / dt)
+                        write_bps = max(0.0, (write - old[4]) / dt)
+
+                rows.append(ProcessRow(pid, info["name"] or "", info["username"] or "",
+                                       info["status"] or "", info["num_threads"],
+                                       cpu_pct, rss, rss_delta, read_bps, write_bps,
+                                       info["create_time"]))
+            self._state = state
+            self._sampled_at = now
+            snap = ProcessSnapshot(tuple(rows), time.time())
+            self.latest = snap
+            return snap
+
+    def top(self, by: str = "cpu", n: int = 10, snap: ProcessSnapshot = None) -> list:
+        """The n largest rows by "cpu", "ram" or "io" (heap selection, no full sort)."""
+        snap = snap or self.latest
+        if snap is None:
+            return []
+        return heapq.nlargest(n, snap.rows, key=PROCESS_SORT_KEYS[by])
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="process-sampler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self.ticker.wake()
+
+    def _run(self):
+        self.ticker.run(self._stop, self.sample)
+
+
+PROCESSES = ProcessTable()
+_process_report_lock = threading.Lock()
+
+
+def process_report_snapshot() -> ProcessSnapshot:
+    """Recent process table for the report: the live one, or a fresh pair of samples."""
+    snap = PROCESSES.latest
+    if snap is not None and time.time() - snap.taken_at <= PROCESS_REPORT_MAX_AGE:
+        return snap
+    with _process_report_lock:
+        snap = PROCESSES.latest
+        if snap is not None and time.time() - snap.taken_at <= PROCESS_REPORT_MAX_AGE:
+            return snap
+        PROCESSES.sample()
+        time.sleep(PROCESS_REPORT_SAMPLE_GAP)
+        return PROCESSES.sample()
+
+
+def processes_csv_text() -> str:
+    """Contents of Processes.csv (tasklist /v /fo csv when psutil is missing)."""
+    if not psutil:
+        return COMMAND_RUNNER.run("tasklist /v /fo csv").stdout
+    buf = io.StringIO()
+    out = csv.writer(buf, lineterminator="\n")
+    out.writerow(ProcessRow._fields)
+    for row in sorted(process_report_snapshot().rows, key=PROCESS_SORT_KEYS["cpu"],
+                      reverse=True):
+        out.writerow(["" if v is None else (round(v, 2) if isinstance(v, float) else v)
+                      for v in row])
+    return buf.getvalue()
+
+
+def processes_json_text() -> str:
+    """Contents of Processes.json: the snapshot plus the top 10 by CPU, RAM and I/O."""
+    if not psutil:
+        return json.dumps({"error": "psutil is not installed"}) + "\n"
+    snap = process_report_snapshot()
+    return json.dumps({
+        "taken_at": datetime.datetime.fromtimestamp(snap.taken_at).isoformat(timespec="seconds"),
+        "count": len(snap.rows),
+        "top": {by: [r.pid for r in PROCESSES.top(by, 10, snap)] for by in PROCESS_SORT_KEYS},
+        "processes": [r._asdict() for r in snap.rows],
+    }, indent=1) + "\n"
+
+
+# =============================
+#   FIX / REPAIR
+# =============================
+
+def flush_dns():
+    try:
+        proc = COMMAND_RUNNER.run(["ipconfig", "/flushdns"])
         if proc.returncode == 0:
-            show_info("Ping Test", proc.stdout)
+            show_info("Flush DNS", "DNS cache flushed successfully.")
         else:
-            show_error("Ping Failed", proc.stdout or proc.stderr)
+            show_error("Flush DNS Error", proc.stdout or proc.stderr)
     except Exception as e:
-        show_error("Ping Error", str(e))
+        show_error("Flush DNS Error", str(e))
+
+
+# Only delete items not modified for this many hours (None = everything).
+TEMP_MIN_AGE_HOURS = None
+TEMP_CLEAN_WORKERS = 8
+TEMP_PROGRESS_SECONDS = 0.1
+
+
+def _cleanup_failure_reason(e: OSError) -> str:
+    if getattr(e, "winerror", None) == 32:
+        return "in use"
+    if isinstance(e, PermissionError):
+        return "access denied"
+    if isinstance(e, FileNotFoundError):
+        return "already gone"
+    return e.strerror or type(e).__name__
+
+
+def _scan_cleanup_tree(root: str, files: list, dirs: list, with_mtime: bool, cancel=None,
+                       unreadable: dict = None):
+    """
+    Collect every file (as DirEntry, so its cached type/stat is reused) and
+    every directory as (path, mtime), children before parents. The folder
+    mtime is taken now, before deleting children bumps it. Symlinks are
+    removed, never followed. Folders that can't be listed go to
+    `unreadable` as {path: OSError}.
+    """
+    stack = [(root, None, False)]
+    while stack:
+        path, entry, visited = stack.pop()
+        if visited:
+            dirs.append((path, entry.stat(follow_symlinks=False).st_mtime
+                         if with_mtime else None))
+            continue
+        if cancel is not None and cancel.is_set():
+            return
+        if entry is not None:
+            if with_mtime:
+                try:
+                    entry.stat(follow_symlinks=False)
+                except OSError:
+                    continue
+            stack.append((path, entry, True))
+        try:
+            with os.scandir(path) as it:
+                for entry in it:
+                    if entry.is_dir(follow_symlinks=False):
+                        stack.append((entry.path, entry, False))
+                    else:
+                        files.append(entry)
+        except OSError as e:
+            if unreadable is not None:
+                unreadable[path] = e  # rmdir will report it
+
+
+def clean_temp_dir(root: str, min_age_hours: float = TEMP_MIN_AGE_HOURS, dry_run: bool = False,
+                   workers: int = TEMP_CLEAN_WORKERS, progress=None,
+                   cancel: threading.Event = None) -> dict:
+    """
+    Delete files (and then emptied folders) below `root` on a thread pool.
+
+    Files newer than `min_age_hours` are kept, and so are folders that still
+    hold something afterwards. With `dry_run` nothing is touched and the
+    totals say what would be freed; a folder only counts when nothing below
+    it is kept or fails. `progress(done, total, bytes)` is called
+    from the workers at most every TEMP_PROGRESS_SECONDS.
+    Returns items/bytes freed, kept counts and failures grouped by reason.
+    """
+    from concurrent.futures import ThreadPoolExecutor
+
+    started = time.monotonic()
+    cutoff = None if min_age_hours is None else time.time() - min_age_hours * 3600
+    files, dirs = [], []
+    unreadable = {}
+    _scan_cleanup_tree(root, files, dirs, cutoff is not None, cancel, unreadable)
+
+    lock = threading.Lock()
+    # Folders that will still hold something: a kept or failed file, or such a subfolder.
+    blocked = set()
+    totals = {"files": 0, "dirs": 0, "bytes": 0, "kept": 0}
+    failures = Counter()
+    examples = {}
+    last_report = [0.0]
+
+    def fail(path, e):
+        reason = _cleanup_failure_reason(e)
+        with lock:
+            failures[reason] += 1
+            examples.setdefault(reason, path)
+
+    def report(force=False):
+        if progress is None:
+            return
+        now = time.monotonic()
+        if force or now - last_report[0] >= TEMP_PROGRESS_SECONDS:
+            last_report[0] = now
+            progress(totals["files"] + totals["kept"] + sum(failures.values()),
+                     len(files), totals["bytes"])
+
+    def remove(batch):
+        freed = count = kept = 0
+        left = set()
+        for entry in batch:
+            if cancel is not None and cancel.is_set():
+                break
+            try:
+                st = entry.stat(follow_symlinks=False)
+                if cutoff is not None and st.st_mtime > cutoff:
+                    kept += 1
+                    left.add(os.path.dirname(entry.path))
+                    continue
+                if not dry_run:
+                    try:
+                        os.unlink(entry.path)
+                    except PermissionError:
+                        # Read-only files can't be deleted on Windows until the flag is cleared.
+                        os.chmod(entry.path, stat.S_IWRITE)
+                        os.unlink(entry.path)
+                freed += st.st_size
+                count += 1
+            except OSError as e:
+                fail(entry.path, e)
+                if not isinstance(e, FileNotFoundError):
+                    left.add(os.path.dirname(entry.path))
+        with lock:
+            blocked.update(left)
+            totals["files"] += count
+            totals["bytes"] += freed
+            totals["kept"] += kept
+            report()
+
+    batch_size = max(1, min(512, len(files) // (workers * 4) or 1))
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="temp-clean") as pool:
+        list(pool.map(remove, (files[i:i + batch_size]
+                               for i in range(0, len(files), batch_size))))
+
+    for path, mtime in dirs:
+        if cancel is not None and cancel.is_set():
+            break
+        if path in blocked or (cutoff is not None and mtime > cutoff):
+            totals["kept"] += 1
+            blocked.add(os.path.dirname(path))
+            continue
+        try:
+            if dry_run:
+                if path in unreadable:
+                    raise unreadable[path]
+            else:
+                os.rmdir(path)
+            totals["dirs"] += 1
+        except OSError as e:
+            blocked.add(os.path.dirname(path))
+            try:
+                still_used = not dry_run and bool(os.listdir(path))
+            except OSError:
+                still_used = False
+            if still_used:
+                totals["kept"] += 1  # still holds files that were kept or failed
+            else:
+                fail(path, e)
+    report(force=True)
+
+    return {
+        "root": root,
+        "dry_run": dry_run,
+        "min_age_hours": min_age_hours,
+        "files": totals["files"],
+        "dirs": totals["dirs"],
+        "bytes": totals["bytes"],
+        "kept": totals["kept"],
+        "failed": sum(failures.values()),
+        "failures": dict(failures),
+        "failure_examples": examples,
+        "cancelled": bool(cancel is not None and cancel.is_set()),
+        "wall_s": round(time.monotonic() - started, 3),
+    }
+
+
+def format_cleanup_summary(result: dict) -> str:
+    verb = "Would free" if result["dry_run"] else "Freed"
+    lines = [
+        f"{verb}: {_format_bytes(result['bytes'])}",
+        f"Files: {result['files']}   Folders: {result['dirs']}",
+    ]
+    if result["kept"]:
+        lines.append(f"Kept (too new or not empty): {result['kept']}")
+    if result["failed"]:
+        lines.append(f"Failed: {result['failed']}")
+        for reason, count in sorted(result["failures"].items(), key=lambda kv: -kv[1]):
+            lines.append(f"  {reason}: {count} (e.g. {result['failure_examples'][reason]})")
+    if result["cancelled"]:
+        lines.append("Cancelled before finishing.")
+    return "\n".join(lines)
+
+
+def _temp_dir():
+    return os.environ.get("TEMP") or os.environ.get("TMP")
+
+
+def clear_temp():
+    """Clean %TEMP% (optionally a dry run, or only old items) on a background thread."""
+    try:
+        temp_dir = _temp_dir()
+        if not temp_dir:
+            show_error("Temp Cleanup", "Could not locate TEMP directory.")
+            return
+
+        _load_tk()
+        window = tk.Toplevel()
+        window.title("Temp Cleanup")
+        status = tk.StringVar(value=f"Clean {temp_dir}")
+        progress_var = tk.DoubleVar(value=0)
+        dry_run_var = tk.BooleanVar(value=False)
+        hours_var = tk.StringVar(value="" if TEMP_MIN_AGE_HOURS is None
+                                 else f"{TEMP_MIN_AGE_HOURS:g}")
+        ttk.Label(window, textvariable=status, width=60).pack(padx=10, pady=(10, 4))
+        options = ttk.Frame(window)
+        options.pack(padx=10, pady=(0, 4), fill=tk.X)
+        dry_run_box = ttk.Checkbutton(options, text="Dry run (only count)", variable=dry_run_var)
+        dry_run_box.pack(side=tk.LEFT)
+        hours_entry = ttk.Entry(options, textvariable=hours_var, width=6)
+        hours_entry.pack(side=tk.RIGHT)
+        ttk.Label(options, text="Older than (hours, empty = all):").pack(side=tk.RIGHT, padx=4)
+        ttk.Progressbar(window, variable=progress_var, maximum=100, length=400).pack(padx=10)
+        buttons = ttk.Frame(window)
+        buttons.pack(pady=10)
+        cancel = threading.Event()
+        events = queue.Queue()
+
+        def on_progress(done, total, freed):
+            events.put(("progress", (done, total, freed)))
+
+        def worker(min_age_hours, dry_run):
+            try:
+                events.put(("done", clean_temp_dir(temp_dir, min_age_hours, dry_run,
+                                                   progress=on_progress, cancel=cancel)))
+            except Exception as e:
+                events.put(("error", str(e)))
+
+        def start():
+            text = hours_var.get().strip()
+            try:
+                min_age_hours = float(text) if text else None
+                if min_age_hours is not None and min_age_hours < 0:
+                    raise ValueError
+            except ValueError:
+                show_error("Temp Cleanup", f"Not a number of hours: {text}")
+                return
+            for widget in (start_button, dry_run_box, hours_entry):
+                widget.state(["disabled"])
+            status.set(f"Scanning {temp_dir}...")
+            threading.Thread(target=worker, args=(min_age_hours, dry_run_var.get()),
+                             name="temp-cleanup", daemon=True).start()
+            pump()
+
+        def close():
+            cancel.set()
+            if start_button.instate(["!disabled"]):
+                window.destroy()
+
+        start_button = ttk.Button(buttons, text="Start", command=start)
+        start_button.pack(side=tk.LEFT, padx=4)
+        ttk.Button(buttons, text="Cancel", command=close).pack(side=tk.LEFT, padx=4)
+        window.protocol("WM_DELETE_WINDOW", close)
+
+        def pump():
+            while True:
+                try:
+                    kind, payload = events.get_nowait()
+                except queue.Empty:
+                    break
+                if kind == "progress":
+                    done, total, freed = payload
+                    progress_var.set(100.0 * done / total if total else 100.0)
+                    verb = "would be freed" if dry_run_var.get() else "freed"
+                    status.set(f"{done}/{total} files checked, {_format_bytes(freed)} {verb}")
+                elif kind == "done":
+                    window.destroy()
+                    title = "Dry run finished." if payload["dry_run"] else "Temp cleanup finished."
+                    show_info("Temp Cleanup", f"{title}\n" + format_cleanup_summary(payload))
+                    return
+                elif kind == "error":
+                    window.destroy()
+                    show_error("Temp Cleanup Error", payload)
+                    return
+            window.after(100, pump)
+    except Exception as e:
+        show_error("Temp Cleanup Error", str(e))
+
+
+# =============================
+#   TOOL LAUNCHERS
+# =============================
+
+def _open_with_start(target: str, title: str):
+    try:
+        subprocess.Popen(f'start "" "{target}"', shell=True)
+    except Exception as e:
+        show_error(f"{title} Error", str(e))
+
+
+def open_task_manager():
+    _open_with_start("taskmgr", "Task Manager")
+
+
+def open_services():
+    _open_with_start("services.msc", "Services")
+
+
+def open_event_viewer():
+    _open_with_start("eventvwr.msc", "Event Viewer")
+
+
+def open_network_connections():
+    _open_with_start("ncpa.cpl", "Network Connections")
+
+
+def open_control_panel():
+    _open_with_start("control", "Control Panel")
+
+
+def open_rdp():
+    _open_with_start("mstsc", "RDP")
+
+
+def open_windows_defender():
+    _open_with_start("windowsdefender:", "Windows Defender")
+
+
+def open_windows_update():
+    _open_with_start("ms-settings:windowsupdate", "Windows Update")
+
+
+def open_registry_editor():
+    _open_with_start("regedit", "Registry Editor")
+
+
+def open_troubleshooter():
+    _open_with_start("ms-settings:troubleshoot", "Troubleshooter")
+
+
+# =============================
+#   REPORT WRITER
+# =============================
+
+# 0 stores entries uncompressed; 1-9 are zlib levels.
+REPORT_COMPRESSLEVEL = 6
+# Also write a loose copy of every artifact next to the ZIP.
+REPORT_KEEP_FOLDER = False
+STREAM_CHUNK_SIZE = 64 * 1024
+# A step that cannot get the ZIP right away buffers this much (compressed)
+# in memory before spilling to a temp file.
+SPOOL_MAX_MEMORY = 8 * 1024 * 1024
+
+
+class _Tee:
+    """Minimal binary sink that fans writes out to several files."""
+
+    def __init__(self, *targets):
+        self.targets = [t for t in targets if t is not None]
+        self.bytes_written = 0
+
+    def write(self, data: bytes) -> int:
+        for t in self.targets:
+            t.write(data)
+        self.bytes_written += len(data)
+        return len(data)
+
+
+class _EntrySpool:
+    """
+    One ZIP entry that could not be streamed into the archive right away.
+    Data is compressed as it is written, in the step's own thread, with the
+    ZIP's method and level; the archive thread then only copies the finished
+    bytes. So a big event dump takes its compressed size in the spool, and
+    several dumps are compressed in parallel.
+    """
+
+    def __init__(self, compresslevel: int):
+        self.file = tempfile.SpooledTemporaryFile(SPOOL_MAX_MEMORY)
+        self._compressor = (zlib.compressobj(compresslevel, zlib.DEFLATED, -15)
+                            if compresslevel else None)
+        self.crc = 0
+        self.size = 0
+        self.compressed_size = 0
+
+    def write(self, data: bytes) -> int:
+        self.crc = zlib.crc32(data, self.crc)
+        self.size += len(data)
+        self.file.write(self._compressor.compress(data) if self._compressor else data)
+        return len(data)
+
+    def finish(self):
+        if self._compressor is not None:
+            self.file.write(self._compressor.flush())
+        self.compressed_size = self.file.tell()
+        self.file.seek(0)
+
+    def close(self):
+        self.file.close()
+
+
+class ReportWriter:
+    """
+    Streams report artifacts into a ZIP file.
+
+    A ZIP can only have one entry open for writing. An entry opened while
+    the archive is idle streams straight into it; every other entry is
+    compressed into an _EntrySpool and, once complete, handed to a single
+    archive thread that appends it. So a step never waits for the archive,
+    however long the entry currently streaming (e.g. a big event dump) takes,
+    and a spooled dump never round-trips its raw bytes through a temp file.
+    """
+
+    def __init__(self, zip_path: Path, compresslevel: int = REPORT_COMPRESSLEVEL,
+                 folder: Path = None):
+        self.zip_path = zip_path
+        self.compresslevel = compresslevel
+        self.folder = folder
+        if folder is not None:
+            folder.mkdir(parents=True, exist_ok=True)
+        import zipfile
+        if compresslevel:
+            self._zip = zipfile.ZipFile(zip_path, "w", zipfile.ZIP_DEFLATED,
+                                        compresslevel=compresslevel)
+        else:
+            self._zip = zipfile.ZipFile(zip_path, "w", zipfile.ZIP_STORED)
+        # Held while an entry is open in the ZIP (direct stream or archive thread).
+        self._lock = threading.Lock()
+        # Guards _pending and the "stream directly?" decision.
+        self._state = threading.Lock()
+        self._pending = 0
+        self._queue = queue.SimpleQueue()
+        self._thread = None
+        self._error = None
+        self._waited = threading.local()
+        # Uncompressed bytes of every finished entry.
+        self.bytes_written = 0
+        # Compressed bytes of spooled entries that went to temp files: in total, and the
+        # most at once.
+        self.spilled_bytes = 0
+        self.peak_spill_bytes = 0
+        self._spilled = 0
+
+    @contextmanager
+    def open(self, name: str):
+        """Yield a binary writer for entry `name`."""
+        loose = (self.folder / name).open("wb") if self.folder is not None else None
+        try:
+            with self._state:
+                direct = not self._pending and self._lock.acquire(blocking=False)
+            if direct:
+                try:
+                    with self._zip.open(name, "w", force_zip64=True) as member:
+                        tee = _Tee(member, loose)
+                        yield tee
+                        ended = time.perf_counter()
+                    with self._state:
+                        self.bytes_written += tee.bytes_written
+                finally:
+                    self._lock.release()
+                self._add_wait(time.perf_counter() - ended)
+            else:
+                spool = _EntrySpool(self.compresslevel)
+                try:
+                    yield _Tee(spool, loose)
+                    spool.finish()
+                except BaseException:
+                    spool.close()
+                    raise
+                ended = time.perf_counter()
+                self._hand_off(name, spool)
+                self._add_wait(time.perf_counter() - ended)
+        finally:
+            if loose is not None:
+                loose.close()
+
+    def _add_wait(self, seconds: float):
+        self._waited.seconds = getattr(self._waited, "seconds", 0.0) + seconds
+
+    def take_archive_wait(self) -> float:
+        """Seconds the calling thread spent finishing entries since the last call."""
+        seconds = getattr(self._waited, "seconds", 0.0)
+        self._waited.seconds = 0.0
+        return seconds
+
+    def _hand_off(self, name: str, spool: _EntrySpool):
+        with self._state:
+            self._pending += 1
+            if spool.compressed_size > SPOOL_MAX_MEMORY:
+                self.spilled_bytes += spool.compressed_size
+                self._spilled += spool.compressed_size
+                self.peak_spill_bytes = max(self.peak_spill_bytes, self._spilled)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._archive_loop,
+                                                name="report-zip", daemon=True)
+                self._thread.start()
+        self._queue.put((name, spool))
+
+    def _archive_loop(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            name, spool = item
+            try:
+                if self._error is None:
+                    with self._lock:
+                        self._append_compressed(name, spool)
+                    with self._state:
+                        self.bytes_written += spool.size
+            except Exception as e:
+                self._error = e
+            finally:
+                spool.close()
+                with self._state:
+                    self._pending -= 1
+                    if spool.compressed_size > SPOOL_MAX_MEMORY:
+                        self._spilled -= spool.compressed_size
+
+    def _append_compressed(self, name: str, spool: _EntrySpool):
+        """
+        Add an entry whose data is already compressed. zipfile has no public
+        call for that, so this does what ZipFile.open(name, "w") and closing
+        it do, minus the compression. Called with _lock held.
+        """
+        import zipfile
+        zf = self._zip
+        info = zipfile.ZipInfo(name, time.localtime()[:6])
+        info.compress_type = zf.compression
+        info.external_attr = 0o600 << 16
+        info.file_size = spool.size
+        info.compress_size = spool.compressed_size
+        info.CRC = spool.crc
+        zip64 = max(info.file_size, info.compress_size) > zipfile.ZIP64_LIMIT
+        with zf._lock:
+            zf._writecheck(info)
+            zf._didModify = True
+            info.header_offset = zf.fp.tell()
+            zf.fp.write(info.FileHeader(zip64))
+            shutil.copyfileobj(spool.file, zf.fp, STREAM_CHUNK_SIZE)
+            zf.filelist.append(info)
+            zf.NameToInfo[name] = info
+            zf.start_dir = zf.fp.tell()
+
+    def write_text(self, name: str, text: str):
+        with self.open(name) as out:
+            out.write(text.encode("utf-8"))
+
+    def close(self):
+        """Wait for the archive thread to append every spooled entry, then finish the ZIP."""
+        with self._state:
+            thread = self._thread
+        if thread is not None:
+            self._queue.put(None)
+            thread.join()
+        with self._lock:
+            self._zip.close()
+        if self._error is not None:
+            raise self._error
+
+
+# =============================
+#   EVENT LOG QUERIES
+# =============================
+
+# Where per-query bookmarks (last exported EventRecordID) are kept between reports.
+APP_DATA_DIR = Path.home() / ".helpdesk_dashboard"
+EVENT_BOOKMARKS_FILE = APP_DATA_DIR / "event_bookmarks.json"
+# Only export events newer than the previous report.
+EVENT_INCREMENTAL = False
+# Optional "last N days" window applied on top of either mode (None = no limit).
+EVENT_WINDOW_DAYS = None
+
+_RECORD_ID_RE = re.compile(r"<EventRecordID>(\d+)</EventRecordID>")
+
+
+class EventBookmarks:
+    """Persisted {"<Log>:<EventID>": {"record_id": N, "saved_at": iso}} map."""
+
+    def __init__(self, path: Path = EVENT_BOOKMARKS_FILE):
+        self.path = path
+        self._lock = threading.Lock()
+        self._data = {}
+        try:
+            with path.open("r", encoding="utf-8") as f:
+                loaded = json.load(f)
+            if isinstance(loaded, dict):
+                self._data = loaded
+        except (OSError, ValueError):
+            pass
+
+    def get(self, key: str):
+        with self._lock:
+            entry = self._data.get(key)
+        if isinstance(entry, dict) and isinstance(entry.get("record_id"), int):
+            return entry["record_id"]
+        return None
+
+    def set(self, key: str, record_id: int):
+        with self._lock:
+            self._data[key] = {
+                "record_id": record_id,
+                "saved_at": datetime.datetime.now().isoformat(timespec="seconds"),
+            }
+
+    def save(self):
+        """Write atomically so a crash mid-save never loses the old bookmarks."""
+        with self._lock:
+            payload = json.dumps(self._data, indent=2, sort_keys=True)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_suffix(".tmp")
+        tmp.write_text(payload, encoding="utf-8")
+        os.replace(tmp, self.path)
+
+
+class EventQuery:
+    """
+    One wevtutil export (e.g. Security / 4624).
+
+    prepare() looks up the newest matching EventRecordID with a cheap
+    single-event query and returns the export command bounded by it, so a
+    report covers exactly (bookmark, newest]. commit() is called once the
+    export succeeded and moves the bookmark forward. `runner` defaults to
+    COMMAND_RUNNER; pass a ReplayRunner to exercise the command building
+    against recorded output.
+    """
+
+    def __init__(self, log_name: str, event_id: int, incremental: bool = False,
+                 days: int = None, bookmarks: EventBookmarks = None, runner=None):
+        self.log_name = log_name
+        self.event_id = event_id
+        self.incremental = incremental
+        self.days = days
+        self.bookmarks = bookmarks
+        self.runner = runner
+        self._upto = None
+
+    @property
+    def key(self) -> str:
+        return f"{self.log_name}:{self.event_id}"
+
+    def xpath(self, after: int = None, upto: int = None) -> str:
+        conds = [f"(EventID={self.event_id})"]
+        if after is not None:
+            conds.append(f"(EventRecordID>{after})")
+        if upto is not None:
+            conds.append(f"(EventRecordID<={upto})")
+        if self.days:
+            conds.append(f"TimeCreated[timediff(@SystemTime) <= {int(self.days * 86400000)}]")
+        return f"*[System[{' and '.join(conds)}]]"
+
+    def command(self, after: int = None, upto: int = None) -> str:
+        return f'wevtutil qe {self.log_name} /q:"{self.xpath(after, upto)}" /f:text'
+
+    def latest_record_id(self, timeout: float = None):
+        probe = (f'wevtutil qe {self.log_name} /q:"*[System[(EventID={self.event_id})]]" '
+                 f'/c:1 /rd:true /f:xml')
+        try:
+            result = (self.runner or COMMAND_RUNNER).run(probe, timeout=timeout)
+        except Exception:
+            return None
+        if result.returncode != 0:
+            return None
+        m = _RECORD_ID_RE.search(result.stdout)
+        return int(m.group(1)) if m else None
+
+    def prepare(self, timeout: float = None) -> str:
+        self._upto = None
+        if self.bookmarks is None:
+            return self.command()
+        self._upto = self.latest_record_id(timeout)
+        after = self.bookmarks.get(self.key) if self.incremental else None
+        if self._upto is None:
+            # Probe failed (not admin, log missing): plain export, bookmark untouched.
+            return self.command(after)
+        if after is not None and after > self._upto:
+            # Log was cleared or rolled over since the last report.
+            after = None
+        return self.command(after, self._upto)
+
+    def commit(self):
+        if self.bookmarks is not None and self._upto is not None:
+            self.bookmarks.set(self.key, self._upto)
+
+
+# =============================
+#   EVENT LOG PARSER / INDEX
+# =============================
+
+# Width of the time buckets used by EventIndex for range queries.
+EVENT_BUCKET_SECONDS = 60
+
+
+class EventRecord:
+    """One event from a wevtutil /f:text dump. `offset` is the byte offset of its Event[N] line."""
+
+    __slots__ = ("event_id", "time", "log", "source", "account", "ip", "level", "offset")
+
+    def __init__(self, event_id=0, time=0.0, log="", source="", account="", ip="",
+                 level="", offset=0):
+        self.event_id = event_id
+        self.time = time
+        self.log = log
+        self.source = source
+        self.account = account
+        self.ip = ip
+        self.level = level
+        self.offset = offset
+
+    def __repr__(self):
+        return (f"EventRecord(event_id={self.event_id}, time={self.time}, log={self.log!r}, "
+                f"account={self.account!r}, ip={self.ip!r}, offset={self.offset})")
+
+
+def _parse_event_time(value: str) -> float:
+    """'2025-01-08T23:11:55.1230000Z' (UTC) or without Z (local) -> epoch seconds."""
+    try:
+        dt = datetime.datetime.fromisoformat(value[:19])
+    except ValueError:
+        return 0.0
+    if value.endswith("Z"):
+        dt = dt.replace(tzinfo=datetime.timezone.utc)
+    return dt.timestamp()
+
+
+# Values wevtutil uses for "nothing here".
+_EMPTY_VALUES = {"", "-", "N/A", "::1", "127.0.0.1"}
+
+
+# Event blocks start with "Event[N]:" at the beginning of a line; inside a
+# block we only need a handful of "Key: value" lines.
+PARSE_CHUNK_SIZE = 4 * 1024 * 1024
+_EVENT_START_RE = re.compile(rb"^Event\[\d+\]:", re.M)
+_EVENT_FIELD_RE = re.compile(
+    rb"^[ \t]*(Event ID|Date|Account Name|Source Network Address|Log Name|Source|Level):"
+    rb"[ \t]*([^\r\n]*)",
+    re.M
+)
+
+
+def _parse_event_block(buf: bytes, start: int, end: int, offset: int,
+                       encoding: str) -> EventRecord:
+    rec = EventRecord(offset=offset)
+    for key, value in _EVENT_FIELD_RE.findall(buf, start, end):
+        value = value.strip()
+        if key == b"Account Name":
+            account = value.decode(encoding, "replace")
+            if account not in _EMPTY_VALUES:
+                rec.account = sys.intern(account)
+        elif key == b"Source Network Address":
+            ip = value.decode("ascii", "ignore")
+            if ip not in _EMPTY_VALUES:
+                rec.ip = sys.intern(ip)
+        elif key == b"Event ID":
+            if not rec.event_id:
+                try:
+                    rec.event_id = int(value)
+                except ValueError:
+                    pass
+        elif key == b"Date":
+            if not rec.time:
+                rec.time = _parse_event_time(value.decode("ascii", "ignore"))
+        elif key == b"Log Name":
+            if not rec.log:
+                rec.log = sys.intern(value.decode(encoding, "replace"))
+        elif key == b"Source":
+            if not rec.source:
+                rec.source = sys.intern(value.decode(encoding, "replace"))
+        elif not rec.level:
+            rec.level = sys.intern(value.decode(encoding, "replace"))
+    return rec
+
+
+def iter_event_blocks(fp, chunk_size: int = PARSE_CHUNK_SIZE):
+    """
+    Yield (buf, start, end, offset) for every "Event[N]:" block of a binary
+    wevtutil /f:text stream; the block is buf[start:end] at file `offset`.
+    Reads fixed-size chunks and only keeps the last, possibly incomplete
+    event between reads, so memory does not depend on the size of the dump.
+    """
+    buf = b""
+    base = 0  # file offset of buf[0]
+    while True:
+        data = fp.read(chunk_size)
+        if data:
+            buf += data
+        starts = [m.start() for m in _EVENT_START_RE.finditer(buf)]
+        if not data:
+            starts.append(len(buf))
+        for start, end in zip(starts, starts[1:]):
+            yield buf, start, end, base + start
+        if not data:
+            return
+        if starts:
+            base += starts[-1]
+            buf = buf[starts[-1]:]
+
+
+def iter_wevtutil_events(fp, encoding: str = "utf-8", chunk_size: int = PARSE_CHUNK_SIZE):
+    """
+    Yield an EventRecord per event from a binary wevtutil /f:text stream.
+
+    The account is the last non-empty "Account Name" of the event, which is
+    the target account (New Logon / Account For Which Logon Failed) rather
+    than the Subject for 4624/4625. Header fields keep their first value.
+    """
+    for buf, start, end, offset in iter_event_blocks(fp, chunk_size):
+        yield _parse_event_block(buf, start, end, offset, encoding)
+
+
+class EventIndex:
+    """
+    Column-oriented index over parsed events.
+
+    Per-event data lives in typed arrays; strings (account, IP, log) are
+    stored once in a string table and referenced by integer code. Lookups
+    go through posting lists (array of row numbers) keyed by EventID,
+    time bucket, account and source IP, so a query like "failed logons per
+    account in the last hour" only touches the rows in those buckets.
+    """
+
+    def __init__(self, bucket_seconds: int = EVENT_BUCKET_SECONDS):
+        self.bucket_seconds = bucket_seconds
+        self.ids = array("I")
+        self.times = array("d")
+        self.offsets = array("Q")
+        self.accounts = array("I")
+        self.ips = array("I")
+        self.logs = array("I")
+        self._strings = [""]
+        self._codes = {"": 0}
+        self.by_id = {}
+        self.by_bucket = {}
+        self.by_account = {}
+        self.by_ip = {}
+        self.latest_time = 0.0
+
+    def __len__(self):
+        return len(self.ids)
+
+    def _code(self, s: str) -> int:
+        code = self._codes.get(s)
+        if code is None:
+            code = len(self._strings)
+            self._codes[s] = code
+            self._strings.append(s)
+        return code
+
+    @staticmethod
+    def _post(table: dict, key, row: int):
+        rows = table.get(key)
+        if rows is None:
+            rows = table[key] = array("I")
+        rows.append(row)
+
+    def add(self, rec: EventRecord):
+        row = len(self.ids)
+        account = self._code(rec.account)
+        ip = self._code(rec.ip)
+        self.ids.append(rec.event_id)
+        self.times.append(rec.time)
+        self.offsets.append(rec.offset)
+        self.accounts.append(account)
+        self.ips.append(ip)
+        self.logs.append(self._code(rec.log))
+
+        self._post(self.by_id, rec.event_id, row)
+        self._post(self.by_bucket, int(rec.time // self.bucket_seconds), row)
+        if account:
+            self._post(self.by_account, account, row)
+        if ip:
+            self._post(self.by_ip, ip, row)
+        if rec.time > self.latest_time:
+            self.latest_time = rec.time
+
+    def add_stream(self, fp, encoding: str = "utf-8") -> int:
+        """Index every event of a binary wevtutil text stream, return how many were added."""
+        start = len(self)
+        for rec in iter_wevtutil_events(fp, encoding):
+            self.add(rec)
+        return len(self) - start
+
+    @classmethod
+    def from_file(cls, path, bucket_seconds: int = EVENT_BUCKET_SECONDS):
+        index = cls(bucket_seconds)
+        with open(path, "rb") as f:
+            index.add_stream(f)
+        return index
+
+    def record(self, row: int) -> EventRecord:
+        s = self._strings
+        return EventRecord(self.ids[row], self.times[row], s[self.logs[row]], "",
+                           s[self.accounts[row]], s[self.ips[row]], "", self.offsets[row])
+
+    def _time_rows(self, since, until):
+        lo = int(since // self.bucket_seconds) if since is not None else None
+        hi = int(until // self.bucket_seconds) if until is not None else None
+        if lo is not None and hi is not None and hi - lo <= len(self.by_bucket):
+            buckets = (self.by_bucket.get(b) for b in range(lo, hi + 1))
+        else:
+            buckets = (rows for b, rows in self.by_bucket.items()
+                       if (lo is None or b >= lo) and (hi is None or b <= hi))
+        for rows in buckets:
+            if rows:
+                yield from rows
+
+    def rows(self, event_id: int = None, since: float = None, until: float = None,
+             account: str = None, ip: str = None):
+        """Yield row numbers matching every given filter, starting from the most selective index."""
+        account_code = ip_code = None
+        if account is not None:
+            account_code = self._codes.get(account)
+            if account_code is None:
+                return
+        if ip is not None:
+            ip_code = self._codes.get(ip)
+            if ip_code is None:
+                return
+
+        if account_code is not None:
+            candidates = self.by_account.get(account_code, ())
+        elif ip_code is not None:
+            candidates = self.by_ip.get(ip_code, ())
+        elif event_id is not None and (since is None and until is None):
+            candidates = self.by_id.get(event_id, ())
+        elif since is not None or until is not None:
+            candidates = self._time_rows(since, until)
+        else:
+            candidates = range(len(self))
+
+        ids, times, accounts, ips = self.ids, self.times, self.accounts, self.ips
+        for row in candidates:
+            if event_id is not None and ids[row] != event_id:
+                continue
+            t = times[row]
+            if since is not None and t < since:
+                continue
+            if until is not None and t > until:
+                continue
+            if account_code is not None and accounts[row] != account_code:
+                continue
+            if ip_code is not None and ips[row] != ip_code:
+                continue
+            yield row
+
+    def count_by(self, field: str, **filters) -> Counter:
+        """Count matching events grouped by "account", "ip" or "event_id"."""
+        if field == "event_id":
+            return Counter(self.ids[row] for row in self.rows(**filters))
+        column = {"account": self.accounts, "ip": self.ips}[field]
+        codes = Counter(column[row] for row in self.rows(**filters))
+        return Counter({self._strings[code]: n for code, n in codes.items() if code})
+
+    def failed_logons_by_account(self, seconds: float = 3600, now: float = None) -> Counter:
+        """4625 events per account over the last `seconds` (default: up to the newest event)."""
+        if now is None:
+            now = self.latest_time
+        return self.count_by("account", event_id=4625, since=now - seconds, until=now)
+
+
+# =============================
+#   REPORT STORE
+# =============================
+
+# "zip": one standalone ZIP per report (default). "store": artifacts go into
+# the deduplicating REPORT_STORE_DIR and a ZIP is exported on demand.
+REPORT_ARCHIVE = "zip"
+REPORT_STORE_DIR = APP_DATA_DIR / "report_store"
+# Chunks end at a line whose CRC matches STORE_BOUNDARY_MASK (after at least
+# STORE_CHUNK_MIN bytes), so inserting events near the top of a dump only
+# changes the chunks around the insertion, not every chunk after it.
+STORE_CHUNK_MIN = 16 * 1024
+STORE_CHUNK_MAX = 256 * 1024
+STORE_BOUNDARY_MASK = 0x3FF
+
+
+class _Chunker:
+    """
+    Binary sink that cuts written data into content-defined chunks and
+    puts each into `store`. The cut points depend only on the data, never
+    on how the writes were split.
+    """
+
+    def __init__(self, store: "ReportStore"):
+        self.store = store
+        self.chunks = []
+        self.size = 0
+        self._hash = hashlib.sha256()
+        self._buf = bytearray()
+        self._scan = 0  # bytes of _buf already checked for boundaries
+
+    def write(self, data: bytes) -> int:
+        self._buf += data
+        self._hash.update(data)
+        self.size += len(data)
+        self._cut(final=False)
+        return len(data)
+
+    def _emit(self, end: int):
+        self.chunks.append(self.store.put(bytes(self._buf[:end])))
+        del self._buf[:end]
+        self._scan = 0
+
+    def _cut(self, final: bool):
+        buf = self._buf
+        while True:
+            nl = buf.find(b"\n", self._scan)
+            if nl < 0:
+                if len(buf) >= STORE_CHUNK_MAX:
+                    self._emit(STORE_CHUNK_MAX)
+                    continue
+                break
+            end = nl + 1
+            if end > STORE_CHUNK_MAX:
+                self._emit(STORE_CHUNK_MAX)
+                continue
+            if (end >= STORE_CHUNK_MIN
+                    and zlib.crc32(buf[self._scan:end]) & STORE_BOUNDARY_MASK == 0):
+                self._emit(end)
+                continue
+            self._scan = end
+        if final and buf:
+            self._emit(len(buf))
+
+    def close(self) -> dict:
+        self._cut(final=True)
+        return {"size": self.size, "sha256": self._hash.hexdigest(), "chunks": self.chunks}
+
+
+class ReportStore:
+    """
+    Content-addressed store for report artifacts.
+
+        chunks/<2 hex>/<sha256>   zlib-compressed chunk
+        reports/<name>.json       file name -> size, sha256, chunk list
+
+    A chunk that is already present is not written again, so repeated
+    reports of the same machine only add the chunks that changed.
+    """
+
+    def __init__(self, root: Path = REPORT_STORE_DIR,
+                 compresslevel: int = REPORT_COMPRESSLEVEL):
+        self.root = root
+        self.compresslevel = compresslevel
+        self.chunk_dir = root / "chunks"
+        self.report_dir = root / "reports"
+        self.report_dir.mkdir(parents=True, exist_ok=True)
+        self.chunk_dir.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        # Compressed bytes of chunks added through this instance.
+        self.new_bytes = 0
+
+    def _chunk_path(self, digest: str) -> Path:
+        return self.chunk_dir / digest[:2] / digest
+
+    def put(self, data: bytes) -> str:
+        digest = hashlib.sha256(data).hexdigest()
+        path = self._chunk_path(digest)
+        if path.exists():
+            return digest
+        packed = zlib.compress(data, self.compresslevel if self.compresslevel else 1)
+        path.parent.mkdir(exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=".tmp-")
+        with os.fdopen(fd, "wb") as f:
+            f.write(packed)
+        os.replace(tmp, path)
+        with self._lock:
+            self.new_bytes += len(packed)
+        return digest
+
+    def get(self, digest: str) -> bytes:
+        return zlib.decompress(self._chunk_path(digest).read_bytes())
+
+    def save_report(self, name: str, files: dict) -> Path:
+        path = self.report_dir / f"{name}.json"
+        tmp = path.with_suffix(".tmp")
+        tmp.write_text(json.dumps({
+            "name": name,
+            "created": datetime.datetime.now().isoformat(timespec="seconds"),
+            "files": files,
+        }), encoding="utf-8")
+        os.replace(tmp, path)
+        return path
+
+    def reports(self) -> list:
+        """Stored report names, oldest first."""
+        return sorted(p.stem for p in self.report_dir.glob("*.json"))
+
+    def load(self, name: str) -> dict:
+        with (self.report_dir / f"{name}.json").open("r", encoding="utf-8") as f:
+            return json.load(f)
+
+    def iter_file(self, name: str, entry: str):
+        """Yield the bytes of one artifact of a stored report, chunk by chunk."""
+        for digest in self.load(name)["files"][entry]["chunks"]:
+            yield self.get(digest)
+
+    def export_zip(self, name: str, zip_path: Path,
+                   compresslevel: int = REPORT_COMPRESSLEVEL) -> Path:
+        """Write a standalone ZIP identical in content to a directly collected one."""
+        import zipfile
+        report = self.load(name)
+        method = zipfile.ZIP_DEFLATED if compresslevel else zipfile.ZIP_STORED
+        with zipfile.ZipFile(zip_path, "w", method, compresslevel=compresslevel or None) as zf:
+            for entry, info in report["files"].items():
+                with zf.open(entry, "w", force_zip64=True) as member:
+                    for digest in info["chunks"]:
+                        member.write(self.get(digest))
+        return zip_path
+
+    def delete(self, name: str):
+        (self.report_dir / f"{name}.json").unlink()
+
+    def gc(self) -> dict:
+        """Delete chunks no stored report refers to."""
+        live = set()
+        for name in self.reports():
+            for info in self.load(name)["files"].values():
+                live.update(info["chunks"])
+        removed = freed = 0
+        for path in self.chunk_dir.glob("*/*"):
+            if path.name not in live:
+                freed += path.stat().st_size
+                path.unlink()
+                removed += 1
+        return {"chunks_removed": removed, "bytes_freed": freed}
+
+    def stats(self) -> dict:
+        logical = 0
+        names = self.reports()
+        for name in names:
+            logical += sum(info["size"] for info in self.load(name)["files"].values())
+        stored = chunks = 0
+        for path in self.chunk_dir.glob("*/*"):
+            stored += path.stat().st_size
+            chunks += 1
+        return {"reports": len(names), "logical_bytes": logical, "stored_bytes": stored,
+                "chunks": chunks}
+
+
+class StoreReportWriter:
+    """ReportWriter counterpart that writes into a ReportStore instead of a ZIP."""
+
+    def __init__(self, store: ReportStore, name: str, folder: Path = None):
+        self.store = store
+        self.name = name
+        self.folder = folder
+        if folder is not None:
+            folder.mkdir(parents=True, exist_ok=True)
+        self.path = store.report_dir / f"{name}.json"
+        self._files = {}
+        self._lock = threading.Lock()
+        self.bytes_written = 0
+
+    @contextmanager
+    def open(self, name: str):
+        """Yield a binary writer for artifact `name`; steps can write concurrently."""
+        loose = (self.folder / name).open("wb") if self.folder is not None else None
+        try:
+            chunker = _Chunker(self.store)
+            yield _Tee(chunker, loose)
+            info = chunker.close()
+            with self._lock:
+                self._files[name] = info
+                self.bytes_written += info["size"]
+        finally:
+            if loose is not None:
+                loose.close()
+
+    def write_text(self, name: str, text: str):
+        with self.open(name) as out:
+            out.write(text.encode("utf-8"))
+
+    def close(self):
+        with self._lock:
+            self.store.save_report(self.name, self._files)
+
+
+# =============================
+#   DIAGNOSTIC REPORT
+# =============================
+
+# Upper bound for concurrently running collection steps. Most steps are
+# subprocess-bound (wevtutil / powershell), so threads are enough.
+DIAG_MAX_WORKERS = 4
+
+# desc     - text logged when the step starts
+# cmd      - shell command string, a callable() returning the file's text/bytes, or an
+#            object with prepare() -> command string and commit() on success (EventQuery)
+# filename - entry name inside the report ZIP
+# slow     - submitted first so long steps overlap with the cheap ones
+# timeout  - seconds before the command's process tree is killed, or a callable's result is
+#            given up on (None = DIAG_STEP_TIMEOUT)
+DiagStep = namedtuple("DiagStep", ["desc", "cmd", "filename", "slow", "timeout"],
+                      defaults=(False, None))
+
+# Default per-step timeout in seconds; big Security logs can legitimately take minutes.
+DIAG_STEP_TIMEOUT = 900
+# Timeout for the cheap "newest EventRecordID" probe of an EventQuery.
+EVENT_PROBE_TIMEOUT = 60
+
+
+def log_level(text: str) -> str:
+    """"ERROR" for failed/killed steps and alerts, "OK" for finished ones, else "INFO"."""
+    if text.startswith(("ERROR", "TIMEOUT", "CANCELLED", "ALERT")):
+        return "ERROR"
+    if text.startswith(("OK", "RESOLVED")):
+        return "OK"
+    return "INFO"
+
+
+class _LogTee:
+    """
+    Passes events through to `events` and keeps every ("log", text) line,
+    timestamped, so the whole run log can be written into the report.
+    """
+
+    def __init__(self, events: queue.Queue):
+        self.events = events
+        self.lines = []
+
+    def put(self, item):
+        if item[0] == "log":
+            ts = datetime.datetime.now().strftime("%H:%M:%S")
+            self.lines.append(f"[{ts}] {item[1]}")
+        self.events.put(item)
+
+    def text(self) -> str:
+        return "\n".join(self.lines) + "\n"
+
+
+# Outcome of run_command_to_report. returncode is None if the command could
+# not be run; cpu_s is None when child CPU time cannot be measured; stopped is
+# "timeout" or "cancelled" when the command was killed.
+CommandStats = namedtuple("CommandStats", ["returncode", "bytes", "cpu_s", "stopped"],
+                          defaults=(None,))
+
+
+class _Watchdog:
+    """Kills a running command's process tree on timeout or when `cancel` is set."""
+
+    def __init__(self, runner, proc, timeout: float = None, cancel: threading.Event = None):
+        self.runner = runner
+        self.proc = proc
+        self.deadline = time.monotonic() + timeout if timeout else None
+        self.cancel = cancel
+        self.stopped = None
+        self._done = threading.Event()
+        self._thread = None
+        if self.deadline is not None or cancel is not None:
+            self._thread = threading.Thread(target=self._run, name="diag-watchdog", daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while not self._done.wait(0.2):
+            if self.cancel is not None and self.cancel.is_set():
+                self.stopped = "cancelled"
+            elif self.deadline is not None and time.monotonic() >= self.deadline:
+                self.stopped = "timeout"
+            else:
+                continue
+            try:
+                self.runner.kill_tree(self.proc)
+            except Exception:
+                pass
+            return
+
+    def finish(self):
+        self._done.set()
+
+
+def _call_with_deadline(fn, timeout: float = None, cancel: threading.Event = None):
+    """
+    Run fn() on its own thread and return (None, result), or ("timeout" /
+    "cancelled", None) once `timeout` passes or `cancel` is set. A Python
+    function can't be killed: one that overruns finishes in the background
+    and its result is dropped. Exceptions from fn() are re-raised here.
+    """
+    done = threading.Event()
+    outcome = {}
+
+    def run():
+        try:
+            outcome["result"] = fn()
+        except BaseException as e:
+            outcome["error"] = e
+        finally:
+            done.set()
+
+    threading.Thread(target=run, name="diag-call", daemon=True).start()
+    deadline = time.monotonic() + timeout if timeout else None
+    while not done.wait(0.2 if deadline is None else
+                        min(0.2, max(0.0, deadline - time.monotonic()))):
+        if cancel is not None and cancel.is_set():
+            return "cancelled", None
+        if deadline is not None and time.monotonic() >= deadline:
+            return "timeout", None
+    if "error" in outcome:
+        raise outcome["error"]
+    return None, outcome["result"]
+
+
+# Minimum seconds between two CPU samples of a running command's process tree.
+CPU_SAMPLE_INTERVAL = 0.5
+
+
+class _ChildCpuTracker:
+    """
+    Child CPU time of a running command, including grandchildren (shell=True
+    runs the real tool under cmd.exe). Processes vanish once they exit, so
+    the tree is sampled while output is being read and the last value seen
+    per PID is kept.
+    """
+
+    def __init__(self, pid):
+        self._root = None
+        self._seen = {}
+        self._last = 0.0
+        if psutil and pid:
+            try:
+                self._root = psutil.Process(pid)
+            except Exception:
+                self._root = None
+
+    def sample(self, force: bool = False):
+        if self._root is None:
+            return
+        now = time.monotonic()
+        if not force and now - self._last < CPU_SAMPLE_INTERVAL:
+            return
+        self._last = now
+        try:
+            procs = [self._root] + self._root.children(recursive=True)
+        except Exception:
+            return
+        for p in procs:
+            try:
+                t = p.cpu_times()
+                self._seen[p.pid] = t.user + t.system
+            except Exception:
+                pass
+
+    @property
+    def total(self):
+        if self._root is None:
+            return None
+        return round(sum(self._seen.values()), 3)
+
+
+def run_command_to_report(cmd: str, name: str, writer: ReportWriter, log,
+                          runner=None, timeout: float = None,
+                          cancel: threading.Event = None) -> CommandStats:
+    """
+    Run a shell command and stream its output into report entry `name`.
+    If return code != 0, we log a clear message (e.g. for Security logs when not Admin).
+    `log` is a callable taking one line of text; it may be called from a worker thread.
+    The process tree is killed after `timeout` seconds or once `cancel` is set;
+    whatever it wrote until then stays in the report.
+    """
+    written = 0
+    cpu = None
+    runner = runner or COMMAND_RUNNER
+    try:
+        with writer.open(name) as out:
+            proc = runner.open(cmd)
+            watchdog = _Watchdog(runner, proc, timeout, cancel)
+            try:
+                cpu = _ChildCpuTracker(getattr(proc, "pid", None))
+                with proc.stdout:
+                    for chunk in iter(lambda: proc.stdout.read(STREAM_CHUNK_SIZE), b""):
+                        out.write(chunk)
+                        written += len(chunk)
+                        cpu.sample()
+                    cpu.sample(force=True)
+                returncode = proc.wait()
+            except BaseException:
+                # The output can't be stored (collector gone, disk full): stop the command
+                # too and reap it, since the watchdog is finished below.
+                try:
+                    runner.kill_tree(proc)
+                except Exception:
+                    pass
+                proc.wait()
+                raise
+            finally:
+                watchdog.finish()
+        if watchdog.stopped == "timeout":
+            log(f"TIMEOUT: {name} killed after {timeout:g}s (partial output kept)")
+            return CommandStats(returncode, written, cpu.total, "timeout")
+        if watchdog.stopped == "cancelled":
+            log(f"CANCELLED: {name} (partial output kept)")
+            return CommandStats(returncode, written, cpu.total, "cancelled")
+        if returncode == 0:
+            log(f"OK: {name}")
+        else:
+            log(
+                f"ERROR (code {returncode}) while running command for {name}. "
+                f"If this is a Security log, run as Administrator."
+            )
+        return CommandStats(returncode, written, cpu.total)
+    except Exception as e:
+        log(f"ERROR writing {name}: {e}")
+        return CommandStats(None, written, cpu.total if cpu else None)
+
+
+def ram_health_text() -> str:
+    """Contents of RAM_Health.txt."""
+    if not psutil:
+        return "psutil is not installed, RAM metrics unavailable.\n"
+
+    info = ram_health_data()
+    return (
+        f"Total RAM: {info['total_gb']} GB\n"
+        f"Used RAM: {info['used_gb']} GB\n"
+        f"Usage: {info['percent']}%\n"
+        f"Status: {info['status']}\n"
+    )
+
+
+def disk_info_text() -> str:
+    """Contents of DiskDrive_Info.txt: every disk record, then the raw query output."""
+    snap = DISKS.get()
+    if not snap.disks:
+        return f"No disk data returned ({snap.error}).\n"
+    out = [f"Source: {snap.source}", ""]
+    for d in snap.disks:
+        out += format_disk_record(d) + [""]
+    out += ["----- raw output -----", snap.raw.strip()]
+    return "\n".join(out) + "\n"
+
+
+def smart_status_data() -> dict:
+    """Disk records as plain dicts, for the `smart` health check."""
+    snap = DISKS.get()
+    return {"source": snap.source, "error": snap.error,
+            "disks": [d._asdict() for d in snap.disks]}
+
+
+def smart_status_text() -> str:
+    """Contents of SMART_Status.txt, from the same disk query as DiskDrive_Info.txt."""
+    snap = DISKS.get()
+    if not snap.disks:
+        return f"No SMART data returned ({snap.error}).\n"
+    lines = []
+    for d in snap.disks:
+        lines.append(f"{_or_na(d.model)} | Serial: {_or_na(d.serial)} | "
+                     f"Status: {_or_na(d.status)} | Health: {_or_na(d.health)}")
+    return "\n".join(lines) + "\n"
+
+
+# (desc, log name, event id, filename, slow)
+EVENT_STEPS = [
+    ("Collecting Security log: Successful logons (4624)...",
+     "Security", 4624, "Security_Logons_4624.txt", True),
+
+    ("Collecting Security log: Failed logons (4625)...",
+     "Security", 4625, "Security_FailedLogons_4625.txt", False),
+
+    ("Collecting Security log: Log cleared (1102)...",
+     "Security", 1102, "Security_LogCleared_1102.txt", False),
+
+    ("Collecting Security log: Admin privilege granted (4672)...",
+     "Security", 4672, "Security_AdminPrivilege_4672.txt", True),
+
+    ("Collecting System log: WHEA hardware errors (18)...",
+     "System", 18, "System_WHEA_18.txt", False),
+
+    ("Collecting System log: BugCheck (1001)...",
+     "System", 1001, "System_BugCheck_1001.txt", False),
+]
+
+DIAG_STEPS = [
+    DiagStep("Collecting Windows Defender computer status...",
+             'powershell -Command "Get-MpComputerStatus | Format-List *"',
+             "Defender_ComputerStatus.txt", slow=True, timeout=300),
+
+    DiagStep("Collecting Windows Defender threat detections...",
+             'powershell -Command "Get-MpThreatDetection | Format-List *"',
+             "Defender_ThreatDetections.txt", slow=True, timeout=300),
+
+    DiagStep("Collecting system info (systeminfo)...",
+             "systeminfo",
+             "SystemInfo.txt", slow=True),
+
+    DiagStep("Collecting network info...",
+             network_info_text,
+             "Network_Info.txt"),
+
+    DiagStep("Collecting running processes (CSV)...",
+             processes_csv_text,
+             "Processes.csv"),
+
+    DiagStep("Collecting running processes (JSON)...",
+             processes_json_text,
+             "Processes.json"),
+
+    DiagStep("Collecting disk/drive info...",
+             disk_info_text,
+             "DiskDrive_Info.txt"),
+
+    DiagStep("Collecting RAM health...",
+             ram_health_text,
+             "RAM_Health.txt"),
+
+    DiagStep("Collecting SMART status...",
+             smart_status_text,
+             "SMART_Status.txt"),
+]
+
+
+def build_diag_steps(incremental: bool = EVENT_INCREMENTAL, days: int = EVENT_WINDOW_DAYS,
+                     bookmarks: EventBookmarks = None, runner=None):
+    """
+    Event-log steps for this run (bounded by bookmarks / window) plus DIAG_STEPS.
+    Starts a new run for the shared disk inventory, so its steps query once, fresh.
+    """
+    DISKS.invalidate()
+    steps = []
+    for desc, log_name, event_id, filename, slow in EVENT_STEPS:
+        query = EventQuery(log_name, event_id, incremental, days, bookmarks, runner)
+        steps.append(DiagStep(desc, query, filename, slow))
+    steps += DIAG_STEPS
+    if HISTORY_REPORT_HOURS:
+        steps.append(DiagStep("Collecting metrics history...",
+                              lambda: history_report_bytes(HISTORY_REPORT_HOURS),
+                              "Metrics_History.bin"))
+    return steps
+
+
+def _run_diag_step(step: DiagStep, writer: ReportWriter, log, runner=None,
+                   submitted_at: float = None, cancel: threading.Event = None) -> dict:
+    """Run one step and return its manifest record."""
+    started = time.perf_counter()
+    timeout = step.timeout or DIAG_STEP_TIMEOUT
+    record = {
+        "file": step.filename,
+        "desc": step.desc,
+        "status": "error",
+        "exit_code": None,
+        "wall_s": None,
+        "cpu_s": None,
+        "bytes": 0,
+        "queue_wait_s": round(started - submitted_at, 3) if submitted_at else 0.0,
+        "archive_wait_s": 0.0,
+        "started_at": datetime.datetime.now().isoformat(timespec="milliseconds"),
+        "timeout_s": timeout,
+    }
+    if cancel is not None and cancel.is_set():
+        record.update(status="cancelled", wall_s=0.0)
+        return record
+
+    # Time spent finishing the entry in the archive, apart from queue_wait_s.
+    take_archive_wait = getattr(writer, "take_archive_wait", None)
+    if take_archive_wait is not None:
+        take_archive_wait()
+    log(step.desc)
+    cmd = step.cmd
+    if hasattr(cmd, "prepare") or not callable(cmd):
+        try:
+            if hasattr(cmd, "prepare"):
+                shell_cmd = cmd.prepare(min(timeout, EVENT_PROBE_TIMEOUT))
+            else:
+                shell_cmd = cmd
+        except Exception as e:
+            log(f"ERROR {step.filename}: {e}")
+            shell_cmd = None
+        if shell_cmd is not None:
+            remaining = max(1.0, timeout - (time.perf_counter() - started))
+            stats = run_command_to_report(shell_cmd, step.filename, writer, log, runner,
+                                          remaining, cancel)
+            record.update(exit_code=stats.returncode, cpu_s=stats.cpu_s, bytes=stats.bytes)
+            if stats.stopped:
+                record["status"] = stats.stopped
+            elif stats.returncode == 0:
+                record["status"] = "ok"
+                if hasattr(cmd, "commit"):
+                    cmd.commit()
+    else:
+        try:
+            stopped, data = _call_with_deadline(cmd, timeout, cancel)
+            if stopped == "timeout":
+                log(f"TIMEOUT: {step.filename} gave no result after {timeout:g}s")
+                record["status"] = stopped
+            elif stopped == "cancelled" or (cancel is not None and cancel.is_set()):
+                log(f"CANCELLED: {step.filename}")
+                record["status"] = "cancelled"
+            else:
+                if isinstance(data, str):
+                    data = data.encode("utf-8")
+                with writer.open(step.filename) as out:
+                    out.write(data)
+                record.update(status="ok", bytes=len(data))
+                log(f"OK: {step.filename}")
+        except Exception as e:
+            log(f"ERROR {step.filename}: {e}")
+    if take_archive_wait is not None:
+        record["archive_wait_s"] = round(take_archive_wait(), 3)
+    record["wall_s"] = round(time.perf_counter() - started, 3)
+    return record
+
+
+def run_diagnostic_steps(steps, writer: ReportWriter, events: queue.Queue,
+                         max_workers: int = DIAG_MAX_WORKERS, runner=None,
+                         cancel: threading.Event = None) -> list:
+    """
+    Run the collection steps on a bounded thread pool.
+    Every log line and progress update is posted to `events` as
+    ("log", text) / ("progress", pct); the caller decides how to show them.
+    Setting `cancel` kills the running commands and skips the queued ones.
+    Returns one manifest record per step (see _run_diag_step), in step order.
+    """
+    from concurrent.futures import ThreadPoolExecutor, as_completed
+
+    def log(text):
+        events.put(("log", text))
+
+    ordered = sorted(steps, key=lambda s: not s.slow)
+    total = len(ordered) or 1
+    done = 0
+    records = {}
+    with ThreadPoolExecutor(max_workers=max(1, max_workers),
+                            thread_name_prefix="diag") as pool:
+        futures = {
+            pool.submit(_run_diag_step, step, writer, log, runner,
+                        time.perf_counter(), cancel): step
+            for step in ordered
+        }
+        for fut in as_completed(futures):
+            step = futures[fut]
+            try:
+                records[step.filename] = fut.result()
+            except Exception as e:
+                log(f"ERROR: {e}")
+                records[step.filename] = {"file": step.filename, "desc": step.desc,
+                                          "status": "error", "error": str(e)}
+            done += 1
+            # Leave the last slice of the bar for the ZIP step.
+            events.put(("progress", done * 95 / total))
+    return [records[s.filename] for s in steps if s.filename in records]
+
+
+def _format_bytes(n) -> str:
+    n = float(n or 0)
+    for unit in ("B", "KB", "MB", "GB"):
+        if n < 1024 or unit == "GB":
+            return f"{n:.0f} {unit}" if unit == "B" else f"{n:.1f} {unit}"
+        n /= 1024
+
+
+def format_step_summary(records: list) -> list:
+    """Fixed-width table lines for the log widget, slowest step first."""
+    def num(value, fmt):
+        return "-" if value is None else format(value, fmt)
+
+    lines = [f"{'Step':<34} {'Status':<9} {'Wall s':>7} {'CPU s':>7} {'Exit':>5} "
+             f"{'Output':>10} {'Wait s':>7} {'Arch s':>7}"]
+    for r in sorted(records, key=lambda r: r.get("wall_s") or 0, reverse=True):
+        lines.append(
+            f"{r['file'][:34]:<34} {r.get('status', '-'):<9} {num(r.get('wall_s'), '.2f'):>7} "
+            f"{num(r.get('cpu_s'), '.2f'):>7} {num(r.get('exit_code'), 'd'):>5} "
+            f"{_format_bytes(r.get('bytes')):>10} {num(r.get('queue_wait_s'), '.2f'):>7} "
+            f"{num(r.get('archive_wait_s'), '.2f'):>7}"
+        )
+    return lines
+
+
+def build_manifest(records: list, started_at: datetime.datetime, wall_s: float,
+                   **settings) -> dict:
+    """Machine-readable description of one collection run (manifest.json in the ZIP)."""
+    return {
+        "manifest_version": 1,
+        "host": socket.gethostname(),
+        "platform": f"{platform.system()} {platform.release()}",
+        "started_at": started_at.isoformat(timespec="seconds"),
+        "wall_s": round(wall_s, 3),
+        "settings": settings,
+        "totals": {
+            "steps": len(records),
+            "ok": sum(1 for r in records if r.get("status") == "ok"),
+            "timeout": [r["file"] for r in records if r.get("status") == "timeout"],
+            "cancelled": [r["file"] for r in records if r.get("status") == "cancelled"],
+            "bytes": sum(r.get("bytes") or 0 for r in records),
+            "cpu_s": round(sum(r.get("cpu_s") or 0 for r in records), 3),
+        },
+        "steps": records,
+    }
+
+
+def collect_report(out_dir: Path, events: queue.Queue, cancel: threading.Event = None,
+                   max_workers: int = DIAG_MAX_WORKERS,
+                   compresslevel: int = REPORT_COMPRESSLEVEL,
+                   keep_folder: bool = REPORT_KEEP_FOLDER,
+                   incremental: bool = EVENT_INCREMENTAL,
+                   days: int = EVENT_WINDOW_DAYS,
+                   archive: str = REPORT_ARCHIVE):
+    """
+    Build one HelpdeskReport_<timestamp>.zip in `out_dir`, or with
+    archive="store" one report in REPORT_STORE_DIR; shared by the GUI and
+    the headless `collect` command. Returns (zip or stored report path, manifest).
+    """
+    cancel = cancel or threading.Event()
+    timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
+    folder_name = f"HelpdeskReport_{timestamp}"
+    report_dir = out_dir / folder_name
+    out_dir.mkdir(parents=True, exist_ok=True)
+
+    folder = report_dir if keep_folder else None
+    if archive == "store":
+        writer = StoreReportWriter(ReportStore(compresslevel=compresslevel), folder_name, folder)
+        zip_path = writer.path
+    else:
+        zip_path = report_dir.with_suffix(".zip")
+        writer = ReportWriter(zip_path, compresslevel, folder)
+    events = _LogTee(events)
+    events.put(("log", f"Report archive: {zip_path}"))
+    if keep_folder:
+        events.put(("log", f"Report folder: {report_dir}"))
+
+    bookmarks = EventBookmarks()
+    if incremental:
+        events.put(("log", "Event logs: incremental (only events since the last report)"))
+    if days:
+        events.put(("log", f"Event logs: limited to the last {days} day(s)"))
+
+    started_at = datetime.datetime.now()
+    t0 = time.perf_counter()
+    try:
+        steps = build_diag_steps(incremental, days, bookmarks)
+        records = run_diagnostic_steps(steps, writer, events, max_workers,
+                                       cancel=cancel)
+        manifest = build_manifest(
+            records, started_at, time.perf_counter() - t0,
+            max_workers=max_workers, compresslevel=compresslevel,
+            incremental=incremental, days=days, step_timeout=DIAG_STEP_TIMEOUT,
+            cancelled=cancel.is_set(), archive=archive
+        )
+        writer.write_text("manifest.json", json.dumps(manifest, indent=2))
+        for line in format_step_summary(records):
+            events.put(("log", line))
+        events.put(("log", "Finalizing ZIP archive..."))
+        writer.write_text("Diagnostic_Log.txt", events.text())
+    finally:
+        writer.close()
+    if archive == "store":
+        events.put(("log", f"New data stored: {_format_bytes(writer.store.new_bytes)} "
+                           f"for {_format_bytes(writer.bytes_written)} of artifacts"))
+
+    try:
+        bookmarks.save()
+    except OSError as e:
+        events.put(("log", f"ERROR saving event bookmarks: {e}"))
+
+    events.put(("progress", 100))
+    return zip_path, manifest
+
+
+def _diagnostic_worker(events: queue.Queue, cancel: threading.Event, max_workers: int,
+                       compresslevel: int, keep_folder: bool,
+                       incremental: bool, days: int, archive: str):
+    try:
+        zip_path, _ = collect_report(Path.home() / "Desktop", events, cancel, max_workers,
+                                     compresslevel, keep_folder, incremental, days, archive)
+        events.put(("cancelled" if cancel.is_set() else "done", zip_path))
+    except Exception as e:
+        events.put(("error", str(e)))
+
+
+def _pump_diagnostic_events(root: tk.Tk, log: LogPanel,
+                            progress_var: tk.DoubleVar, events: queue.Queue):
+    """Drain the worker queue on the Tk thread; reschedule until the run ends."""
+    finished = False
+    while True:
+        try:
+            kind, payload = events.get_nowait()
+        except queue.Empty:
+            break
+        if kind == "log":
+            log.push(payload)
+        elif kind == "progress":
+            progress_var.set(payload)
+        elif kind == "done":
+            finished = True
+            if payload.suffix == ".json":
+                show_info("Full Diagnostic", f"Report {payload.stem} saved in the report store.\n"
+                                             f"Export it as a ZIP from \"Stored Reports...\".")
+            else:
+                show_info("Full Diagnostic", f"Diagnostic package created:\n{payload}")
+        elif kind == "cancelled":
+            finished = True
+            show_info("Full Diagnostic",
+                      f"Diagnostic cancelled. Partial package (finished steps only):\n{payload}")
+        elif kind == "error":
+            finished = True
+            show_error("Diagnostic Error", payload)
+            log.push(f"ERROR: {payload}")
+
+    if finished:
+        _diag_running.clear()
+    else:
+        root.after(100, _pump_diagnostic_events, root, log, progress_var, events)
+
+
+_diag_running = threading.Event()
+_diag_cancel = threading.Event()
+
+
+def cancel_full_diagnostic():
+    """Ask a running collection to stop; finished steps are still packaged."""
+    if _diag_running.is_set():
+        _diag_cancel.set()
+
+
+def collect_full_diagnostic(root: tk.Tk, log: LogPanel, progress_var: tk.DoubleVar,
+                            max_workers: int = DIAG_MAX_WORKERS,
+                            compresslevel: int = REPORT_COMPRESSLEVEL,
+                            keep_folder: bool = REPORT_KEEP_FOLDER,
+                            incremental: bool = EVENT_INCREMENTAL,
+                            days: int = EVENT_WINDOW_DAYS,
+                            archive: str = REPORT_ARCHIVE):
+    """
+    Collect extended diagnostic data into a ZIP on the Desktop (or with
+    archive="store" into the report store; see "Stored Reports...").
+    Includes:
+    - Security log events (4624, 4625, 1102, 4672)
+    - System WHEA (18), BugCheck (1001)
+    - Windows Defender status+threats
+    - Systeminfo, network adapters, running processes
+    - DiskDrive info
+    - RAM_Health.txt
+    - SMART_Status.txt
+    - Diagnostic_Log.txt (this run's log)
+
+    The steps run on a background worker pool and stream their output
+    straight into the ZIP (plus a loose folder if `keep_folder`); this
+    function returns immediately and the Tk thread only drains the event queue.
+
+    With `incremental`, event logs only include events newer than the
+    previous report; `days` limits them to the last N days.
+    """
+    if _diag_running.is_set():
+        show_info("Full Diagnostic", "A diagnostic collection is already running.")
+        return
+
+    global _diag_cancel
+    log.clear()
+    progress_var.set(0)
+    _diag_running.set()
+    _diag_cancel = threading.Event()
+
+    events = queue.Queue()
+    threading.Thread(
+        target=_diagnostic_worker,
+        args=(events, _diag_cancel, max_workers, compresslevel, keep_folder, incremental, days,
+              archive),
+        name="diag-collector",
+        daemon=True
+    ).start()
+    _pump_diagnostic_events(root, log, progress_var, events)
+
+
+# =============================
+#   REPORT DIFF
+# =============================
+
+# Values that change on every run and would only add noise to the diff.
+SYSTEMINFO_VOLATILE = {"Available Physical Memory", "Virtual Memory: Available",
+                       "Virtual Memory: In Use"}
+# Newest new events listed per event file.
+DIFF_EVENT_SAMPLES = 10
+# Event fingerprints are spilled into this many hash partitions (kept in memory
+# up to DIFF_SPOOL_BYTES each, then on disk), so only one partition of dump A
+# is counted in memory at a time.
+DIFF_PARTITIONS = 64
+DIFF_SPOOL_BYTES = 256 * 1024
+
+_SYSTEMINFO_RE = re.compile(r"^(\S.*?):\s{2,}(.*)$")
+_KEY_VALUE_RE = re.compile(r"^\s*([^:]+?):\s*(.*)$")
+
+
+def parse_systeminfo(text: str) -> dict:
+    """
+    `systeminfo` output -> {key: value}; indented continuation lines are
+    joined with "; ". Values start in one column, which is taken from the
+    first padded line, because some keys contain ":" ("Virtual Memory: In Use")
+    and the longest ones are followed by a single space.
+    """
+    lines = text.splitlines()
+    column = next((m.start(2) for m in map(_SYSTEMINFO_RE.match, lines) if m), None)
+    info, key = {}, None
+    for line in lines:
+        if not line.strip():
+            continue
+        if line[0].isspace() or column is None or len(line) <= column:
+            if key and line[0].isspace():
+                value = line.strip()
+                info[key] = f"{info[key]}; {value}" if info[key] else value
+            continue
+        key = line[:column].rstrip().rstrip(":")
+        info[key] = line[column:].strip()
+    return info
+
+
+def _parse_blocks(text: str, is_header) -> dict:
+    """
+    {header: {key: value}} for files made of a non-indented header line
+    followed by indented "Key: value" lines (Network_Info.txt, DiskDrive_Info.txt).
+    Stops at the "----- raw ..." separator.
+    """
+    blocks, current = {}, None
+    for line in text.splitlines():
+        if line.startswith("-----"):
+            break
+        if line and not line[0].isspace():
+            current = blocks.setdefault(line.strip(), {}) if is_header(line) else None
+            continue
+        m = _KEY_VALUE_RE.match(line)
+        if current is not None and m:
+            current[m.group(1)] = m.group(2).strip()
+    return blocks
+
+
+def parse_network_info(text: str) -> dict:
+    """Adapters of Network_Info.txt (or an older ipconfig /all dump) -> {name: fields}."""
+    if "adapter " in text and "IP Address:" not in text:
+        return {a.name: {"IP Address": a.ip, "Subnet Mask": a.mask,
+                         "Default Gateway": ", ".join(a.gateway) or "N/A",
+                         "DNS Servers": ", ".join(a.dns) or "N/A",
+                         "MAC Address": a.mac, "State": "up" if a.is_up else "down"}
+                for a in parse_ipconfig(text)}
+    adapters = {}
+    for header, fields in _parse_blocks(text, lambda l: ": " not in l).items():
+        name, _, state = header.partition(" (")
+        if state:
+            fields["State"] = state.rstrip(")")
+        adapters[name] = fields
+    return adapters
+
+
+def parse_disk_info(text: str) -> dict:
+    """Disks of DiskDrive_Info.txt -> {serial (or header): fields}."""
+    disks = {}
+    for header, fields in _parse_blocks(text, lambda l: l.startswith("Disk ")).items():
+        fields["Model"] = header.split(": ", 1)[-1]
+        serial = fields.get("Serial", "N/A")
+        disks[serial if serial != "N/A" else header] = fields
+    return disks
+
+
+def parse_key_values(text: str) -> dict:
+    info = {}
+    for line in text.splitlines():
+        m = _KEY_VALUE_RE.match(line)
+        if m:
+            info[m.group(1)] = m.group(2).strip()
+    return info
+
+
+def _diff_dicts(a: dict, b: dict) -> dict:
+    """Changed keys of two flat dicts as {key: [old, new]} (None = missing)."""
+    return {k: [a.get(k), b.get(k)] for k in sorted(set(a) | set(b)) if a.get(k) != b.get(k)}
+
+
+def _diff_blocks(a: dict, b: dict) -> dict:
+    changed = {}
+    for key in sorted(set(a) & set(b)):
+        fields = _diff_dicts(a[key], b[key])
+        if fields:
+            changed[key] = fields
+    return {"added": sorted(set(b) - set(a)), "removed": sorted(set(a) - set(b)),
+            "changed": changed}
+
+
+def _event_fingerprint(buf: bytes, start: int, end: int) -> int:
+    """64-bit hash of an event block without its "Event[N]:" line (N is per-dump)."""
+    body = buf.find(b"\n", start, end) + 1 or start
+    return int.from_bytes(hashlib.blake2b(buf[body:end], digest_size=8).digest(), "little")
+
+
+_EVENT_ID_RE = re.compile(rb"^[ \t]*Event ID:[ \t]*(\d+)", re.M)
+_DIFF_A = struct.Struct("<Q")    # fingerprint
+_DIFF_B = struct.Struct("<QQI")  # fingerprint, offset in B, event ID
+
+
+def diff_event_streams(fa, fb, encoding: str = "utf-8") -> dict:
+    """
+    Events in dump B that are not in dump A, counted by event ID, plus how
+    many of A's events are gone from B. Events are compared as a multiset:
+    three identical logons in B against two in A are one new event.
+
+    Both dumps are streamed once; a 64-bit fingerprint per event goes to one
+    of DIFF_PARTITIONS spill files, and each partition is then matched on its
+    own, so memory holds about 1/DIFF_PARTITIONS of A's fingerprints (roughly
+    1.5 bytes per event of A) and disk 8 bytes per event of A, 20 of B.
+    wevtutil lists oldest first; the samples are the last DIFF_EVENT_SAMPLES
+    new events of B, read back by seeking `fb` (must be seekable) to each.
+    """
+    partitions = DIFF_PARTITIONS
+    parts_a = [tempfile.SpooledTemporaryFile(DIFF_SPOOL_BYTES) for _ in range(partitions)]
+    parts_b = [tempfile.SpooledTemporaryFile(DIFF_SPOOL_BYTES) for _ in range(partitions)]
+
+    def spill(parts, records) -> int:
+        """Write (partition, record) pairs; returns the number of records."""
+        count = 0
+        pending = [bytearray() for _ in parts]
+        for i, record in records:
+            count += 1
+            batch = pending[i]
+            batch += record
+            if len(batch) >= STREAM_CHUNK_SIZE:
+                parts[i].write(batch)
+                batch.clear()
+        for part, batch in zip(parts, pending):
+            part.write(batch)
+            part.seek(0)
+        return count
+
+    def records_a():
+        for buf, start, end, _ in iter_event_blocks(fa):
+            fp = _event_fingerprint(buf, start, end)
+            yield fp % partitions, _DIFF_A.pack(fp)
+
+    def records_b():
+        for buf, start, end, offset in iter_event_blocks(fb):
+            fp = _event_fingerprint(buf, start, end)
+            m = _EVENT_ID_RE.search(buf, start, end)
+            yield fp % partitions, _DIFF_B.pack(fp, offset, int(m.group(1)) if m else 0)
+
+    try:
+        a_count = spill(parts_a, records_a())
+        b_count = spill(parts_b, records_b())
+
+        new_by_id = Counter()
+        newest = []  # min-heap of the offsets of the newest new events
+        for part_a, part_b in zip(parts_a, parts_b):
+            left = Counter(fp for fp, in _DIFF_A.iter_unpack(part_a.read()))
+            # B's records are in event order, so matches use up A's copies oldest first.
+            for fp, offset, event_id in _DIFF_B.iter_unpack(part_b.read()):
+                if left[fp]:
+                    left[fp] -= 1
+                    continue
+                new_by_id[event_id] += 1
+                if len(newest) < DIFF_EVENT_SAMPLES:
+                    heapq.heappush(newest, offset)
+                elif offset > newest[0]:
+                    heapq.heapreplace(newest, offset)
+    finally:
+        for part in parts_a + parts_b:
+            part.close()
+
+    samples = []
+    for offset in sorted(newest):
+        fb.seek(offset)
+        buf, start, end, _ = next(iter_event_blocks(fb, STREAM_CHUNK_SIZE))
+        samples.append(_parse_event_block(buf, start, end, offset, encoding))
+    new = sum(new_by_id.values())
+    return {
+        "a_events": a_count,
+        "b_events": b_count,
+        "new": new,
+        "gone": a_count - (b_count - new),
+        "new_by_id": {str(k): v for k, v in sorted(new_by_id.items())},
+        "new_samples": [{
+            "event_id": rec.event_id,
+            "time": datetime.datetime.fromtimestamp(rec.time).isoformat(timespec="seconds")
+            if rec.time else None,
+            "account": rec.account, "ip": rec.ip, "source": rec.source,
+        } for rec in samples],
+    }
+
+
+def _zip_members(zf) -> dict:
+    """{file name: ZipInfo}, ignoring any folder prefix inside the archive."""
+    return {Path(info.filename).name: info for info in zf.infolist() if not info.is_dir()}
+
+
+def diff_reports(path_a: Path, path_b: Path) -> dict:
+    """
+    Structured comparison of two report ZIPs, read in place (nothing is
+    extracted). Members with equal CRC and size are treated as identical
+    without being read, and event dumps are streamed.
+    """
+    import zipfile
+    with zipfile.ZipFile(path_a) as za, zipfile.ZipFile(path_b) as zb:
+        ma, mb = _zip_members(za), _zip_members(zb)
+
+        def same(name):
+            return ma[name].CRC == mb[name].CRC and ma[name].file_size == mb[name].file_size
+
+        def texts(*names):
+            for name in names:
+                if name in ma and name in mb:
+                    return (za.read(ma[name]).decode("utf-8", "replace"),
+                            zb.read(mb[name]).decode("utf-8", "replace"))
+            return None
+
+        common = sorted(set(ma) & set(mb))
+        result = {
+            "a": str(path_a),
+            "b": str(path_b),
+            "files": {
+                "added": sorted(set(mb) - set(ma)),
+                "removed": sorted(set(ma) - set(mb)),
+                "changed": [n for n in common if not same(n)],
+            },
+        }
+
+        manifests = texts("manifest.json")
+        if manifests:
+            hosts = [json.loads(t or "{}").get("host") for t in manifests]
+            started = [json.loads(t or "{}").get("started_at") for t in manifests]
+            result["hosts"], result["started_at"] = hosts, started
+
+        pair = texts("SystemInfo.txt")
+        if pair:
+            a, b = (parse_systeminfo(t) for t in pair)
+            result["system"] = {k: v for k, v in _diff_dicts(a, b).items()
+                                if k not in SYSTEMINFO_VOLATILE}
+
+        pair = texts("Network_Info.txt", "Network_IpconfigAll.txt")
+        if pair:
+            result["network"] = _diff_blocks(*(parse_network_info(t) for t in pair))
+
+        pair = texts("DiskDrive_Info.txt")
+        if pair:
+            result["disks"] = _diff_blocks(*(parse_disk_info(t) for t in pair))
+
+        pair = texts("RAM_Health.txt")
+        if pair:
+            a, b = (parse_key_values(t) for t in pair)
+            result["ram"] = {"status": [a.get("Status"), b.get("Status")],
+                             "usage": [a.get("Usage"), b.get("Usage")]}
+
+        result["events"] = {}
+        for _, _, _, filename, _ in EVENT_STEPS:
+            if filename not in ma or filename not in mb:
+                continue
+            if same(filename):
+                result["events"][filename] = {"identical": True,
+                                              "new": 0, "gone": 0, "new_by_id": {}}
+                continue
+            with za.open(ma[filename]) as fa, zb.open(mb[filename]) as fb:
+                result["events"][filename] = dict(identical=False,
+                                                  **diff_event_streams(fa, fb))
+    return result
+
+
+def format_report_diff(diff: dict) -> str:
+    out = [f"A: {diff['a']}", f"B: {diff['b']}"]
+    if "hosts" in diff:
+        out.append(f"Hosts: {diff['hosts'][0]} -> {diff['hosts'][1]}   "
+                   f"({diff['started_at'][0]} -> {diff['started_at'][1]})")
+    files = diff["files"]
+    if files["added"] or files["removed"]:
+        out.append(f"Files added: {', '.join(files['added']) or '-'}; "
+                   f"removed: {', '.join(files['removed']) or '-'}")
+
+    if "ram" in diff:
+        status, usage = diff["ram"]["status"], diff["ram"]["usage"]
+        change = "unchanged" if status[0] == status[1] else f"{status[0]} -> {status[1]}"
+        out += ["", f"RAM status: {change} (usage {usage[0]} -> {usage[1]})"]
+
+    if diff.get("system"):
+        out += ["", "System info changes:"]
+        out += [f"  {k}: {a} -> {b}" for k, (a, b) in diff["system"].items()]
+
+    for title, key in (("Network adapters", "network"), ("Disks", "disks")):
+        section = diff.get(key)
+        if not section:
+            continue
+        if not (section["added"] or section["removed"] or section["changed"]):
+            out += ["", f"{title}: unchanged"]
+            continue
+        out += ["", f"{title}:"]
+        out += [f"  + {name}" for name in section["added"]]
+        out += [f"  - {name}" for name in section["removed"]]
+        for name, fields in section["changed"].items():
+            out.append(f"  ~ {name}")
+            out += [f"      {f}: {a} -> {b}" for f, (a, b) in fields.items()]
+
+    if diff["events"]:
+        out += ["", "Event logs:"]
+        for filename, ev in diff["events"].items():
+            if ev["identical"]:
+                out.append(f"  {filename}: identical")
+                continue
+            by_id = ", ".join(f"{k}: {v}" for k, v in ev["new_by_id"].items()) or "-"
+            out.append(f"  {filename}: {ev['new']} new ({by_id}), {ev['gone']} no longer present")
+            for s in ev["new_samples"]:
+                who = " ".join(v for v in (s["account"], s["ip"]) if v)
+                out.append(f"      {s['time']}  {s['event_id']}  {who}")
+    return "\n".join(out) + "\n"
+
+
+def compare_reports_dialog():
+    """Pick two report ZIPs and show their diff; the comparison runs off the Tk thread."""
+    try:
+        _load_tk()
+        from tkinter import filedialog
+        start = Path.home() / "Desktop"
+        kinds = [("Report ZIP", "*.zip")]
+        path_a = filedialog.askopenfilename(title="Before (report A)", initialdir=start,
+                                            filetypes=kinds)
+        if not path_a:
+            return
+        path_b = filedialog.askopenfilename(title="After (report B)",
+                                            initialdir=Path(path_a).parent, filetypes=kinds)
+        if not path_b:
+            return
+
+        window = tk.Toplevel()
+        window.title("Report Comparison")
+        text = tk.Text(window, width=110, height=40, wrap="none")
+        text.pack(fill=tk.BOTH, expand=True)
+        text.insert(tk.END, "Comparing...\n")
+        events = queue.Queue()
+
+        def worker():
+            try:
+                events.put(("done", format_report_diff(diff_reports(Path(path_a), Path(path_b)))))
+            except Exception as e:
+                events.put(("error", str(e)))
+
+        def pump():
+            try:
+                kind, payload = events.get_nowait()
+            except queue.Empty:
+                window.after(100, pump)
+                return
+            text.delete("1.0", tk.END)
+            text.insert(tk.END, payload if kind == "done" else f"ERROR: {payload}\n")
+
+        threading.Thread(target=worker, name="report-diff", daemon=True).start()
+        pump()
+    except Exception as e:
+        show_error("Compare Reports Error", str(e))
+
+
+# =============================
+#   FLEET (AGENT / COLLECTOR)
+# =============================
+
+# `agent` serves this machine's collectors over HTTP/1.1 with keep-alive;
+# `fleet` pulls them from many agents into one ZIP.
+AGENT_PORT = 8765
+AGENT_PROTOCOL = 2
+# Shared secret sent as X-Helpdesk-Token; required unless the agent only listens on loopback.
+AGENT_TOKEN_ENV = "HELPDESK_AGENT_TOKEN"
+AGENT_TOKEN_HEADER = "X-Helpdesk-Token"
+AGENT_LOOPBACK = ("127.0.0.1", "localhost", "::1")
+# Collection runs (step tables from /steps) an agent keeps; the oldest is dropped first.
+AGENT_MAX_RUNS = 32
+# Hosts collected at the same time, and keep-alive connections per host
+# (= artifacts of one host transferred in parallel).
+FLEET_CONCURRENCY = 16
+FLEET_CONNECTIONS_PER_HOST = 2
+# Whole-host budget in seconds (the slowest step is bounded by DIAG_STEP_TIMEOUT),
+# and the limit for opening one connection.
+FLEET_HOST_TIMEOUT = DIAG_STEP_TIMEOUT + 60
+FLEET_CONNECT_TIMEOUT = 5.0
+
+
+class _AgentStream:
+    """
+    ReportWriter stand-in for one /artifact response: whatever the step
+    writes goes straight to the socket as HTTP/1.1 chunks. A failed send
+    (collector gone) sets `cancel`, which kills the step's command.
+    """
+
+    def __init__(self, wfile, cancel: threading.Event):
+        self.wfile = wfile
+        self.cancel = cancel
+
+    @contextmanager
+    def open(self, name: str):
+        yield self
+
+    def write(self, data: bytes) -> int:
+        if data:
+            try:
+                self.wfile.write(b"".join((b"%x\r\n" % len(data), data, b"\r\n")))
+            except OSError:
+                self.cancel.set()
+                raise
+        return len(data)
+
+
+def create_agent_server(host: str = "127.0.0.1", port: int = AGENT_PORT, token: str = None,
+                        runner=None, log=None):
+    """
+    HTTP server exposing the collectors; call serve_forever() on it. Endpoints:
+      GET /health              host name, platform, available checks
+      GET /checks[/NAME]       HEALTH_CHECKS results as JSON
+      GET /steps[?days=N]      start a collection run; returns its id and artifact files
+      GET /artifact/FILE?run=ID
+                               runs that step of the run, streams the file (chunked) and
+                               sends its manifest record as the X-Step-Record trailer
+    Each connection gets its own thread, so one collector can fetch several
+    artifacts at once over its keep-alive connections. Every /steps call gets
+    its own step table, so collectors running at the same time do not share
+    event queries or bookmarks.
+    """
+    import hmac
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+    from urllib.parse import parse_qs, unquote, urlsplit
+
+    if not token and host not in AGENT_LOOPBACK:
+        raise ValueError(f"refusing to serve on {host} without a token")
+    log = log or (lambda text: None)
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        server_version = f"HelpdeskAgent/{AGENT_PROTOCOL}"
+
+        def log_message(self, fmt, *args):
+            log(f"{self.address_string()} {fmt % args}")
+
+        def _send_json(self, code: int, payload):
+            body = json.dumps(payload).encode("utf-8")
+            self.send_response(code)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            sent = self.headers.get(AGENT_TOKEN_HEADER, "")
+            if token and not hmac.compare_digest(sent.encode("utf-8"), token.encode("utf-8")):
+                self._send_json(403, {"error": "missing or wrong token"})
+                return
+            url = urlsplit(self.path)
+            parts = [unquote(p) for p in url.path.strip("/").split("/")]
+            query = parse_qs(url.query)
+
+            if parts == ["health"]:
+                self._send_json(200, {
+                    "host": socket.gethostname(),
+                    "platform": f"{platform.system()} {platform.release()}",
+                    "agent": AGENT_PROTOCOL,
+                    "checks": sorted(HEALTH_CHECKS),
+                })
+            elif parts[0] == "checks" and len(parts) <= 2:
+                names = parts[1:] or sorted(HEALTH_CHECKS)
+                unknown = [n for n in names if n not in HEALTH_CHECKS]
+                if unknown:
+                    self._send_json(404, {"error": f"unknown check: {unknown[0]}"})
+                else:
+                    self._send_json(200, run_health_checks(names))
+            elif parts == ["steps"]:
+                days = query.get("days", [None])[0]
+                try:
+                    days = int(days) if days else None
+                    if days is not None and days < 1:
+                        raise ValueError
+                except ValueError:
+                    self._send_json(400, {"error": f"days must be a positive integer: {days}"})
+                    return
+                steps = build_diag_steps(days=days, runner=runner)
+                run = os.urandom(8).hex()
+                with server.lock:
+                    server.runs[run] = {s.filename: s for s in steps}
+                    while len(server.runs) > AGENT_MAX_RUNS:
+                        del server.runs[next(iter(server.runs))]
+                self._send_json(200, {"run": run, "steps": [s.filename for s in steps]})
+            elif parts[0] == "artifact" and len(parts) == 2:
+                run = query.get("run", [None])[0]
+                with server.lock:
+                    steps = server.runs.get(run)
+                if steps is None:
+                    self._send_json(400 if run is None else 404,
+                                    {"error": f"unknown run: {run} (GET /steps first)"})
+                    return
+                step = steps.get(parts[1])
+                if step is None:
+                    self._send_json(404, {"error": f"unknown artifact: {parts[1]}"})
+                else:
+                    self._send_artifact(step)
+            else:
+                self._send_json(404, {"error": f"unknown path: {url.path}"})
+
+        def _send_artifact(self, step: DiagStep):
+            self.send_response(200)
+            self.send_header("Content-Type", "application/octet-stream")
+            self.send_header("Transfer-Encoding", "chunked")
+            self.send_header("Trailer", "X-Step-Record")
+            self.end_headers()
+            cancel = threading.Event()
+            record = _run_diag_step(step, _AgentStream(self.wfile, cancel), log, runner,
+                                    cancel=cancel)
+            if cancel.is_set():
+                self.close_connection = True
+                return
+            try:
+                self.wfile.write(b"0\r\nX-Step-Record: %s\r\n\r\n"
+                                 % json.dumps(record).encode("utf-8"))
+            except OSError:
+                self.close_connection = True
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    server.daemon_threads = True
+    server.lock = threading.Lock()
+    server.runs = {}
+    return server
+
+
+class _AgentConnection:
+    """
+    One keep-alive HTTP/1.1 connection to an agent over asyncio streams.
+    A request on a reused connection that the agent has meanwhile closed is
+    retried once on a fresh connection.
+    """
+
+    def __init__(self, target: ProbeTarget, token: str = None,
+                 connect_timeout: float = FLEET_CONNECT_TIMEOUT):
+        self.target = target
+        self.token = token
+        self.connect_timeout = connect_timeout
+        self.reader = self.writer = None
+        self.connects = 0
+
+    async def close(self):
+        writer, self.reader, self.writer = self.writer, None, None
+        if writer is not None:
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except OSError:
+                pass
+
+    async def get(self, path: str, sink=None):
+        """
+        GET `path`; returns (status, headers, body, trailers) with lower-case
+        header names. With `sink` the body is passed to sink.write() in pieces
+        and body is b"".
+        """
+        import asyncio
+        for attempt in (0, 1):
+            reused = self.writer is not None
+            if not reused:
+                self.reader, self.writer = await asyncio.wait_for(
+                    asyncio.open_connection(self.target.host, self.target.port),
+                    self.connect_timeout
+                )
+                self.connects += 1
+            try:
+                return await self._request(path, sink)
+            except (ConnectionError, asyncio.IncompleteReadError) as e:
+                await self.close()
+                if not reused or attempt or getattr(e, "answered", False):
+                    raise
+
+    async def _request(self, path: str, sink):
+        import asyncio
+        lines = [f"GET {path} HTTP/1.1", f"Host: {self.target.host}:{self.target.port}"]
+        if self.token:
+            lines.append(f"{AGENT_TOKEN_HEADER}: {self.token}")
+        self.writer.write(("\r\n".join(lines) + "\r\n\r\n").encode("latin-1"))
+        await self.writer.drain()
+
+        status_line = await self.reader.readline()
+        if not status_line:
+            raise ConnectionResetError("connection closed by agent")
+        try:
+            status = int(status_line.split()[1])
+            headers = await self._read_headers()
+            body = bytearray()
+            trailers = {}
+            write = sink.write if sink is not None else body.extend
+            if headers.get("transfer-encoding", "").lower() == "chunked":
+                while True:
+                    size = int((await self.reader.readline()).split(b";")[0], 16)
+                    if size == 0:
+                        trailers = await self._read_headers()
+                        break
+                    write(await self.reader.readexactly(size))
+                    await self.reader.readexactly(2)
+            else:
+                remaining = int(headers.get("content-length", 0))
+                while remaining:
+                    data = await self.reader.readexactly(min(remaining, STREAM_CHUNK_SIZE))
+                    write(data)
+                    remaining -= len(data)
+        except (ConnectionError, asyncio.IncompleteReadError) as e:
+            # Part of the response already arrived, so the request must not be repeated.
+            e.answered = True
+            raise
+        if headers.get("connection", "").lower() == "close":
+            await self.close()
+        return status, headers, bytes(body), trailers
+
+    async def _read_headers(self) -> dict:
+        headers = {}
+        while True:
+            line = await self.reader.readline()
+            if line in (b"\r\n", b"\n", b""):
+                return headers
+            key, _, value = line.decode("latin-1").partition(":")
+            headers[key.strip().lower()] = value.strip()
+
+
+def _fleet_member_prefix(target: ProbeTarget) -> str:
+    return re.sub(r"[^\w.-]", "_", target.label)
+
+
+async def _collect_host(target: ProbeTarget, record: dict, archive, token: str = None,
+                        artifacts=None, days: int = None,
+                        connections: int = FLEET_CONNECTIONS_PER_HOST,
+                        connect_timeout: float = FLEET_CONNECT_TIMEOUT, log=None):
+    """
+    Fetch health checks and every artifact of one agent into `archive`
+    (an async callable(name, fileobj)). Progress is kept in `record`, so a
+    host that times out still reports the artifacts it delivered.
+    """
+    import asyncio
+    from urllib.parse import quote
+    log = log or (lambda text: None)
+    prefix = _fleet_member_prefix(target)
+    conns = [_AgentConnection(target, token, connect_timeout)
+             for _ in range(max(1, connections))]
+
+    async def get_json(path):
+        status, _, body, _ = await conns[0].get(path)
+        payload = json.loads(body or b"{}")
+        if status != 200:
+            raise RuntimeError(f"{path}: HTTP {status} {payload.get('error', '')}".strip())
+        return payload
+
+    try:
+        info = await get_json("/health")
+        record["host"] = info.get("host")
+        if info.get("agent") != AGENT_PROTOCOL:
+            raise RuntimeError(f"agent protocol {info.get('agent')}, "
+                               f"this collector speaks {AGENT_PROTOCOL}")
+        checks = await get_json("/checks")
+        await archive(f"{prefix}/health.json",
+                      io.BytesIO(json.dumps(checks, indent=2).encode("utf-8")))
+        run = await get_json(f"/steps?days={days}" if days else "/steps")
+        names = run["steps"]
+        if artifacts:
+            names = [n for n in names if n in artifacts]
+        log(f"{target.label}: {record['host']}, {len(names)} artifact(s)")
+        pending = deque(names)
+
+        async def worker(conn):
+            while pending:
+                name = pending.popleft()
+                with tempfile.SpooledTemporaryFile(SPOOL_MAX_MEMORY) as spool:
+                    tee = _Tee(spool)
+                    status, _, _, trailers = await conn.get(
+                        f"/artifact/{quote(name)}?run={quote(run['run'])}", tee)
+                    if status == 200:
+                        step = json.loads(trailers.get("x-step-record") or "{}")
+                        spool.seek(0)
+                        await archive(f"{prefix}/{name}", spool)
+                    else:
+                        step = {"status": "error", "error": f"HTTP {status}"}
+                step.update(file=name, received=tee.bytes_written)
+                record["steps"].append(step)
+                record["bytes"] += tee.bytes_written
+                log(f"{target.label}: {step.get('status', 'error').upper()} {name} "
+                    f"({_format_bytes(tee.bytes_written)})")
+
+        await asyncio.gather(*(worker(c) for c in conns[:max(1, len(names))]))
+        record["status"] = "ok"
+    finally:
+        record["connections"] = sum(c.connects for c in conns)
+        for c in conns:
+            await c.close()
+
+
+async def collect_fleet_async(targets, zip_path: Path, token: str = None,
+                              concurrency: int = FLEET_CONCURRENCY,
+                              host_timeout: float = FLEET_HOST_TIMEOUT,
+                              connections: int = FLEET_CONNECTIONS_PER_HOST,
+                              artifacts=None, days: int = None,
+                              compresslevel: int = REPORT_COMPRESSLEVEL, log=None) -> dict:
+    """
+    Collect every target (ProbeTarget of an agent) into one ZIP with a
+    folder per host plus fleet_manifest.json; returns the manifest.
+    At most `concurrency` hosts run at once, each bounded by `host_timeout`.
+    Artifacts are spooled as they arrive and appended to the ZIP by a single
+    writer thread, so the event loop never blocks on compression. A host that
+    times out while one of its artifacts is being appended still gets that
+    member written whole.
+    """
+    import asyncio
+    from concurrent.futures import ThreadPoolExecutor
+    log = log or (lambda text: None)
+    loop = asyncio.get_running_loop()
+    writer = ReportWriter(zip_path, compresslevel)
+    zip_thread = ThreadPoolExecutor(max_workers=1, thread_name_prefix="fleet-zip")
+    limit = asyncio.Semaphore(max(1, concurrency))
+
+    def append(name, fileobj):
+        with writer.open(name) as out:
+            shutil.copyfileobj(fileobj, out, STREAM_CHUNK_SIZE)
+
+    async def archive(name, fileobj):
+        # A host timeout must not cut a copy short: the ZIP thread keeps reading
+        # `fileobj`, so the caller may only close it once the copy is done.
+        future = loop.run_in_executor(zip_thread, append, name, fileobj)
+        try:
+            await asyncio.shield(future)
+        except asyncio.CancelledError:
+            while not future.done():
+                try:
+                    await asyncio.wait([future])
+                except asyncio.CancelledError:
+                    pass
+            raise
+
+    async def run(target):
+        record = {"target": target.label, "host": None, "status": "error",
+                  "error": None, "wall_s": None, "bytes": 0, "steps": []}
+        async with limit:
+            t0 = time.perf_counter()
+            try:
+                await asyncio.wait_for(
+                    _collect_host(target, record, archive, token, artifacts, days,
+                                  connections, log=log),
+                    host_timeout
+                )
+            except asyncio.TimeoutError:
+                record.update(status="timeout", error=f"no result after {host_timeout:g}s")
+            except Exception as e:
+                record["error"] = f"{type(e).__name__}: {e}"
+            record["wall_s"] = round(time.perf_counter() - t0, 3)
+        if record["status"] != "ok":
+            log(f"{target.label}: {record['status'].upper()} {record['error']}")
+        return record
+
+    started_at = datetime.datetime.now()
+    t0 = time.perf_counter()
+    try:
+        records = await asyncio.gather(*(run(t) for t in targets))
+        manifest = {
+            "manifest_version": 1,
+            "collector": socket.gethostname(),
+            "started_at": started_at.isoformat(timespec="seconds"),
+            "wall_s": round(time.perf_counter() - t0, 3),
+            "settings": {"concurrency": concurrency, "host_timeout": host_timeout,
+                         "connections": connections, "artifacts": artifacts, "days": days},
+            "totals": {
+                "hosts": len(records),
+                "ok": sum(1 for r in records if r["status"] == "ok"),
+                "failed": [r["target"] for r in records if r["status"] != "ok"],
+                "bytes": sum(r["bytes"] for r in records),
+            },
+            "hosts": records,
+        }
+        await archive("fleet_manifest.json",
+                      io.BytesIO(json.dumps(manifest, indent=2).encode("utf-8")))
+    finally:
+        await loop.run_in_executor(zip_thread, writer.close)
+        zip_thread.shutdown()
+    return manifest
+
+
+def collect_fleet(targets, out_dir: Path, log=None, **options):
+    """Blocking wrapper: writes FleetReport_<timestamp>.zip; returns (zip path, manifest)."""
+    import asyncio
+    out_dir.mkdir(parents=True, exist_ok=True)
+    timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
+    zip_path = out_dir / f"FleetReport_{timestamp}.zip"
+    manifest = asyncio.run(collect_fleet_async(targets, zip_path, log=log, **options))
+    return zip_path, manifest
+
+
+def read_fleet_targets(specs, hosts_file: Path = None) -> list:
+    """ProbeTargets from HOST[:PORT] arguments plus a file with one per line (# comments)."""
+    specs = list(specs)
+    if hosts_file is not None:
+        for line in hosts_file.read_text(encoding="utf-8").splitlines():
+            line = line.split("#", 1)[0].strip()
+            if line:
+                specs.append(line)
+    return [parse_probe_target(s, default_port=AGENT_PORT) for s in dict.fromkeys(specs)]
+
+
+# =============================
+#   BENCHMARKS
+# =============================
+
+def _synthetic_events(count: int, seed: int = 1, start: float = None, step: float = 0.5):
+    """Yield `count` wevtutil /f:text-shaped logon events, one string each (\n line endings)."""
+    import random
+    rng = random.Random(seed)
+    if start is None:
+        start = time.time() - count * step
+    accounts = [f"user{i:04d}" for i in range(2000)] + ["Administrator", "svc_backup"]
+    ips = [f"10.{i // 250}.{i % 250}.{rng.randint(1, 254)}" for i in range(5000)]
+    ids = (4624, 4624, 4624, 4625, 4672)
+    for n in range(count):
+        ts = datetime.datetime.fromtimestamp(start + n * step, datetime.timezone.utc)
+        event_id = rng.choice(ids)
+        yield (
+            f"Event[{n}]:\n"
+            f"  Log Name: Security\n"
+            f"  Source: Microsoft-Windows-Security-Auditing\n"
+            f"  Date: {ts.strftime('%Y-%m-%dT%H:%M:%S')}.000Z\n"
+            f"  Event ID: {event_id}\n"
+            f"  Task: Logon\n"
+            f"  Level: Information\n"
+            f"  Computer: PC01\n"
+            f"  Description: \n"
+            f"Subject:\n"
+            f"\tAccount Name:\t\t-\n"
+            f"Account:\n"
+            f"\tAccount Name:\t\t{rng.choice(accounts)}\n"
+            f"Network Information:\n"
+            f"\tSource Network Address:\t{rng.choice(ips)}\n"
+            f"\n"
+        )
+
+
+def write_synthetic_wevtutil(path, count: int, seed: int = 1,
+                             start: float = None, step: float = 0.5):
+    """Write a wevtutil /f:text-shaped fixture of `count` logon events (for benchmarks)."""
+    with open(path, "w", encoding="utf-8", newline="\r\n") as f:
+        for event in _synthetic_events(count, seed, start, step):
+            f.write(event)
+
+
+def synthetic_wevtutil_bytes(count: int, seed: int = 1) -> bytes:
+    return "".join(_synthetic_events(count, seed)).replace("\n", "\r\n").encode("utf-8")
+
+
+def benchmark_event_index(count: int = 1_000_000, path=None) -> dict:
+    """Build a synthetic dump of `count` events, then time parsing/indexing and a triage query."""
+    tmp_dir = None
+    if path is None:
+        tmp_dir = tempfile.mkdtemp(prefix="helpdesk_bench_")
+        path = Path(tmp_dir) / "Security_synthetic.txt"
+    try:
+        t0 = time.perf_counter()
+        write_synthetic_wevtutil(path, count)
+        t1 = time.perf_counter()
+        index = EventIndex.from_file(path)
+        t2 = time.perf_counter()
+        top = index.failed_logons_by_account(3600).most_common(5)
+        t3 = time.perf_counter()
+        return {
+            "events": len(index),
+            "file_bytes": os.path.getsize(path),
+            "generate_s": round(t1 - t0, 3),
+            "index_s": round(t2 - t1, 3),
+            "events_per_s": round(len(index) / (t2 - t1)) if t2 > t1 else None,
+            "query_failed_logons_last_hour_ms": round((t3 - t2) * 1000, 3),
+            "top_failed_accounts": dict(top),
+        }
+    finally:
+        if tmp_dir:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+
+
+def _peak_rss_bytes():
+    """Peak resident set size of this process so far, or None if unknown."""
+    try:
+        import resource
+    except ImportError:
+        resource = None
+    if resource is not None:
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == "darwin" else peak * 1024
+    if psutil:
+        try:
+            return getattr(psutil.Process().memory_info(), "peak_wset", None)
+        except Exception:
+            pass
+    return None
+
+
+def _bench_recordings(event_bytes: int, latency: float) -> dict:
+    """Replay table for every command in build_diag_steps()."""
+    events = synthetic_wevtutil_bytes(2000)
+    return {
+        "/f:xml": b"<Event><System><EventRecordID>1000</EventRecordID></System></Event>",
+        "wevtutil qe Security": Replay(events, size=event_bytes),
+        "wevtutil qe System": Replay(events, size=max(1, event_bytes // 20)),
+        "Get-MpComputerStatus": Replay(b"AMServiceEnabled : True\r\n" * 80, latency=latency * 4),
+        "Get-MpThreatDetection": Replay(b"ThreatID : 2147519003\r\n" * 20, latency=latency * 4),
+        "systeminfo": Replay(b"Host Name:                 PC01\r\n" * 60, latency=latency * 2),
+        "Win32_DiskDrive": (b'{"drives":[{"Index":0,"Model":"Samsung SSD 980 PRO 1TB",'
+                            b'"SerialNumber":"S5GXNF0R","Size":1000202273280,'
+                            b'"FirmwareRevision":"5B2QGXA7","Status":"OK"}],"physical":[]}'),
+    }
+
+
+def benchmark_diagnostic_pipeline(event_mb: float = 50, latency: float = 0.2,
+                                  max_workers: int = DIAG_MAX_WORKERS,
+                                  compresslevel: int = REPORT_COMPRESSLEVEL,
+                                  keep_folder: bool = False) -> dict:
+    """
+    Run the full collection (build_diag_steps) against a ReplayRunner and
+    measure wall time, peak RSS and bytes written. Each Security query
+    returns `event_mb` MiB of synthetic events; `latency` is the base
+    per-command delay (PowerShell/systeminfo steps take a multiple of it).
+    """
+    runner = ReplayRunner(_bench_recordings(int(event_mb * 1024 * 1024), latency),
+                          latency=latency)
+    previous = set_command_runner(runner)
+    tmp_dir = Path(tempfile.mkdtemp(prefix="helpdesk_bench_"))
+    try:
+        zip_path = tmp_dir / "HelpdeskReport_bench.zip"
+        folder = tmp_dir / "HelpdeskReport_bench" if keep_folder else None
+        events = queue.Queue()
+        steps = build_diag_steps(runner=runner)
+
+        t0 = time.perf_counter()
+        writer = ReportWriter(zip_path, compresslevel, folder)
+        try:
+            records = run_diagnostic_steps(steps, writer, events, max_workers, runner)
+        finally:
+            writer.close()
+        wall = time.perf_counter() - t0
+
+        errors = []
+        while not events.empty():
+            kind, payload = events.get_nowait()
+            if kind == "log" and payload.startswith("ERROR"):
+                errors.append(payload)
+
+        disk_bytes = zip_path.stat().st_size
+        if folder is not None:
+            disk_bytes += sum(p.stat().st_size for p in folder.iterdir())
+        return {
+            "steps": len(steps),
+            "max_workers": max_workers,
+            "compresslevel": compresslevel,
+            "wall_s": round(wall, 3),
+            "peak_rss_bytes": _peak_rss_bytes(),
+            "bytes_written": writer.bytes_written,
+            "zip_bytes": zip_path.stat().st_size,
+            # Temp files of spooled (compressed) entries; the ZIP plus this is the peak disk use.
+            "peak_spill_bytes": writer.peak_spill_bytes,
+            "disk_bytes": disk_bytes,
+            "errors": errors,
+            # Longest single step: the best wall_s any number of workers can reach.
+            "critical_path_s": max((r.get("wall_s") or 0 for r in records), default=0),
+            "queue_wait_s": round(sum(r.get("queue_wait_s") or 0 for r in records), 3),
+            "archive_wait_s": round(sum(r.get("archive_wait_s") or 0 for r in records), 3),
+            "slowest_steps": {
+                r["file"]: r["wall_s"]
+                for r in sorted(records, key=lambda r: r.get("wall_s") or 0, reverse=True)[:5]
+            },
+        }
+    finally:
+        set_command_runner(previous)
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+
+# Benchmark keys where a bigger number is a regression.
+BENCH_REGRESSION_KEYS = ("wall_s", "peak_rss_bytes", "disk_bytes")
+
+
+def compare_benchmark(result: dict, baseline: dict, tolerance: float = 0.2) -> list:
+    """Return a message per BENCH_REGRESSION_KEYS value that grew more than `tolerance`."""
+    regressions = []
+    for key in BENCH_REGRESSION_KEYS:
+        new, old = result.get(key), baseline.get(key)
+        if isinstance(new, (int, float)) and isinstance(old, (int, float)) and old > 0:
+            if new > old * (1 + tolerance):
+                regressions.append(f"{key}: {old} -> {new} (+{(new / old - 1) * 100:.0f}%)")
+    return regressions
+
+
+# =============================
+#   METRICS HISTORY
+# =============================
+
+# How far back the in-memory history and the sparklines go.
+HISTORY_SECONDS = 3600
+
+
+class MetricsHistory:
+    """
+    Fixed-capacity ring buffer of live samples. Each metric is a
+    preallocated typed array (float32, timestamps float64), so memory is
+    the same after a minute or a month. Written by the sampler thread,
+    read by the Tk thread; both hold `lock` only for the copy/scan.
+    """
+
+    COLUMNS = ("cpu", "ram", "disk")
+
+    def __init__(self, capacity: int):
+        self.capacity = max(1, capacity)
+        self.times = array("d", bytes(8 * self.capacity))
+        self.columns = {name: array("f", bytes(4 * self.capacity)) for name in self.COLUMNS}
+        self.lock = threading.Lock()
+        self._next = 0
+        self._count = 0
+
+    def __len__(self):
+        return self._count
+
+    def append(self, snap):
+        with self.lock:
+            i = self._next
+            self.times[i] = snap.taken_at
+            for name, column in self.columns.items():
+                value = getattr(snap, name)
+                column[i] = math.nan if value is None else value
+            self._next = (i + 1) % self.capacity
+            if self._count < self.capacity:
+                self._count += 1
+
+    @property
+    def latest_time(self) -> float:
+        if not self._count:
+            return 0.0
+        return self.times[(self._next - 1) % self.capacity]
+
+    def summarize(self, name: str, seconds: float, buckets: int, now: float = None) -> list:
+        """
+        Downsample the last `seconds` of metric `name` into `buckets` equal
+        time slices, oldest first. Each slice is (min, max, avg), or None if
+        no sample fell into it.
+        """
+        column = self.columns[name]
+        lo = [0.0] * buckets
+        hi = [0.0] * buckets
+        total = [0.0] * buckets
+        count = [0] * buckets
+        with self.lock:
+            if now is None:
+                now = self.latest_time
+            start = now - seconds
+            width = seconds / buckets
+            i = self._next
+            for _ in range(self._count):
+                i = (i - 1) % self.capacity
+                t = self.times[i]
+                if t < start:
+                    break
+                b = min(buckets - 1, int((t - start) / width))
+                v = column[i]
+                if v != v:
+                    # NaN: metric was unavailable for this sample.
+                    continue
+                if count[b]:
+                    if v < lo[b]:
+                        lo[b] = v
+                    elif v > hi[b]:
+                        hi[b] = v
+                else:
+                    lo[b] = hi[b] = v
+                total[b] += v
+                count[b] += 1
+        return [(lo[b], hi[b], total[b] / count[b]) if count[b] else None
+                for b in range(buckets)]
+
+
+# =============================
+#   METRICS HISTORY (ON DISK)
+# =============================
+
+# Persist every live sample so "it was slow at 10am" can be checked later.
+# Off by default; `--record-history` turns it on for one GUI session.
+HISTORY_PERSIST = False
+HISTORY_DIR = APP_DATA_DIR / "history"
+# Samples are buffered and appended in batches: whichever limit is hit first.
+HISTORY_FLUSH_RECORDS = 60
+HISTORY_FLUSH_SECONDS = 60.0
+# One segment holds about a day at 1 Hz; older segments are deleted.
+HISTORY_SEGMENT_RECORDS = 86400
+HISTORY_RETENTION_DAYS = 14
+# How much history goes into the diagnostic report (0 disables the step).
+HISTORY_REPORT_HOURS = 48
+
+# Segment = 16-byte header + fixed-width little-endian records:
+# time (float64 epoch), cpu/ram/disk %, temp °C (float32, NaN = unknown),
+# cumulative net bytes sent/received (uint64).
+_HISTORY_MAGIC = b"HDMH"
+_HISTORY_VERSION = 1
+_HISTORY_HEADER = struct.Struct("<4sHH8x")
+_HISTORY_RECORD = struct.Struct("<dffffQQ")
+_HISTORY_TIME = struct.Struct("<d")
+
+HistoryRecord = namedtuple(
+    "HistoryRecord", ["time", "cpu", "ram", "disk", "temp", "net_sent", "net_recv"]
+)
+
+
+class HistoryWriter:
+    """
+    Appends StatsSnapshots to segment files in HISTORY_DIR. Records are
+    packed into a preallocated buffer and written with one append per
+    batch, so a 1 Hz sampler touches the disk about once a minute.
+    """
+
+    _active = weakref.WeakSet()
+
+    def __init__(self, directory: Path = HISTORY_DIR,
+                 flush_records: int = HISTORY_FLUSH_RECORDS,
+                 flush_seconds: float = HISTORY_FLUSH_SECONDS,
+                 segment_records: int = HISTORY_SEGMENT_RECORDS,
+                 retention_days: float = HISTORY_RETENTION_DAYS):
+        self.directory = directory
+        self.flush_records = max(1, flush_records)
+        self.flush_seconds = flush_seconds
+        self.segment_records = segment_records
+        self.retention_days = retention_days
+        self._buf = bytearray(self.flush_records * _HISTORY_RECORD.size)
+        self._pending = 0
+        self._first_pending = None
+        self._segment = None
+        self._segment_count = 0
+        self._last_flush = time.monotonic()
+        self._lock = threading.Lock()
+        HistoryWriter._active.add(self)
+
+    def append(self, snap):
+        temp = snap.temp_c if snap.temp_c is not None else math.nan
+        disk = snap.disk if snap.disk is not None else math.nan
+        with self._lock:
+            _HISTORY_RECORD.pack_into(
+                self._buf, self._pending * _HISTORY_RECORD.size, snap.taken_at,
+                snap.cpu, snap.ram, disk, temp, snap.net_sent, snap.net_recv
+            )
+            if not self._pending:
+                self._first_pending = snap.taken_at
+            self._pending += 1
+            if (self._pending >= self.flush_records
+                    or time.monotonic() - self._last_flush >= self.flush_seconds):
+                self._flush_locked()
+
+    def flush(self):
+        with self._lock:
+            self._flush_locked()
+
+    def close(self):
+        self.flush()
+        HistoryWriter._active.discard(self)
+
+    def _flush_locked(self):
+        self._last_flush = time.monotonic()
+        if not self._pending:
+            return
+        try:
+            if self._segment is None or self._segment_count >= self.segment_records:
+                self._rotate(self._first_pending)
+            with self._segment.open("ab") as f:
+                f.write(memoryview(self._buf)[:self._pending * _HISTORY_RECORD.size])
+            self._segment_count += self._pending
+        except OSError:
+            # A partial write would misalign every later record of this
+            # segment; the next batch starts a new one instead.
+            self._segment = None
+        self._pending = 0
+
+    def _rotate(self, first_time: float):
+        self.directory.mkdir(parents=True, exist_ok=True)
+        stamp = datetime.datetime.fromtimestamp(first_time).strftime("%Y%m%d_%H%M%S")
+        path = self.directory / f"metrics_{stamp}.bin"
+        n = 1
+        while path.exists():
+            path = self.directory / f"metrics_{stamp}_{n}.bin"
+            n += 1
+        with path.open("wb") as f:
+            f.write(_HISTORY_HEADER.pack(_HISTORY_MAGIC, _HISTORY_VERSION, _HISTORY_RECORD.size))
+        self._segment = path
+        self._segment_count = 0
+        self._prune()
+
+    def _prune(self):
+        cutoff = time.time() - self.retention_days * 86400
+        for path in self.directory.glob("metrics_*.bin"):
+            try:
+                if path != self._segment and path.stat().st_mtime < cutoff:
+                    path.unlink()
+            except OSError:
+                pass
+
+
+def flush_history_writers():
+    """Push buffered samples of every open HistoryWriter to disk."""
+    for writer in list(HistoryWriter._active):
+        writer.flush()
+
+
+def _history_bisect(view, count: int, t: float) -> int:
+    """First record index whose time is >= t (records are appended in time order)."""
+    lo, hi = 0, count
+    while lo < hi:
+        mid = (lo + hi) // 2
+        offset = _HISTORY_HEADER.size + mid * _HISTORY_RECORD.size
+        if _HISTORY_TIME.unpack_from(view, offset)[0] < t:
+            lo = mid + 1
+        else:
+            hi = mid
+    return lo
+
+
+def _read_history_segment(path: Path, start: float = None, end: float = None,
+                          raw: bool = False):
+    """
+    Records of one segment with start <= time < end, via mmap + binary search.
+    With `raw`, return the packed record bytes instead of HistoryRecords.
+    """
+    with path.open("rb") as f:
+        size = os.fstat(f.fileno()).st_size
+        if size <= _HISTORY_HEADER.size:
+            return b"" if raw else []
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            magic, version, record_size = _HISTORY_HEADER.unpack_from(mm, 0)
+            if magic != _HISTORY_MAGIC or record_size != _HISTORY_RECORD.size:
+                return b"" if raw else []
+            count = (size - _HISTORY_HEADER.size) // record_size
+            lo = _history_bisect(mm, count, start) if start is not None else 0
+            hi = _history_bisect(mm, count, end) if end is not None else count
+            a = _HISTORY_HEADER.size + lo * record_size
+            b = _HISTORY_HEADER.size + max(lo, hi) * record_size
+            if raw:
+                return mm[a:b]
+            with memoryview(mm) as view:
+                return [HistoryRecord._make(r) for r in _HISTORY_RECORD.iter_unpack(view[a:b])]
+
+
+def _history_segments(directory: Path, end: float = None) -> list:
+    """Segment paths (including exported single-file histories) that may hold data before `end`."""
+    if directory.is_file():
+        return [directory]
+    paths = sorted(directory.glob("metrics_*.bin"))
+    if end is None:
+        return paths
+    end_stamp = datetime.datetime.fromtimestamp(end).strftime("%Y%m%d_%H%M%S")
+    return [p for p in paths if p.stem[len("metrics_"):][:15] <= end_stamp]
+
+
+def read_history(start: float = None, end: float = None,
+                 directory: Path = HISTORY_DIR) -> list:
+    """HistoryRecords with start <= time < end from every segment (or one exported file)."""
+    records = []
+    for path in _history_segments(directory, end):
+        try:
+            records.extend(_read_history_segment(path, start, end))
+        except (OSError, ValueError):
+            pass
+    return records
+
+
+def history_report_bytes(hours: float = HISTORY_REPORT_HOURS,
+                         directory: Path = HISTORY_DIR) -> bytes:
+    """The last `hours` of history as one segment-format file (for the report ZIP)."""
+    flush_history_writers()
+    start = time.time() - hours * 3600
+    parts = [_HISTORY_HEADER.pack(_HISTORY_MAGIC, _HISTORY_VERSION, _HISTORY_RECORD.size)]
+    for path in _history_segments(directory):
+        try:
+            parts.append(_read_history_segment(path, start, raw=True))
+        except (OSError, ValueError):
+            pass
+    return b"".join(parts)
+
+
+# =============================
+#   VOLUMES / THROUGHPUT
+# =============================
+
+# Volume shown as "Disk" in the live status and used by the disk alert rule.
+SYSTEM_VOLUME = os.environ.get("SystemDrive", "C:") + "\\" if os.name == "nt" else "/"
+SYSTEM_VOLUME_LABEL = SYSTEM_VOLUME.rstrip("\\")
+# The partition list is only re-read when the mount table changes (Linux:
+# poll() on /proc/self/mounts, Windows: the drive-letter bitmask); elsewhere
+# at most this often.
+PARTITION_RESCAN_SECONDS = 60
+# Devices left out of the per-disk / per-NIC rates.
+DISK_IO_IGNORE = re.compile(r"^(loop|ram|zram)\d")
+NIC_IO_IGNORE = re.compile(r"^(lo\d*|Loopback Pseudo-Interface.*)$")
+SYS_BLOCK = Path("/sys/block")
+
+VolumeUsage = namedtuple("VolumeUsage", ["mount", "device", "fstype", "total", "used", "percent"])
+# Per-second rates since the previous sample.
+DiskRate = namedtuple("DiskRate", ["name", "read_bps", "write_bps", "read_iops", "write_iops"])
+NicRate = namedtuple("NicRate", ["name", "sent_bps", "recv_bps", "sent_pps", "recv_pps"])
+
+_DISK_IO_FIELDS = ("read_bytes", "write_bytes", "read_count", "write_count")
+_NIC_IO_FIELDS = ("bytes_sent", "bytes_recv", "packets_sent", "packets_recv")
+
+
+def _counter_rates(counters: dict, previous: dict, dt, fields, make, keep=None) -> tuple:
+    """
+    Rates of every device in `counters` (psutil's per-device namedtuples).
+    `previous` maps name -> array("d") of the last raw values and is updated
+    in place, so steady-state sampling keeps no per-sample dict or tuple of
+    old counters around. A counter that went backwards (reset or wrap) reads
+    as 0 for one sample; devices that vanished or are no longer kept are
+    dropped from `previous`.
+    """
+    rates = []
+    kept = 0
+    for name, counter in counters.items():
+        if keep is not None and not keep(name):
+            continue
+        kept += 1
+        last = previous.get(name)
+        if last is None:
+            previous[name] = array("d", [getattr(counter, f) for f in fields])
+            continue
+        values = []
+        for i, field in enumerate(fields):
+            value = getattr(counter, field)
+            delta = value - last[i]
+            last[i] = value
+            values.append(delta / dt if dt and delta >= 0 else 0.0)
+        rates.append(make(name, *values))
+    # Every kept device is in `previous` now, so any surplus is stale.
+    if len(previous) > kept:
+        for name in [n for n in previous
+                     if n not in counters or (keep is not None and not keep(n))]:
+            del previous[name]
+    return tuple(rates)
+
+
+class VolumeMonitor:
+    """
+    Usage of every mounted volume plus per-disk and per-NIC throughput and
+    IOPS, computed from psutil's cumulative counters between two sample()
+    calls. Used by StatsSampler once per live sample.
+    """
+
+    def __init__(self, rescan_seconds: float = PARTITION_RESCAN_SECONDS):
+        self.rescan_seconds = rescan_seconds
+        self.scans = 0
+        self._partitions = None
+        self._scanned_at = 0.0
+        self._signature = None
+        self._mounts = None
+        self._whole_disks = None
+        self._disk_last = {}
+        self._nic_last = {}
+        self._last_time = None
+
+    def _mounts_changed(self) -> bool:
+        if sys.platform.startswith("linux"):
+            if self._mounts is None:
+                try:
+                    import select
+                    f = open("/proc/self/mounts", "rb")
+                    poller = select.poll()
+                    poller.register(f, select.POLLPRI | select.POLLERR)
+                    self._mounts = (f, poller)
+                except (OSError, ImportError, AttributeError):
+                    self._mounts = False
+            if self._mounts:
+                # The kernel flags the open file once per mount/unmount.
+                return bool(self._mounts[1].poll(0))
+        elif os.name == "nt":
+            try:
+                import ctypes
+                signature = ctypes.windll.kernel32.GetLogicalDrives()
+                changed, self._signature = signature != self._signature, signature
+                return changed
+            except Exception:
+                pass
+        return time.monotonic() - self._scanned_at >= self.rescan_seconds
+
+    def partitions(self) -> list:
+        """psutil.disk_partitions(), re-read only after a mount change."""
+        if self._mounts_changed() or self._partitions is None:
+            self._partitions = psutil.disk_partitions(all=False)
+            self._scanned_at = time.monotonic()
+            self.scans += 1
+            # Linux also reports each partition's I/O; keep whole disks only.
+            try:
+                self._whole_disks = frozenset(os.listdir(SYS_BLOCK))
+            except OSError:
+                self._whole_disks = None
+        return self._partitions
+
+    def volumes(self) -> tuple:
+        out = []
+        for part in self.partitions():
+            try:
+                usage = psutil.disk_usage(part.mountpoint)
+            except Exception:
+                # Card readers / DVD drives without media.
+                continue
+            out.append(VolumeUsage(part.mountpoint, part.device, part.fstype,
+                                   usage.total, usage.used, usage.percent))
+        return tuple(out)
+
+    def _keep_disk(self, name: str) -> bool:
+        if DISK_IO_IGNORE.match(name):
+            return False
+        return self._whole_disks is None or name in self._whole_disks
+
+    def sample(self, now: float = None):
+        """(volumes, disk rates, NIC rates, (total bytes sent, total bytes received))."""
+        now = time.monotonic() if now is None else now
+        dt = now - self._last_time if self._last_time is not None else None
+        self._last_time = now
+        volumes = self.volumes()
+        try:
+            disks = psutil.disk_io_counters(perdisk=True) or {}
+        except Exception:
+            disks = {}
+        try:
+            nics = psutil.net_io_counters(pernic=True) or {}
+        except Exception:
+            nics = {}
+        disk_rates = _counter_rates(disks, self._disk_last, dt, _DISK_IO_FIELDS, DiskRate,
+                                    self._keep_disk)
+        nic_rates = _counter_rates(nics, self._nic_last, dt, _NIC_IO_FIELDS, NicRate,
+                                   lambda name: not NIC_IO_IGNORE.match(name))
+        totals = (sum(c.bytes_sent for c in nics.values()),
+                  sum(c.bytes_recv for c in nics.values()))
+        return volumes, disk_rates, nic_rates, totals
+
+
+def format_rate(bps) -> str:
+    return _format_bytes(bps) + "/s"
 
 
 # =============================
-#   RAM HEALTH (POPUP)
+#   LIVE STATS
 # =============================
 
-def check_ram_health():
-    try:
-        if not psutil:
-            show_error("RAM Health", "psutil is required.")
-            return
-
-        vm = psutil.virtual_memory()
-        total = round(vm.total / (1024**3), 2)
-        used = round(vm.used / (1024**3), 2)
-        percent = vm.percent
+# How often the sampler thread collects metrics, and how often the Tk side
+# looks at the latest snapshot. Host/IP come from the shared NETWORK cache.
+STATS_SAMPLE_INTERVAL = 1.0
+STATS_UI_INTERVAL_MS = 500
 
-        if percent < 85:
-            status = "OK"
-        elif percent < 95:
-            status = "WARNING – High Memory Usage"
-        else:
-            status = "CRITICAL – Memory Pressure"
+# temp is the display string; temp_c (°C or None) and the cumulative network
+# byte counters are kept for the history. disk is SYSTEM_VOLUME's percent
+# (None if it cannot be read); volumes / disk_io / net_io hold VolumeUsage,
+# DiskRate and NicRate tuples from VolumeMonitor.
+StatsSnapshot = namedtuple(
+    "StatsSnapshot",
+    ["cpu", "ram", "disk", "temp", "hostname", "ip", "taken_at",
+     "temp_c", "net_sent", "net_recv", "volumes", "disk_io", "net_io"],
+    defaults=(None, 0, 0, (), (), ())
+)
 
-        out = [
-            f"Total RAM: {total} GB",
-            f"Used RAM: {used} GB",
-            f"Usage: {percent}%",
-            f"Status: {status}",
-        ]
-        show_info("RAM Health", "\n".join(out))
-    except Exception as e:
-        show_error("RAM Health Error", str(e))
 
+class StatsSampler:
+    """
+    Collects live metrics on a daemon thread and publishes them as an
+    immutable StatsSnapshot. `latest` is replaced by a single reference
+    assignment, so readers never need a lock and never see a torn value.
+    """
 
-# =============================
-#   SMART STATUS (POPUP)
-# =============================
+    def __init__(self, interval: float = STATS_SAMPLE_INTERVAL,
+                 history: MetricsHistory = None, recorder=None,
+                 network: NetworkIdentity = None, listeners=(),
+                 volumes: VolumeMonitor = None):
+        self.base_interval = interval
+        self.ticker = _Ticker(interval)
+        self.network = network or NETWORK
+        self.volumes = volumes or VolumeMonitor()
+        self.history = history
+        self.recorder = recorder
+        # Further consumers with append(snap), called on the sampler thread.
+        self.listeners = list(listeners)
+        self.latest = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="stats-sampler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self.ticker.wake()
+        if self.recorder is not None:
+            self.recorder.close()
+
+    def sample(self) -> StatsSnapshot:
+        net_sent = net_recv = 0
+        volumes = disk_io = net_io = ()
+        disk = None
+        if psutil:
+            cpu = psutil.cpu_percent(interval=None)
+            ram = psutil.virtual_memory().percent
+            volumes, disk_io, net_io, (net_sent, net_recv) = self.volumes.sample()
+            for v in volumes:
+                if v.mount == SYSTEM_VOLUME:
+                    disk = v.percent
+            if disk is None:
+                # e.g. an overlay root, which is not listed as a physical partition
+                try:
+                    disk = psutil.disk_usage(SYSTEM_VOLUME).percent
+                except Exception:
+                    pass
+        else:
+            cpu = ram = 0.0
 
-def check_smart_status():
+        try:
+            host = self.network.snapshot()
+            hostname, ip = host.hostname, host.ip
+        except Exception:
+            hostname, ip = "N/A", "N/A"
+        temp_c = get_temperature_c()
+        return StatsSnapshot(cpu, ram, disk, format_temperature(temp_c), hostname, ip,
+                             time.time(), temp_c, net_sent, net_recv, volumes, disk_io, net_io)
+
+    def _tick(self):
+        snap = self.sample()
+        self.latest = snap
+        if self.history is not None:
+            self.history.append(snap)
+        if self.recorder is not None:
+            self.recorder.append(snap)
+        for listener in self.listeners:
+            listener.append(snap)
+
+    def _run(self):
+        self.ticker.run(self._stop, self._tick)
+
+
+def update_stats(cpu_label, ram_label, disk_label, temp_label, host_label, ip_label, root,
+                 sampler: StatsSampler, sparklines=None, shown: StatsSnapshot = None,
+                 scheduler=None):
+    """Show the sampler's latest snapshot. Runs on the Tk thread and does no I/O."""
+    snap = sampler.latest
     try:
-        proc = subprocess.run(
-            'wmic diskdrive get model,serialnumber,status',
-            capture_output=True,
-            text=True,
-            shell=True
-        )
+        if sparklines is not None and sampler.history is not None:
+            sparklines.refresh(sampler.history)
+        if snap is not None and snap is not shown:
+            if shown is None or snap.cpu != shown.cpu:
+                cpu_label.config(text=f"CPU: {snap.cpu:.1f}%")
+            if shown is None or snap.ram != shown.ram:
+                ram_label.config(text=f"RAM: {snap.ram:.1f}%")
+            if shown is None or snap.disk != shown.disk:
+                disk_label.config(text=f"Disk {SYSTEM_VOLUME_LABEL} "
+                                       + ("N/A" if snap.disk is None else f"{snap.disk:.1f}%"))
+            if shown is None or snap.temp != shown.temp:
+                temp_label.config(text=f"Temp: {snap.temp}")
+            if shown is None or snap.hostname != shown.hostname:
+                host_label.config(text=f"Host: {snap.hostname}")
+            if shown is None or snap.ip != shown.ip:
+                ip_label.config(text=f"IP: {snap.ip}")
+            shown = snap
+    except Exception:
+        pass
 
-        output = proc.stdout or ""
-        if not output.strip():
-            show_error("SMART Status", "No SMART data found.")
-            return
+    (scheduler or root).after(
+        STATS_UI_INTERVAL_MS,
+        update_stats,
+        cpu_label,
+        ram_label,
+        disk_label,
+        temp_label,
+        host_label,
+        ip_label,
+        root,
+        sampler,
+        sparklines,
+        shown,
+        scheduler
+    )
 
-        lines = output.strip().splitlines()
-        parsed = []
-        for line in lines[1:]:
-            parts = line.split()
-            if len(parts) >= 2:
-                model = " ".join(parts[:-2])
-                serial = parts[-2]
-                status = parts[-1]
-                parsed.append(f"Model: {model}\nSerial: {serial}\nStatus: {status}\n")
-
-        if parsed:
-            show_info("SMART Status", "\n".join(parsed))
-        else:
-            show_error("SMART Status", "Unable to parse SMART output.")
-    except Exception as e:
-        show_error("SMART Status Error", str(e))
 
+THROUGHPUT_COLUMNS = ("Device", "Read / Sent", "Write / Recv", "Reads/s / Pkts out",
+                      "Writes/s / Pkts in", "Used")
 
-# =============================
-#   FIX / REPAIR
-# =============================
 
-def flush_dns():
-    try:
-        proc = subprocess.run(
-            ["ipconfig", "/flushdns"],
-            capture_output=True,
-            text=True,
-            shell=True
-        )
-        if proc.returncode == 0:
-            show_info("Flush DNS", "DNS cache flushed successfully.")
-        else:
-            show_error("Flush DNS Error", proc.stdout or proc.stderr)
-    except Exception as e:
-        show_error("Flush DNS Error", str(e))
+def _throughput_rows(snap: StatsSnapshot) -> dict:
+    """{row id: values} for the throughput window: volumes, then disks, then adapters."""
+    rows = {}
+    for v in snap.volumes:
+        rows[f"vol:{v.mount}"] = (f"{v.mount} ({v.fstype})", "", "", "", "",
+                                  f"{v.percent:.1f}% of {_format_bytes(v.total)}")
+    for d in snap.disk_io:
+        rows[f"disk:{d.name}"] = (d.name, format_rate(d.read_bps), format_rate(d.write_bps),
+                                  f"{d.read_iops:.0f}", f"{d.write_iops:.0f}", "")
+    for n in snap.net_io:
+        rows[f"nic:{n.name}"] = (n.name, format_rate(n.sent_bps), format_rate(n.recv_bps),
+                                 f"{n.sent_pps:.0f}", f"{n.recv_pps:.0f}", "")
+    return rows
 
 
-def clear_temp():
+def show_throughput(sampler: StatsSampler):
+    """Live window with usage of every volume and per-disk / per-adapter I/O rates."""
     try:
-        temp_dir = os.environ.get("TEMP") or os.environ.get("TMP")
-        if not temp_dir:
-            show_error("Temp Cleanup", "Could not locate TEMP directory.")
-            return
-
-        deleted = 0
-        failed = 0
-        for name in os.listdir(temp_dir):
-            path = os.path.join(temp_dir, name)
-            try:
-                if os.path.isfile(path) or os.path.islink(path):
-                    os.remove(path)
-                    deleted += 1
-                elif os.path.isdir(path):
-                    shutil.rmtree(path, ignore_errors=True)
-                    deleted += 1
-            except Exception:
-                failed += 1
-
-        msg = f"Temp cleanup finished.\nDeleted items: {deleted}\nFailed: {failed}"
-        show_info("Temp Cleanup", msg)
+        _load_tk()
+        window = tk.Toplevel()
+        window.title("Disk & Network I/O")
+        tree = ttk.Treeview(window, columns=THROUGHPUT_COLUMNS, show="headings", height=14)
+        for col in THROUGHPUT_COLUMNS:
+            tree.heading(col, text=col)
+            tree.column(col, width=200 if col in ("Device", "Used") else 110, anchor="w")
+        tree.pack(fill="both", expand=True, padx=10, pady=10)
+
+        def refresh(shown=None):
+            if not window.winfo_exists():
+                return
+            snap = sampler.latest
+            if snap is not None and snap is not shown:
+                rows = _throughput_rows(snap)
+                for iid in tree.get_children():
+                    if iid not in rows:
+                        tree.delete(iid)
+                for iid, values in rows.items():
+                    if tree.exists(iid):
+                        tree.item(iid, values=values)
+                    else:
+                        tree.insert("", tk.END, iid=iid, values=values)
+                shown = snap
+            window.after(STATS_UI_INTERVAL_MS, refresh, shown)
+
+        refresh()
     except Exception as e:
-        show_error("Temp Cleanup Error", str(e))
+        show_error("Disk & Network I/O Error", str(e))
 
 
 # =============================
-#   TOOL LAUNCHERS
+#   METRICS EXPORTER
 # =============================
 
-def _open_with_start(target: str, title: str):
-    try:
-        subprocess.Popen(f'start "" "{target}"', shell=True)
-    except Exception as e:
-        show_error(f"{title} Error", str(e))
+# Port for the Prometheus exporter started with the GUI (None = off); the
+# headless `metrics` command serves the same page without the window.
+METRICS_EXPORTER_PORT = None
+METRICS_EXPORTER_BIND = "127.0.0.1"
+METRICS_DEFAULT_PORT = 9750
+METRICS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _prom_label(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def render_prometheus(snap: StatsSnapshot) -> str:
+    """One StatsSnapshot in the Prometheus text exposition format."""
+    def metric(name, kind, help_text, value, labels=""):
+        return (f"# HELP {name} {help_text}\n# TYPE {name} {kind}\n"
+                f"{name}{labels} {value!r}\n")
+
+    def family(name, help_text, label, rows):
+        """One gauge per device: rows are (device name, value)."""
+        if not rows:
+            return ""
+        lines = [f"# HELP {name} {help_text}", f"# TYPE {name} gauge"]
+        lines += [f'{name}{{{label}="{_prom_label(key)}"}} {float(value)!r}'
+                  for key, value in rows]
+        return "\n".join(lines) + "\n"
+
+    out = [
+        metric("helpdesk_info", "gauge", "Host name and primary IP of this machine.", 1,
+               f'{{hostname="{_prom_label(snap.hostname)}",ip="{_prom_label(snap.ip)}"}}'),
+        metric("helpdesk_cpu_percent", "gauge", "CPU usage in percent.", float(snap.cpu)),
+        metric("helpdesk_ram_percent", "gauge", "RAM usage in percent.", float(snap.ram)),
+    ]
+    if snap.disk is not None:
+        out.append(metric("helpdesk_disk_percent", "gauge", "System disk usage in percent.",
+                          float(snap.disk)))
+    if snap.temp_c is not None:
+        out.append(metric("helpdesk_temperature_celsius", "gauge",
+                          "CPU temperature in degrees Celsius.", float(snap.temp_c)))
+    out += [
+        metric("helpdesk_network_sent_bytes_total", "counter",
+               "Bytes sent on all interfaces.", int(snap.net_sent)),
+        metric("helpdesk_network_received_bytes_total", "counter",
+               "Bytes received on all interfaces.", int(snap.net_recv)),
+        metric("helpdesk_sample_timestamp_seconds", "gauge",
+               "Unix time the snapshot was taken.", round(snap.taken_at, 3)),
+        family("helpdesk_volume_used_percent", "Used space per mounted volume.", "mount",
+               [(v.mount, v.percent) for v in snap.volumes]),
+        family("helpdesk_volume_free_bytes", "Free space per mounted volume.", "mount",
+               [(v.mount, v.total - v.used) for v in snap.volumes]),
+        family("helpdesk_disk_read_bytes_per_second", "Read throughput per disk.", "disk",
+               [(d.name, d.read_bps) for d in snap.disk_io]),
+        family("helpdesk_disk_write_bytes_per_second", "Write throughput per disk.", "disk",
+               [(d.name, d.write_bps) for d in snap.disk_io]),
+        family("helpdesk_disk_reads_per_second", "Read operations per second per disk.",
+               "disk", [(d.name, d.read_iops) for d in snap.disk_io]),
+        family("helpdesk_disk_writes_per_second", "Write operations per second per disk.",
+               "disk", [(d.name, d.write_iops) for d in snap.disk_io]),
+        family("helpdesk_nic_sent_bytes_per_second", "Send throughput per network adapter.",
+               "nic", [(n.name, n.sent_bps) for n in snap.net_io]),
+        family("helpdesk_nic_received_bytes_per_second",
+               "Receive throughput per network adapter.", "nic",
+               [(n.name, n.recv_bps) for n in snap.net_io]),
+    ]
+    return "".join(out)
+
+
+class MetricsExporter:
+    """
+    Serves the latest StatsSnapshot at /metrics in Prometheus text format.
 
+    The sampler calls append() once per sample, which renders the complete
+    HTTP response (status line, headers and body) into one bytes object and
+    publishes it by reference assignment. A scrape only writes that buffer,
+    so any number of concurrent scrapers never calls psutil, never takes a
+    lock shared with the sampler and never delays the next sample.
+    """
 
-def open_task_manager():
-    _open_with_start("taskmgr", "Task Manager")
+    def __init__(self, host: str = METRICS_EXPORTER_BIND, port: int = METRICS_DEFAULT_PORT):
+        self.host = host
+        self.port = port
+        self.response = self._encode(
+            "503 Service Unavailable", b"# no sample yet\n", ("Retry-After", "1")
+        )
+        self.samples = 0
+        self._server = None
+
+    @staticmethod
+    def _encode(status: str, body: bytes, *headers) -> bytes:
+        lines = [f"HTTP/1.1 {status}", f"Content-Type: {METRICS_CONTENT_TYPE}",
+                 f"Content-Length: {len(body)}"]
+        lines += [f"{key}: {value}" for key, value in headers]
+        return ("\r\n".join(lines) + "\r\n\r\n").encode("latin-1") + body
+
+    def append(self, snap: StatsSnapshot):
+        self.response = self._encode("200 OK", render_prometheus(snap).encode("utf-8"))
+        self.samples += 1
+
+    def start(self):
+        """Bind and serve on daemon threads; raises OSError if the port is taken."""
+        if self._server is not None:
+            return
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+        exporter = self
 
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
 
-def open_services():
-    _open_with_start("services.msc", "Services")
+            def log_message(self, fmt, *args):
+                pass
 
+            def do_GET(self):
+                if self.path.split("?", 1)[0] in ("/metrics", "/"):
+                    self.wfile.write(exporter.response)
+                else:
+                    self.wfile.write(exporter._encode("404 Not Found", b"not found\n"))
 
-def open_event_viewer():
-    _open_with_start("eventvwr.msc", "Event Viewer")
+        self._server = ThreadingHTTPServer((self.host, self.port), Handler)
+        self._server.daemon_threads = True
+        self.port = self._server.server_address[1]
+        threading.Thread(target=self._server.serve_forever, name="metrics-exporter",
+                         daemon=True).start()
 
+    def stop(self):
+        server, self._server = self._server, None
+        if server is not None:
+            server.shutdown()
+            server.server_close()
 
-def open_network_connections():
-    _open_with_start("ncpa.cpl", "Network Connections")
 
+# =============================
+#   ALERT RULES
+# =============================
 
-def open_control_panel():
-    _open_with_start("control", "Control Panel")
+# name       - shown in the log and used as the alert's identity
+# metric     - StatsSnapshot field: "cpu", "ram", "disk" (percent) or "temp_c" (°C)
+# op         - ">" fires at or above threshold, "<" at or below it
+# threshold  - value that starts the alert (reaching it counts, as in threshold_status)
+# clear      - hysteresis: the alert ends once the value is past this (None = threshold)
+# for_s      - debounce: the condition must hold this long before firing
+# window_s   - seconds the aggregate looks back (0 = latest sample only)
+# aggregate  - "avg" over the window, or "rate" = change per minute across it
+# severity   - "WARNING" or "CRITICAL"
+# diagnostic - start a full diagnostic collection when it fires (see ALERT_AUTO_DIAGNOSTIC)
+AlertRule = namedtuple(
+    "AlertRule",
+    ["name", "metric", "op", "threshold", "clear", "for_s", "window_s", "aggregate",
+     "severity", "diagnostic"],
+    defaults=(None, 0.0, 0.0, "avg", "WARNING", False)
+)
+
+ALERT_RULES = [
+    AlertRule("CPU high", "cpu", ">", 90, clear=80, for_s=30),
+    AlertRule("RAM high", "ram", ">", 85, clear=80, for_s=10),
+    AlertRule("RAM critical", "ram", ">", 95, clear=90, for_s=10, severity="CRITICAL"),
+    AlertRule("Disk almost full", "disk", ">", 95, clear=93, severity="CRITICAL"),
+    AlertRule("Temperature rising", "temp_c", ">", 10, clear=5, window_s=60,
+              aggregate="rate"),
+    AlertRule("Temperature critical", "temp_c", ">", 90, clear=85, for_s=10,
+              severity="CRITICAL"),
+]
+# Optional JSON list of rule objects (AlertRule fields) replacing ALERT_RULES.
+ALERT_RULES_FILE = APP_DATA_DIR / "alert_rules.json"
+# Let rules with diagnostic=True start a collection, at most once per cooldown.
+ALERT_AUTO_DIAGNOSTIC = False
+ALERT_DIAGNOSTIC_COOLDOWN = 3600
+ALERT_METRICS = ("cpu", "ram", "disk", "temp_c")
+ALERT_SEVERITIES = ("OK", "WARNING", "CRITICAL")
+ALERT_COLORS = {"WARNING": "orange", "CRITICAL": "red"}
+
+# One state change of a rule: state is "firing" or "resolved".
+AlertEvent = namedtuple("AlertEvent", ["rule", "state", "value", "at"])
+
+
+def load_alert_rules(path: Path = ALERT_RULES_FILE) -> list:
+    """Parse and validate a rules file; raises OSError / ValueError."""
+    with path.open("r", encoding="utf-8") as f:
+        raw = json.load(f)
+    if not isinstance(raw, list):
+        raise ValueError(f"{path.name}: expected a list of rules")
+    rules = []
+    for entry in raw:
+        try:
+            rule = AlertRule(**entry)
+        except TypeError as e:
+            raise ValueError(f"{path.name}: {e}") from None
+        if rule.metric not in ALERT_METRICS:
+            raise ValueError(f"{rule.name}: unknown metric {rule.metric!r}")
+        if rule.op not in (">", "<"):
+            raise ValueError(f"{rule.name}: op must be '>' or '<'")
+        if rule.aggregate not in ("avg", "rate"):
+            raise ValueError(f"{rule.name}: aggregate must be 'avg' or 'rate'")
+        if rule.severity not in ALERT_SEVERITIES[1:]:
+            raise ValueError(f"{rule.name}: unknown severity {rule.severity!r}")
+        rules.append(rule)
+    return rules
+
+
+_alert_rules = None
+_alert_rules_error = None
+
+
+def alert_rules() -> list:
+    """Rules from ALERT_RULES_FILE if present and valid, else ALERT_RULES. Read once."""
+    global _alert_rules, _alert_rules_error
+    if _alert_rules is None:
+        try:
+            _alert_rules = load_alert_rules()
+        except FileNotFoundError:
+            _alert_rules = list(ALERT_RULES)
+        except (OSError, ValueError) as e:
+            _alert_rules_error = f"{ALERT_RULES_FILE}: {e}"
+            _alert_rules = list(ALERT_RULES)
+    return _alert_rules
 
 
-def open_rdp():
-    _open_with_start("mstsc", "RDP")
+def threshold_status(metric: str, value: float, rules=None) -> str:
+    """
+    "OK" or the highest severity whose threshold `value` has reached right
+    now, for one-off checks like the RAM popup (windows and debounce do not
+    apply; reaching the threshold counts). If the active rules have none for
+    `metric`, the ALERT_RULES defaults for it are used.
+    """
+    rules = alert_rules() if rules is None else rules
+    matching = [r for r in rules if r.metric == metric and r.aggregate != "rate"]
+    if not matching:
+        matching = [r for r in ALERT_RULES if r.metric == metric and r.aggregate != "rate"]
+    status = "OK"
+    for rule in matching:
+        crossed = value >= rule.threshold if rule.op == ">" else value <= rule.threshold
+        if crossed and ALERT_SEVERITIES.index(rule.severity) > ALERT_SEVERITIES.index(status):
+            status = rule.severity
+    return status
+
+
+class _RuleState:
+    """Running window aggregate plus firing/debounce state of one rule."""
+
+    __slots__ = ("window", "total", "pending_since", "clear_since", "firing")
+
+    def __init__(self):
+        self.window = deque()
+        self.total = 0.0
+        self.pending_since = None
+        self.clear_since = None
+        self.firing = False
+
+    def aggregate(self, rule: AlertRule, t: float, value: float):
+        """Push one sample and return the rule's current value (None = not enough data)."""
+        if not rule.window_s:
+            return value
+        window = self.window
+        window.append((t, value))
+        self.total += value
+        while window[0][0] < t - rule.window_s:
+            self.total -= window.popleft()[1]
+        if rule.aggregate == "rate":
+            t0, v0 = window[0]
+            # Wait for half a window so a single noisy step is not a "rate".
+            if t - t0 < rule.window_s / 2:
+                return None
+            return (value - v0) * 60.0 / (t - t0)
+        return self.total / len(window)
+
+
+class AlertEngine:
+    """
+    Evaluates every rule on each StatsSnapshot (as a StatsSampler listener).
+    Each rule keeps a running sum over a deque of its window, so a sample
+    costs O(1) amortized per rule however long the window is.
+
+    A rule fires once the value has reached `threshold` (the same test as
+    threshold_status) for `for_s`, and resolves once it is strictly back past
+    `clear` for `for_s`; values in between change nothing. State changes go
+    to `on_event(AlertEvent)` on the sampler thread, and `active` ({name:
+    AlertEvent}) is replaced by a new dict on every change, so the Tk thread
+    can read it without a lock.
+    """
 
+    def __init__(self, rules=None, on_event=None):
+        self.rules = list(alert_rules() if rules is None else rules)
+        self.on_event = on_event
+        self.active = {}
+        self._states = [_RuleState() for _ in self.rules]
+
+    def append(self, snap: StatsSnapshot):
+        t = snap.taken_at
+        for rule, state in zip(self.rules, self._states):
+            value = getattr(snap, rule.metric, None)
+            if value is None:
+                continue
+            value = state.aggregate(rule, t, value)
+            if value is None:
+                continue
+            if rule.op == ">":
+                hot, cold = value >= rule.threshold, value < _rule_clear(rule)
+            else:
+                hot, cold = value <= rule.threshold, value > _rule_clear(rule)
+
+            if not state.firing:
+                if not hot:
+                    state.pending_since = None
+                    continue
+                if state.pending_since is None:
+                    state.pending_since = t
+                if t - state.pending_since >= rule.for_s:
+                    state.firing, state.clear_since = True, None
+                    self._emit(AlertEvent(rule, "firing", value, t))
+            else:
+                if not cold:
+                    state.clear_since = None
+                    continue
+                if state.clear_since is None:
+                    state.clear_since = t
+                if t - state.clear_since >= rule.for_s:
+                    state.firing, state.pending_since = False, None
+                    self._emit(AlertEvent(rule, "resolved", value, t))
+
+    def _emit(self, event: AlertEvent):
+        active = dict(self.active)
+        if event.state == "firing":
+            active[event.rule.name] = event
+        else:
+            active.pop(event.rule.name, None)
+        self.active = active
+        if self.on_event is not None:
+            self.on_event(event)
 
-def open_windows_defender():
-    _open_with_start("windowsdefender:", "Windows Defender")
+    def severity(self, metric: str) -> str:
+        """Highest severity among the active alerts on `metric` ("OK" if none)."""
+        status = "OK"
+        for event in self.active.values():
+            if (event.rule.metric == metric and ALERT_SEVERITIES.index(event.rule.severity)
+                    > ALERT_SEVERITIES.index(status)):
+                status = event.rule.severity
+        return status
 
 
-def open_windows_update():
-    _open_with_start("ms-settings:windowsupdate", "Windows Update")
+def _rule_clear(rule: AlertRule) -> float:
+    return rule.threshold if rule.clear is None else rule.clear
 
 
-def open_registry_editor():
-    _open_with_start("regedit", "Registry Editor")
+def format_alert_event(event: AlertEvent) -> str:
+    rule = event.rule
+    unit = "°C/min" if rule.aggregate == "rate" else ("°C" if rule.metric == "temp_c" else "%")
+    if event.state == "firing":
+        return (f"ALERT {rule.severity}: {rule.name} ({rule.metric} {rule.op} "
+                f"{rule.threshold:g}{unit}, now {event.value:.1f}{unit})")
+    return f"RESOLVED: {rule.name} (now {event.value:.1f}{unit})"
 
 
-def open_troubleshooter():
-    _open_with_start("ms-settings:troubleshoot", "Troubleshooter")
+def _pump_alert_events(root: tk.Tk, engine: AlertEngine, events: queue.SimpleQueue,
+                       labels: dict, log: LogPanel, progress_var: tk.DoubleVar,
+                       scheduler=None, shown: dict = None, last_diagnostic: float = None):
+    """
+    Tk side of the alert engine: log state changes, start an automatic
+    diagnostic for rules that ask for one, and colour the live labels.
+    """
+    while True:
+        try:
+            event = events.get_nowait()
+        except queue.Empty:
+            break
+        log.push(format_alert_event(event))
+        if (event.state == "firing" and event.rule.diagnostic and ALERT_AUTO_DIAGNOSTIC
+                and not _diag_running.is_set()
+                and (last_diagnostic is None
+                     or time.monotonic() - last_diagnostic >= ALERT_DIAGNOSTIC_COOLDOWN)):
+            last_diagnostic = time.monotonic()
+            log.push(f"Starting automatic diagnostic for alert: {event.rule.name}")
+            collect_full_diagnostic(root, log, progress_var)
+
+    shown = shown or {}
+    for metric, label in labels.items():
+        color = ALERT_COLORS.get(engine.severity(metric), "white")
+        if shown.get(metric) != color:
+            try:
+                label.config(foreground=color)
+            except Exception:
+                pass
+            shown[metric] = color
+    (scheduler or root).after(STATS_UI_INTERVAL_MS, _pump_alert_events, root, engine, events,
+                              labels, log, progress_var, scheduler, shown, last_diagnostic)
 
 
 # =============================
-#   DIAGNOSTIC REPORT
+#   SPARKLINES
 # =============================
 
-def log_line(widget: tk.Text, text: str):
-    ts = datetime.datetime.now().strftime("%H:%M:%S")
-    widget.insert(tk.END, f"[{ts}] {text}\n")
-    widget.see(tk.END)
+# (button text, seconds) for the sparkline window selector.
+SPARKLINE_WINDOWS = (("1 min", 60), ("5 min", 300), ("60 min", 3600))
+SPARKLINE_WIDTH = 150
+SPARKLINE_HEIGHT = 30
+SPARKLINE_BUCKETS = 60
 
 
-def run_command_to_file(cmd: str, outfile: Path, log_widget: tk.Text):
+class Sparkline:
     """
-    Run a shell command and dump output into a text file.
-    If return code != 0, we log a clear message (e.g. for Security logs when not Admin).
+    One metric drawn as an avg line over a min/max band on a small Canvas.
+    Both items are created once; a refresh only calls coords() on an item
+    whose (integer pixel) coordinates actually changed.
     """
-    try:
-        with outfile.open("w", encoding="utf-8", errors="ignore") as f:
-            proc = subprocess.run(
-                cmd,
-                stdout=f,
-                stderr=subprocess.STDOUT,
-                text=True,
-                shell=True
-            )
-        if proc.returncode == 0:
-            log_line(log_widget, f"OK: {outfile.name}")
-        else:
-            log_line(
-                log_widget,
-                f"ERROR (code {proc.returncode}) while running command for {outfile.name}. "
-                f"If this is a Security log, run as Administrator."
-            )
-    except Exception as e:
-        log_line(log_widget, f"ERROR writing {outfile.name}: {e}")
 
+    def __init__(self, parent, title: str, width: int = SPARKLINE_WIDTH,
+                 height: int = SPARKLINE_HEIGHT):
+        self.width = width
+        self.height = height
+        self.frame = ttk.Frame(parent)
+        self.label = ttk.Label(self.frame, text=title, width=18)
+        self.canvas = tk.Canvas(self.frame, width=width, height=height, bg="#000000",
+                                highlightthickness=0)
+        self.band = self.canvas.create_polygon(0, 0, 0, 0, 0, 0, fill="#1f4f1f", outline="")
+        self.line = self.canvas.create_line(0, 0, 0, 0, fill="#00ff00")
+        self.title = title
+        self._coords = {}
+        self._text = None
+        self.label.pack(side="top", anchor="w")
+        self.canvas.pack(side="top")
+
+    def _set_coords(self, item, coords: tuple):
+        if self._coords.get(item) != coords:
+            self.canvas.coords(item, *coords)
+            self._coords[item] = coords
+
+    def _y(self, value: float) -> int:
+        value = min(100.0, max(0.0, value))
+        return round((self.height - 2) * (1 - value / 100.0)) + 1
+
+    def draw(self, summary: list):
+        n = len(summary)
+        step = (self.width - 1) / max(1, n - 1)
+        upper, lower, line = [], [], []
+        for i, cell in enumerate(summary):
+            if cell is None:
+                continue
+            x = round(i * step)
+            lo, hi, avg = cell
+            upper += [x, self._y(hi)]
+            lower = [x, self._y(lo)] + lower
+            line += [x, self._y(avg)]
+
+        if len(line) < 4:
+            self._set_coords(self.line, (0, 0, 0, 0))
+            self._set_coords(self.band, (0, 0, 0, 0, 0, 0))
+        else:
+            self._set_coords(self.line, tuple(line))
+            self._set_coords(self.band, tuple(upper + lower))
 
-def collect_full_diagnostic(root: tk.Tk, log_widget: tk.Text, progress_var: tk.DoubleVar):
-    """
-    Collect extended diagnostic data into a folder on Desktop and zip it.
-    Includes:
-    - Security log events (4624, 4625, 1102, 4672)
-    - System WHEA (18), BugCheck (1001)
-    - Windows Defender status+threats
-    - Systeminfo, ipconfig /all, tasklist /v
-    - DiskDrive info
-    - RAM_Health.txt
-    - SMART_Status.txt
-    """
-    try:
-        log_widget.delete("1.0", tk.END)
-        progress_var.set(0)
-        root.update_idletasks()
-
-        desktop = Path.home() / "Desktop"
-        timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
-        folder_name = f"HelpdeskReport_{timestamp}"
-        report_dir = desktop / folder_name
-        report_dir.mkdir(parents=True, exist_ok=True)
+        values = [cell for cell in summary if cell is not None]
+        if values:
+            text = (f"{self.title} {values[-1][2]:.0f}% "
+                    f"(max {max(c[1] for c in values):.0f}%)")
+        else:
+            text = self.title
+        if text != self._text:
+            self.label.config(text=text)
+            self._text = text
+
+
+class SparklinePanel:
+    """CPU/RAM/Disk sparklines plus a shared 1/5/60 minute window selector."""
+
+    def __init__(self, parent, buckets: int = SPARKLINE_BUCKETS):
+        self.buckets = buckets
+        self.frame = ttk.Frame(parent)
+        self.window_var = tk.IntVar(value=SPARKLINE_WINDOWS[0][1])
+        self.lines = {
+            "cpu": Sparkline(self.frame, "CPU"),
+            "ram": Sparkline(self.frame, "RAM"),
+            "disk": Sparkline(self.frame, f"Disk {SYSTEM_VOLUME_LABEL}"),
+        }
+        for spark in self.lines.values():
+            spark.frame.pack(side="left", padx=15)
+
+        selector = ttk.Frame(self.frame)
+        selector.pack(side="left", padx=15)
+        for text, seconds in SPARKLINE_WINDOWS:
+            ttk.Radiobutton(selector, text=text, value=seconds, variable=self.window_var,
+                            command=self.invalidate).pack(anchor="w")
+        self._drawn_at = None
+        self._drawn_window = None
+
+    def invalidate(self):
+        self._drawn_at = None
+
+    def refresh(self, history: MetricsHistory):
+        """Redraw once per bucket width (1 s for 1 min, 60 s for 60 min) of new data."""
+        seconds = self.window_var.get()
+        latest = history.latest_time
+        if not latest:
+            return
+        if (self._drawn_at is not None and self._drawn_window == seconds
+                and latest - self._drawn_at < seconds / self.buckets):
+            return
+        for name, spark in self.lines.items():
+            spark.draw(history.summarize(name, seconds, self.buckets, latest))
+        self._drawn_at = latest
+        self._drawn_window = seconds
 
-        log_line(log_widget, f"Report folder: {report_dir}")
 
-        steps = [
-            (5, "Collecting Security log: Successful logons (4624)...",
-             'wevtutil qe Security /q:"*[System[(EventID=4624)]]" /f:text',
-             "Security_Logons_4624.txt"),
+# =============================
+#   PROCESS PANEL
+# =============================
 
-            (10, "Collecting Security log: Failed logons (4625)...",
-             'wevtutil qe Security /q:"*[System[(EventID=4625)]]" /f:text',
-             "Security_FailedLogons_4625.txt"),
+PROCESS_PANEL_ROWS = 15
+PROCESS_UI_INTERVAL_MS = 2000
+
+# (column id, heading, width, PROCESS_SORT_KEYS key or None)
+PROCESS_COLUMNS = (
+    ("pid", "PID", 60, None),
+    ("name", "Name", 180, None),
+    ("user", "User", 140, None),
+    ("cpu", "CPU %", 70, "cpu"),
+    ("ram", "Memory", 90, "ram"),
+    ("delta", "Δ Memory", 90, None),
+    ("read", "Read/s", 90, "io"),
+    ("write", "Write/s", 90, "io"),
+    ("threads", "Threads", 60, None),
+)
+
+
+def _format_process_row(r: ProcessRow) -> tuple:
+    def rate(v):
+        return "" if v is None else f"{_format_bytes(v)}/s"
+    delta = ""
+    if r.rss_delta:
+        delta = ("+" if r.rss_delta > 0 else "-") + _format_bytes(abs(r.rss_delta))
+    return (
+        r.pid, r.name, r.user.split("\\")[-1],
+        "" if r.cpu_percent is None else f"{r.cpu_percent:.1f}",
+        "" if r.rss is None else _format_bytes(r.rss),
+        delta, rate(r.read_bps), rate(r.write_bps),
+        "" if r.threads is None else r.threads,
+    )
 
-            (15, "Collecting Security log: Log cleared (1102)...",
-             'wevtutil qe Security /q:"*[System[(EventID=1102)]]" /f:text',
-             "Security_LogCleared_1102.txt"),
 
-            (20, "Collecting Security log: Admin privilege granted (4672)...",
-             'wevtutil qe Security /q:"*[System[(EventID=4672)]]" /f:text',
-             "Security_AdminPrivilege_4672.txt"),
+class ProcessPanel:
+    """
+    Top-N process list. Clicking the CPU, Memory or Read/Write heading picks
+    the ranking; the rows are fixed Treeview items whose values are only
+    rewritten when they change.
+    """
 
-            (30, "Collecting System log: WHEA hardware errors (18)...",
-             'wevtutil qe System /q:"*[System[(EventID=18)]]" /f:text',
-             "System_WHEA_18.txt"),
+    def __init__(self, parent, table: ProcessTable, rows: int = PROCESS_PANEL_ROWS):
+        self.table = table
+        self.sort_by = "cpu"
+        self.frame = ttk.LabelFrame(parent, text="Top Processes (by CPU)", padding=5)
+        ids = [c[0] for c in PROCESS_COLUMNS]
+        self.tree = ttk.Treeview(self.frame, columns=ids, show="headings", height=rows)
+        for col, heading, width, key in PROCESS_COLUMNS:
+            command = (lambda k=key: self.set_sort(k)) if key else ""
+            self.tree.heading(col, text=heading, command=command)
+            self.tree.column(col, width=width, anchor="w", stretch=col == "name")
+        self.tree.pack(fill=tk.BOTH, expand=True)
+        self._items = [self.tree.insert("", "end", values=()) for _ in range(rows)]
+        self._shown = [None] * rows
+        self._snap = None
+
+    def set_sort(self, by: str):
+        self.sort_by = by
+        label = {"cpu": "CPU", "ram": "Memory", "io": "I/O"}[by]
+        self.frame.configure(text=f"Top Processes (by {label})")
+        self._snap = None
+
+    def refresh(self):
+        snap = self.table.latest
+        if snap is None or snap is self._snap:
+            return
+        self._snap = snap
+        top = self.table.top(self.sort_by, len(self._items), snap)
+        for i, item in enumerate(self._items):
+            values = _format_process_row(top[i]) if i < len(top) else ()
+            if values != self._shown[i]:
+                self.tree.item(item, values=values)
+                self._shown[i] = values
 
-            (40, "Collecting System log: BugCheck (1001)...",
-             'wevtutil qe System /q:"*[System[(EventID=1001)]]" /f:text',
-             "System_BugCheck_1001.txt"),
+    def schedule(self, root, scheduler=None):
+        self.refresh()
+        (scheduler or root).after(PROCESS_UI_INTERVAL_MS, self.schedule, root, scheduler)
 
-            (50, "Collecting Windows Defender computer status...",
-             'powershell -Command "Get-MpComputerStatus | Format-List *"',
-             "Defender_ComputerStatus.txt"),
 
-            (60, "Collecting Windows Defender threat detections...",
-             'powershell -Command "Get-MpThreatDetection | Format-List *"',
-             "Defender_ThreatDetections.txt"),
+# =============================
+#   STORED REPORTS (GUI)
+# =============================
 
-            (70, "Collecting system info (systeminfo)...",
-             "systeminfo",
-             "SystemInfo.txt",
+def show_stored_reports():
+    """List reports in the store; export the selected one to a ZIP on the Desktop."""
+    try:
+        _load_tk()
+        store = ReportStore()
+        names = store.reports()[::-1]
+        if not names:
+            show_info("Stored Reports", f"No reports stored in {store.root}.")
+            return
 
-             ),
+        window = tk.Toplevel()
+        window.title("Stored Reports")
+        listbox = tk.Listbox(window, height=min(15, len(names)), width=50)
+        for name in names:
+            listbox.insert(tk.END, name)
+        listbox.selection_set(0)
+        listbox.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
+        events = queue.Queue()
 
-            (80, "Collecting network info (ipconfig /all)...",
-             "ipconfig /all",
-             "Network_IpconfigAll.txt"),
+        def worker(name):
+            try:
+                target = Path.home() / "Desktop" / f"{name}.zip"
+                target.parent.mkdir(parents=True, exist_ok=True)
+                events.put(("done", store.export_zip(name, target)))
+            except Exception as e:
+                events.put(("error", str(e)))
 
-            (90, "Collecting running processes (tasklist /v)...",
-             "tasklist /v",
-             "Processes_Tasklist_v.txt"),
+        def pump():
+            try:
+                kind, payload = events.get_nowait()
+            except queue.Empty:
+                window.after(100, pump)
+                return
+            export_button.configure(state="normal")
+            if kind == "done":
+                show_info("Stored Reports", f"Exported:\n{payload}")
+            else:
+                show_error("Export Error", payload)
+
+        def export():
+            selection = listbox.curselection()
+            if not selection:
+                return
+            export_button.configure(state="disabled")
+            threading.Thread(target=worker, args=(names[selection[0]],),
+                             name="report-export", daemon=True).start()
+            pump()
+
+        export_button = ttk.Button(window, text="Export ZIP to Desktop", command=export)
+        export_button.pack(pady=(0, 10))
+    except Exception as e:
+        show_error("Stored Reports Error", str(e))
 
-            (95, "Collecting disk/drive info (wmic diskdrive)...",
-             "wmic diskdrive get model,serialnumber,size,firmwarerevision",
-             "DiskDrive_Info.txt"),
-        ]
 
-        for pct, desc, cmd, filename in steps:
-            progress_var.set(pct)
-            root.update_idletasks()
-            log_line(log_widget, desc)
-            run_command_to_file(cmd, report_dir / filename, log_widget)
+# =============================
+#   LOG PANEL
+# =============================
 
-        # RAM_Health.txt
-        try:
-            if psutil:
-                vm = psutil.virtual_memory()
-                total = round(vm.total / (1024 ** 3), 2)
-                used = round(vm.used / (1024 ** 3), 2)
-                percent = vm.percent
+# Lines kept in the widget (older ones are trimmed) and how often queued
+# lines are written to it.
+LOG_MAX_LINES = 5000
+LOG_FLUSH_MS = 33
+LOG_FILTERS = ("All", "OK", "ERROR")
 
-                if percent < 85:
-                    status = "OK"
-                elif percent < 95:
-                    status = "WARNING"
-                else:
-                    status = "CRITICAL"
-
-                with (report_dir / "RAM_Health.txt").open("w", encoding="utf-8") as f:
-                    f.write(f"Total RAM: {total} GB\n")
-                    f.write(f"Used RAM: {used} GB\n")
-                    f.write(f"Usage: {percent}%\n")
-                    f.write(f"Status: {status}\n")
-                log_line(log_widget, "OK: RAM_Health.txt")
-            else:
-                with (report_dir / "RAM_Health.txt").open("w", encoding="utf-8") as f:
-                    f.write("psutil is not installed, RAM metrics unavailable.\n")
-                log_line(log_widget, "OK: RAM_Health.txt (no psutil)")
-        except Exception as e:
-            log_line(log_widget, f"ERROR RAM_Health.txt: {e}")
 
-        # SMART_Status.txt
-        try:
-            proc = subprocess.run(
-                'wmic diskdrive get model,serialnumber,status',
-                capture_output=True,
-                text=True,
-                shell=True
-            )
-            out = proc.stdout or ""
-            with (report_dir / "SMART_Status.txt").open("w", encoding="utf-8") as f:
-                if out.strip():
-                    f.write(out)
-                else:
-                    f.write("No SMART data returned from WMIC.\n")
-            log_line(log_widget, "OK: SMART_Status.txt")
-        except Exception as e:
-            log_line(log_widget, f"ERROR SMART_Status.txt: {e}")
+class LogPanel:
+    """
+    Diagnostic log view. push() may be called from any thread and only
+    appends to a queue; the Tk side inserts everything queued in one batch
+    per LOG_FLUSH_MS. The newest LOG_MAX_LINES entries are kept (so the
+    filter can be changed afterwards); a multi-line message is one entry.
+    It only follows new output while the view is at the bottom, so
+    scrolling back is not interrupted.
+    """
 
-        log_line(log_widget, "Creating ZIP archive...")
-        shutil.make_archive(str(report_dir), "zip", root_dir=report_dir)
-        zip_path = report_dir.with_suffix(".zip")
+    def __init__(self, parent, max_lines: int = LOG_MAX_LINES):
+        self.max_lines = max_lines
+        self._pending = queue.SimpleQueue()
+        self._lines = deque(maxlen=max_lines)
+        # Text lines of each entry in the widget, oldest first, for trimming.
+        self._shown = deque()
+        self.filter_var = tk.StringVar(value="All")
+
+        self.frame = ttk.Frame(parent)
+        bar = ttk.Frame(self.frame)
+        bar.pack(fill=tk.X)
+        ttk.Label(bar, text="Diagnostic Log:").pack(side="left")
+        ttk.Combobox(bar, textvariable=self.filter_var, values=LOG_FILTERS,
+                     state="readonly", width=8).pack(side="right")
+        self.filter_var.trace_add("write", lambda *_: self._render())
+
+        self.text = tk.Text(self.frame, height=14, wrap="word", bg="#000000", fg="#00ff00")
+        scroll = ttk.Scrollbar(self.frame, orient="vertical", command=self.text.yview)
+        self.text.configure(yscrollcommand=scroll.set)
+        self.text.tag_configure("ERROR", foreground="#ff5555")
+        self.text.pack(side="left", fill=tk.BOTH, expand=True)
+        scroll.pack(side="right", fill="y")
+
+    def push(self, text: str):
+        ts = datetime.datetime.now().strftime("%H:%M:%S")
+        self._pending.put((log_level(text), f"[{ts}] {text}\n"))
+
+    def clear(self):
+        self._lines.clear()
+        self._render()
+
+    def _visible(self, level: str) -> bool:
+        wanted = self.filter_var.get()
+        return wanted == "All" or wanted == level
+
+    def _at_bottom(self) -> bool:
+        return self.text.yview()[1] >= 0.999
+
+    def _insert(self, lines):
+        """One insert per level run (tags differ), then trim and maybe scroll."""
+        follow = self._at_bottom()
+        run_level, run = None, []
+        for level, line in lines:
+            if level != run_level and run:
+                self.text.insert(tk.END, "".join(run), run_level)
+                run = []
+            run_level = level
+            run.append(line)
+        if run:
+            self.text.insert(tk.END, "".join(run), run_level)
+        shown = self._shown
+        shown.extend(line.count("\n") for _, line in lines)
+        if len(shown) > self.max_lines:
+            excess = sum(shown.popleft() for _ in range(len(shown) - self.max_lines))
+            self.text.delete("1.0", f"{excess + 1}.0")
+        if follow:
+            self.text.see(tk.END)
+
+    def _render(self):
+        self.text.delete("1.0", tk.END)
+        self._shown.clear()
+        self._insert([entry for entry in self._lines if self._visible(entry[0])])
+
+    def flush(self):
+        batch = []
+        while True:
+            try:
+                batch.append(self._pending.get_nowait())
+            except queue.Empty:
+                break
+        if not batch:
+            return
+        self._lines.extend(batch)
+        visible = [entry for entry in batch[-self.max_lines:] if self._visible(entry[0])]
+        if visible:
+            self._insert(visible)
 
-        progress_var.set(100)
-        root.update_idletasks()
-        show_info("Full Diagnostic", f"Diagnostic package created:\n{zip_path}")
-    except Exception as e:
-        show_error("Diagnostic Error", str(e))
-        log_line(log_widget, f"ERROR: {e}")
+    def schedule(self, root, scheduler=None):
+        self.flush()
+        (scheduler or root).after(LOG_FLUSH_MS, self.schedule, root, scheduler)
 
 
 # =============================
-#   LIVE STATS
+#   REFRESH SCHEDULER
 # =============================
 
-def update_stats(cpu_label, ram_label, disk_label, temp_label, host_label, ip_label, root):
-    try:
-        if psutil:
-            cpu = psutil.cpu_percent(interval=None)
-            ram = psutil.virtual_memory().percent
-            try:
-                disk = psutil.disk_usage("C:\\").percent
-            except Exception:
-                disk = 0.0
-        else:
-            cpu = ram = disk = 0.0
+# Every sampler interval and UI refresh period is multiplied by the factor
+# of the current mode: "active" (focused, in use), "background" (visible but
+# unfocused, or no input for REFRESH_IDLE_SECONDS) and "hidden" (minimized).
+REFRESH_FACTORS = {"active": 1, "background": 5, "hidden": 30}
+REFRESH_IDLE_SECONDS = 300
+REFRESH_CHECK_MS = 2000
 
-        cpu_label.config(text=f"CPU: {cpu:.1f}%")
-        ram_label.config(text=f"RAM: {ram:.1f}%")
-        disk_label.config(text=f"Disk C: {disk:.1f}%")
-        temp_label.config(text=f"Temp: {get_temperature_str()}")
 
-        hostname = socket.gethostname()
-        host_label.config(text=f"Host: {hostname}")
-        try:
-            ip = socket.gethostbyname(hostname)
-        except Exception:
-            ip = "N/A"
-        ip_label.config(text=f"IP: {ip}")
-    except Exception:
-        pass
+class RefreshScheduler:
+    """
+    Watches focus, visibility and user input of the main window and slows
+    the samplers (via set_interval) and the Tk refresh loops (which
+    reschedule through after()) down when nobody is looking. Focus/map
+    events switch modes at once; a slow poll only catches the idle timeout.
+    """
 
-    root.after(
-        1000,
-        update_stats,
-        cpu_label,
-        ram_label,
-        disk_label,
-        temp_label,
-        host_label,
-        ip_label,
-        root
-    )
+    def __init__(self, root: tk.Tk, samplers=(), log=None,
+                 factors: dict = None, idle_seconds: float = REFRESH_IDLE_SECONDS):
+        self.root = root
+        self.samplers = list(samplers)
+        self.log = log
+        self.factors = factors or REFRESH_FACTORS
+        self.idle_seconds = idle_seconds
+        self.mode = "active"
+        self.factor = self.factors["active"]
+        self._last_input = time.monotonic()
+        self._check_pending = False
+        # {callback: (after id, runner)} of the refresh loops using after().
+        self._pending = {}
+        for sequence in ("<FocusIn>", "<FocusOut>", "<Map>", "<Unmap>"):
+            root.bind(sequence, self._on_window_event, add="+")
+        for sequence in ("<Motion>", "<KeyPress>", "<ButtonPress>", "<MouseWheel>"):
+            root.bind_all(sequence, self._on_input, add="+")
+
+    def after(self, base_ms: int, func, *args):
+        """
+        root.after() with the delay scaled to the current mode. Pending calls
+        are run at once when the mode speeds up, so a restored window does not
+        wait out a delay that was meant for the minimized one.
+        """
+        def run():
+            self._pending.pop(func, None)
+            func(*args)
+
+        self._pending[func] = (self.root.after(int(base_ms * self.factor), run), run)
+
+    def current_mode(self) -> str:
+        try:
+            if self.root.state() in ("iconic", "withdrawn"):
+                return "hidden"
+            focused = self.root.focus_displayof() is not None
+        except (KeyError, tk.TclError):
+            # focus_displayof() fails while a menu or dialog of Tk itself has focus.
+            focused = True
+        if not focused or time.monotonic() - self._last_input >= self.idle_seconds:
+            return "background"
+        return "active"
+
+    def check(self):
+        self._check_pending = False
+        mode = self.current_mode()
+        if mode == self.mode:
+            return
+        faster = self.factors[mode] < self.factor
+        self.mode = mode
+        self.factor = self.factors[mode]
+        for sampler in self.samplers:
+            sampler.ticker.set_interval(sampler.base_interval * self.factor)
+        if faster:
+            for func, (after_id, run) in list(self._pending.items()):
+                del self._pending[func]
+                self.root.after_cancel(after_id)
+                self.root.after_idle(run)
+        if self.log is not None:
+            self.log(f"Refresh: {mode} ({self.cost_text()})")
+
+    def cost_text(self) -> str:
+        """Current interval and measured per-tick cost of every sampler."""
+        parts = []
+        for sampler in self.samplers:
+            t = sampler.ticker
+            cost = ("not measured yet" if t.wall_s is None
+                    else f"{t.wall_s * 1000:.1f} ms wall / {t.cpu_s * 1000:.1f} ms CPU per tick")
+            parts.append(f"{type(sampler).__name__} every {t.interval:g}s, {cost}")
+        return "; ".join(parts)
+
+    def _on_window_event(self, event=None):
+        # Focus moving between widgets fires pairs of events; check once.
+        if not self._check_pending:
+            self._check_pending = True
+            self.root.after_idle(self.check)
+
+    def _on_input(self, event=None):
+        self._last_input = time.monotonic()
+        if self.mode == "background":
+            self._on_window_event()
+
+    def schedule(self):
+        self.check()
+        self.root.after(REFRESH_CHECK_MS, self.schedule)
 
 
 # =============================
 #   GUI
 # =============================
 
-def create_gui():
+def create_gui(record_history: bool = HISTORY_PERSIST):
+    _load_tk()
     root = tk.Tk()
     root.title("Helpdesk Technician Dashboard v2.0.0")
-    root.geometry("1000x620")
+    root.geometry("1000x950")
     root.configure(bg="#1e1e1e")
 
     style = ttk.Style()
@@ -567,7 +5943,7 @@ def create_gui():
 
     cpu_label = ttk.Label(status_frame, text="CPU: N/A", width=18)
     ram_label = ttk.Label(status_frame, text="RAM: N/A", width=18)
-    disk_label = ttk.Label(status_frame, text="Disk C: N/A", width=18)
+    disk_label = ttk.Label(status_frame, text=f"Disk {SYSTEM_VOLUME_LABEL} N/A", width=18)
     temp_label = ttk.Label(status_frame, text="Temp: N/A", width=18)
     host_label = ttk.Label(status_frame, text="Host: N/A", width=26)
     ip_label = ttk.Label(status_frame, text="IP: N/A", width=26)
@@ -579,6 +5955,9 @@ def create_gui():
     host_label.pack(side="left", padx=15)
     ip_label.pack(side="left", padx=15)
 
+    sparklines = SparklinePanel(main_frame)
+    sparklines.frame.pack(fill=tk.X, expand=False, pady=(0, 10))
+
     # Panels
     middle_frame = ttk.Frame(main_frame)
     middle_frame.pack(fill=tk.BOTH, expand=True)
@@ -589,21 +5968,57 @@ def create_gui():
 
     ttk.Button(diag_frame, text="System Info", width=24, command=get_system_info).pack(pady=6)
     ttk.Button(diag_frame, text="Network Info", width=24, command=get_network_info).pack(pady=6)
-    ttk.Button(diag_frame, text="Ping Google (8.8.8.8)", width=24, command=ping_google).pack(pady=6)
+    ttk.Button(diag_frame, text="Latency Probe", width=24, command=show_latency_probe).pack(pady=6)
 
     ttk.Button(diag_frame, text="Check RAM Health", width=24, command=check_ram_health).pack(pady=6)
-    ttk.Button(diag_frame, text="Check SMART Status", width=24, command=check_smart_status).pack(pady=6)
+    ttk.Button(diag_frame, text="Check SMART Status", width=24,
+               command=check_smart_status).pack(pady=6)
+    ttk.Button(diag_frame, text="All Temperatures", width=24,
+               command=show_all_temperatures).pack(pady=6)
+    ttk.Button(diag_frame, text="Disk & Network I/O", width=24,
+               command=lambda: show_throughput(sampler)).pack(pady=6)
 
     progress_var = tk.DoubleVar(value=0)
+    incremental_var = tk.BooleanVar(value=EVENT_INCREMENTAL)
+    store_var = tk.BooleanVar(value=REPORT_ARCHIVE == "store")
 
     ttk.Button(
         diag_frame,
         text="Collect Full Diagnostic",
         width=24,
-        command=lambda: collect_full_diagnostic(root, log_text, progress_var)
-    ).pack(pady=(12, 8))
-
-    ttk.Label(diag_frame, text="Diagnostic Log:").pack(anchor="center")
+        command=lambda: collect_full_diagnostic(
+            root, log_panel, progress_var, incremental=incremental_var.get(),
+            archive="store" if store_var.get() else "zip"
+        )
+    ).pack(pady=(12, 4))
+    ttk.Button(
+        diag_frame,
+        text="Cancel Diagnostic",
+        width=24,
+        command=cancel_full_diagnostic
+    ).pack(pady=(0, 4))
+    ttk.Button(
+        diag_frame,
+        text="Stored Reports...",
+        width=24,
+        command=show_stored_reports
+    ).pack(pady=(0, 4))
+    ttk.Button(
+        diag_frame,
+        text="Compare Reports...",
+        width=24,
+        command=compare_reports_dialog
+    ).pack(pady=(0, 4))
+    ttk.Checkbutton(
+        diag_frame,
+        text="Only new events since last report",
+        variable=incremental_var
+    ).pack(pady=(0, 4))
+    ttk.Checkbutton(
+        diag_frame,
+        text="Keep in report store (deduplicated)",
+        variable=store_var
+    ).pack(pady=(0, 8))
 
     progress_bar = ttk.Progressbar(
         diag_frame,
@@ -614,11 +6029,8 @@ def create_gui():
     )
     progress_bar.pack(fill=tk.X, padx=5, pady=(0, 5))
 
-    log_text = tk.Text(diag_frame, height=14, wrap="word", bg="#000000", fg="#00ff00")
-    log_scroll = ttk.Scrollbar(diag_frame, orient="vertical", command=log_text.yview)
-    log_text.configure(yscrollcommand=log_scroll.set)
-    log_text.pack(side="left", fill=tk.BOTH, expand=True)
-    log_scroll.pack(side="right", fill="y")
+    log_panel = LogPanel(diag_frame)
+    log_panel.frame.pack(fill=tk.BOTH, expand=True)
 
     # Fix / Repair
     fix_frame = ttk.LabelFrame(middle_frame, text="Fix / Repair", padding=10)
@@ -634,22 +6046,68 @@ def create_gui():
     ttk.Button(tools_frame, text="Task Manager", width=24, command=open_task_manager).pack(pady=4)
     ttk.Button(tools_frame, text="Services", width=24, command=open_services).pack(pady=4)
     ttk.Button(tools_frame, text="Event Viewer", width=24, command=open_event_viewer).pack(pady=4)
-    ttk.Button(tools_frame, text="Network Connections", width=24, command=open_network_connections).pack(pady=4)
+    ttk.Button(tools_frame, text="Network Connections", width=24,
+               command=open_network_connections).pack(pady=4)
     ttk.Button(tools_frame, text="Control Panel", width=24, command=open_control_panel).pack(pady=4)
     ttk.Button(tools_frame, text="Open RDP", width=24, command=open_rdp).pack(pady=4)
 
     ttk.Separator(tools_frame, orient="horizontal").pack(fill=tk.X, pady=6)
 
-    ttk.Button(tools_frame, text="Windows Defender", width=24, command=open_windows_defender).pack(pady=4)
-    ttk.Button(tools_frame, text="Windows Update", width=24, command=open_windows_update).pack(pady=4)
-    ttk.Button(tools_frame, text="Registry Editor", width=24, command=open_registry_editor).pack(pady=4)
-    ttk.Button(tools_frame, text="Troubleshooter", width=24, command=open_troubleshooter).pack(pady=4)
+    ttk.Button(tools_frame, text="Windows Defender", width=24,
+               command=open_windows_defender).pack(pady=4)
+    ttk.Button(tools_frame, text="Windows Update", width=24,
+               command=open_windows_update).pack(pady=4)
+    ttk.Button(tools_frame, text="Registry Editor", width=24,
+               command=open_registry_editor).pack(pady=4)
+    ttk.Button(tools_frame, text="Troubleshooter", width=24,
+               command=open_troubleshooter).pack(pady=4)
 
     middle_frame.columnconfigure(0, weight=2)
     middle_frame.columnconfigure(1, weight=1)
     middle_frame.columnconfigure(2, weight=1)
 
-    update_stats(cpu_label, ram_label, disk_label, temp_label, host_label, ip_label, root)
+    process_panel = ProcessPanel(main_frame, PROCESSES)
+    process_panel.frame.pack(fill=tk.BOTH, expand=False, pady=(10, 0))
+
+    history = MetricsHistory(int(HISTORY_SECONDS / STATS_SAMPLE_INTERVAL))
+    recorder = HistoryWriter() if record_history else None
+    exporter = None
+    if METRICS_EXPORTER_PORT:
+        exporter = MetricsExporter(METRICS_EXPORTER_BIND, METRICS_EXPORTER_PORT)
+        try:
+            exporter.start()
+            log_panel.push(f"Metrics exporter: http://{exporter.host}:{exporter.port}/metrics")
+        except OSError as e:
+            log_panel.push(f"ERROR starting metrics exporter: {e}")
+            exporter = None
+    alert_events = queue.SimpleQueue()
+    alerts = AlertEngine(on_event=alert_events.put)
+    if _alert_rules_error:
+        log_panel.push(f"ERROR in alert rules, using defaults: {_alert_rules_error}")
+    sampler = StatsSampler(history=history, recorder=recorder,
+                           listeners=[alerts] + ([exporter] if exporter else []))
+    sampler.start()
+    PROCESSES.start()
+
+    def on_close():
+        sampler.stop()
+        PROCESSES.stop()
+        if exporter is not None:
+            exporter.stop()
+        root.destroy()
+
+    root.protocol("WM_DELETE_WINDOW", on_close)
+
+    scheduler = RefreshScheduler(root, [sampler, PROCESSES], log_panel.push)
+    scheduler.schedule()
+    update_stats(cpu_label, ram_label, disk_label, temp_label, host_label, ip_label, root,
+                 sampler, sparklines, scheduler=scheduler)
+    _pump_alert_events(root, alerts, alert_events,
+                       {"cpu": cpu_label, "ram": ram_label, "disk": disk_label,
+                        "temp_c": temp_label},
+                       log_panel, progress_var, scheduler)
+    process_panel.schedule(root, scheduler)
+    log_panel.schedule(root, scheduler)
     root.mainloop()
 
 
@@ -657,11 +6115,425 @@ def create_gui():
 #   ENTRY POINT
 # =============================
 
-if __name__ == "__main__":
-    if psutil is None:
+HEALTH_CHECKS = {
+    "system": system_info_data,
+    "network": network_info_data,
+    "ram": ram_health_data,
+    "sensors": lambda: TEMPERATURE.all_sensors(),
+    "smart": smart_status_data,
+}
+
+
+def run_health_checks(names) -> dict:
+    """Run the named HEALTH_CHECKS; a failing check reports {"error": ...} instead."""
+    results = {}
+    for name in names:
+        try:
+            results[name] = HEALTH_CHECKS[name]()
+        except Exception as e:
+            results[name] = {"error": str(e)}
+    return results
+
+
+def _cli_collect(args) -> int:
+    """Headless full diagnostic: log lines to stderr, JSON summary to stdout."""
+    events = queue.Queue()
+    cancel = threading.Event()
+    outcome = {}
+
+    def worker():
+        try:
+            outcome["result"] = collect_report(
+                args.out, events, cancel, args.workers, args.compresslevel,
+                args.keep_folder, args.incremental, args.days,
+                "store" if args.store else REPORT_ARCHIVE
+            )
+        except Exception as e:
+            outcome["error"] = str(e)
+
+    thread = threading.Thread(target=worker, name="diag-collector", daemon=True)
+    thread.start()
+
+    def drain():
+        while True:
+            try:
+                kind, payload = events.get_nowait()
+            except queue.Empty:
+                return
+            if kind == "log" and not args.quiet:
+                ts = datetime.datetime.now().strftime("%H:%M:%S")
+                print(f"[{ts}] {payload}", file=sys.stderr)
+
+    while thread.is_alive():
+        try:
+            thread.join(0.2)
+        except KeyboardInterrupt:
+            cancel.set()
+        drain()
+    drain()
+
+    if "error" in outcome:
+        print(json.dumps({"error": outcome["error"]}), file=sys.stdout)
+        return 1
+    zip_path, manifest = outcome["result"]
+    print(json.dumps({
+        "zip": str(zip_path),
+        "cancelled": cancel.is_set(),
+        "wall_s": manifest["wall_s"],
+        "totals": manifest["totals"],
+    }, indent=2))
+    return 2 if cancel.is_set() else 0
+
+
+def _cli_reports(args) -> int:
+    store = ReportStore()
+    if args.action == "list":
+        print(json.dumps({"store": str(store.root), **store.stats(),
+                          "names": store.reports()}, indent=2))
+        return 0
+    if args.action == "export":
+        names = store.reports()
+        name = names[-1] if args.name == "latest" and names else args.name
+        if name not in names:
+            print(f"no stored report named {args.name!r}", file=sys.stderr)
+            return 1
+        args.out.mkdir(parents=True, exist_ok=True)
+        print(store.export_zip(name, args.out / f"{name}.zip"))
+        return 0
+    for name in args.names:
+        store.delete(name)
+    print(json.dumps(store.gc(), indent=2))
+    return 0
+
+
+def _cli_probe(args) -> int:
+    """Exit 0 if every target answered at least once."""
+    targets = ([parse_probe_target(t) for t in args.targets]
+               if args.targets else default_probe_targets())
+
+    def on_status(s):
+        if not args.json:
+            print("  ".join(str(v) for v in format_probe_status(s)), flush=True)
+            if s.error:
+                print(f"{s.target.label}: probe failed: {s.error}", file=sys.stderr)
+
+    results = probe_targets(targets, mode=args.mode, count=args.count,
+                            interval=args.interval, timeout=args.timeout, on_status=on_status)
+    if args.json:
+        print(json.dumps([
+            {"target": s.target.label, "host": s.target.host, "port": s.target.port,
+             "sent": s.sent, "received": s.received, "p50_ms": s.p50_ms, "p95_ms": s.p95_ms,
+             "error": s.error}
+            for s in results if s is not None
+        ], indent=2))
+    return 0 if all(s is not None and s.received for s in results) else 1
+
+
+def _cli_agent(args) -> int:
+    token = args.token or os.environ.get(AGENT_TOKEN_ENV)
+
+    def log(text):
+        if not args.quiet:
+            ts = datetime.datetime.now().strftime("%H:%M:%S")
+            print(f"[{ts}] {text}", file=sys.stderr, flush=True)
+
+    try:
+        server = create_agent_server(args.bind, args.port, token, log=log)
+    except (OSError, ValueError) as e:
+        print(f"agent failed: {e}", file=sys.stderr)
+        return 1
+    host, port = server.server_address[:2]
+    log(f"Helpdesk agent on {host}:{port} ({'token required' if token else 'no token'})")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+    return 0
+
+
+def _cli_metrics(args) -> int:
+    """Serve live stats to Prometheus without the GUI until Ctrl+C; alerts go to stderr."""
+    exporter = MetricsExporter(args.bind, args.port)
+    try:
+        exporter.start()
+    except OSError as e:
+        print(f"metrics exporter failed: {e}", file=sys.stderr)
+        return 1
+    recorder = HistoryWriter() if args.record else None
+
+    def on_alert(event):
+        ts = datetime.datetime.now().strftime("%H:%M:%S")
+        print(f"[{ts}] {format_alert_event(event)}", file=sys.stderr, flush=True)
+
+    alerts = AlertEngine(on_event=on_alert)
+    if _alert_rules_error:
+        print(f"ERROR in alert rules, using defaults: {_alert_rules_error}", file=sys.stderr)
+    sampler = StatsSampler(args.interval, recorder=recorder, listeners=[exporter, alerts])
+    sampler.start()
+    print(f"Serving http://{exporter.host}:{exporter.port}/metrics", file=sys.stderr, flush=True)
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        sampler.stop()
+        exporter.stop()
+    return 0
+
+
+def _cli_fleet(args) -> int:
+    """Exit 0 if every host was collected completely."""
+    try:
+        targets = read_fleet_targets(args.hosts, args.hosts_file)
+    except (OSError, ValueError) as e:
+        print(f"fleet failed: {e}", file=sys.stderr)
+        return 1
+    if not targets:
+        print("fleet failed: no hosts given", file=sys.stderr)
+        return 1
+
+    def log(text):
+        if not args.quiet:
+            ts = datetime.datetime.now().strftime("%H:%M:%S")
+            print(f"[{ts}] {text}", file=sys.stderr, flush=True)
+
+    artifacts = [a.strip() for a in args.artifacts.split(",")] if args.artifacts else None
+    zip_path, manifest = collect_fleet(
+        targets, args.out, log=log, token=args.token or os.environ.get(AGENT_TOKEN_ENV),
+        concurrency=args.concurrency, host_timeout=args.timeout,
+        connections=args.connections, artifacts=artifacts, days=args.days,
+        compresslevel=args.compresslevel
+    )
+    print(json.dumps({
+        "zip": str(zip_path),
+        "wall_s": manifest["wall_s"],
+        "totals": manifest["totals"],
+        "hosts": [{k: r[k] for k in ("target", "host", "status", "wall_s", "bytes", "error")}
+                  for r in manifest["hosts"]],
+    }, indent=2))
+    return 0 if not manifest["totals"]["failed"] else 1
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(
+        prog="helpdesk_dashboard",
+        description="Helpdesk Technician Dashboard. Without a command the GUI is started."
+    )
+    parser.add_argument("--record-history", action="store_true", default=HISTORY_PERSIST,
+                        help=f"append the GUI's live samples to the metrics history in "
+                             f"{HISTORY_DIR}")
+    sub = parser.add_subparsers(dest="command")
+
+    health = sub.add_parser("health", help="print system/network/RAM health as JSON")
+    health.add_argument("checks", nargs="*",
+                        help=f"checks to run: {', '.join(sorted(HEALTH_CHECKS))} (default: all)")
+
+    collect = sub.add_parser("collect", help="write the full diagnostic ZIP without the GUI")
+    collect.add_argument("--out", type=Path, default=Path.home() / "Desktop",
+                         help="directory for the report (default: Desktop)")
+    collect.add_argument("--workers", type=int, default=DIAG_MAX_WORKERS)
+    collect.add_argument("--compresslevel", type=int, default=REPORT_COMPRESSLEVEL)
+    collect.add_argument("--keep-folder", action="store_true",
+                         help="also keep the loose files next to the ZIP")
+    collect.add_argument("--incremental", action="store_true",
+                         help="only export events newer than the previous report")
+    collect.add_argument("--days", type=int, default=EVENT_WINDOW_DAYS,
+                         help="only export events from the last N days")
+    collect.add_argument("--store", action="store_true",
+                         help="save into the deduplicating report store instead of a ZIP")
+    collect.add_argument("--quiet", action="store_true", help="no progress on stderr")
+
+    diff = sub.add_parser("diff", help="compare two report ZIPs (before / after)")
+    diff.add_argument("before", type=Path)
+    diff.add_argument("after", type=Path)
+    diff.add_argument("--json", action="store_true", help="print the structured diff as JSON")
+
+    reports = sub.add_parser("reports", help="list, export or prune stored reports")
+    reports_sub = reports.add_subparsers(dest="action", required=True)
+    reports_sub.add_parser("list", help="stored reports and store size")
+    export = reports_sub.add_parser("export", help="write a stored report as a standalone ZIP")
+    export.add_argument("name", help="report name, or 'latest'")
+    export.add_argument("--out", type=Path, default=Path.home() / "Desktop")
+    delete = reports_sub.add_parser("delete", help="forget a report and drop unused chunks")
+    delete.add_argument("names", nargs="+")
+
+    hist = sub.add_parser("history", help="print recorded live metrics for a time range")
+    hist.add_argument("--since", help="start, ISO local time (default: --hours ago)")
+    hist.add_argument("--until", help="end, ISO local time (default: now)")
+    hist.add_argument("--hours", type=float, default=1.0)
+    hist.add_argument("--file", type=Path, default=HISTORY_DIR,
+                      help="history directory or an exported Metrics_History.bin")
+    hist.add_argument("--format", choices=("csv", "json"), default="csv")
+
+    clean = sub.add_parser("clean-temp", help="delete files in %%TEMP%% (or --dir)")
+    clean.add_argument("--dir", help="directory to clean (default: TEMP/TMP)")
+    clean.add_argument("--older-than", type=float, default=TEMP_MIN_AGE_HOURS, metavar="HOURS",
+                       help="only delete items not modified for this many hours")
+    clean.add_argument("--dry-run", action="store_true", help="only report what would be freed")
+    clean.add_argument("--workers", type=int, default=TEMP_CLEAN_WORKERS)
+
+    probe = sub.add_parser("probe", help="measure latency to several targets concurrently")
+    probe.add_argument("targets", nargs="*",
+                       help="host or host:port (default: gateway, DNS and PROBE_TARGETS)")
+    probe.add_argument("--mode", choices=("icmp", "tcp"), default=PROBE_MODE)
+    probe.add_argument("--count", type=int, default=PROBE_COUNT)
+    probe.add_argument("--interval", type=float, default=PROBE_INTERVAL)
+    probe.add_argument("--timeout", type=float, default=PROBE_TIMEOUT)
+    probe.add_argument("--json", action="store_true", help="print final results as JSON")
+
+    metrics = sub.add_parser("metrics", help="serve live stats in Prometheus text format")
+    metrics.add_argument("--bind", default=METRICS_EXPORTER_BIND,
+                         help=f"address to listen on (default: {METRICS_EXPORTER_BIND})")
+    metrics.add_argument("--port", type=int, default=METRICS_EXPORTER_PORT or METRICS_DEFAULT_PORT)
+    metrics.add_argument("--interval", type=float, default=STATS_SAMPLE_INTERVAL,
+                         help="seconds between samples")
+    metrics.add_argument("--record", action="store_true",
+                         help="also append the samples to the metrics history")
+
+    agent = sub.add_parser("agent", help="serve this machine's collectors over HTTP for `fleet`")
+    agent.add_argument("--bind", default="127.0.0.1",
+                       help="address to listen on (default: 127.0.0.1)")
+    agent.add_argument("--port", type=int, default=AGENT_PORT)
+    agent.add_argument("--token", help=f"shared secret (default: ${AGENT_TOKEN_ENV})")
+    agent.add_argument("--quiet", action="store_true", help="no request log on stderr")
+
+    fleet = sub.add_parser("fleet", help="collect reports from many agents into one ZIP")
+    fleet.add_argument("hosts", nargs="*", help=f"agent host or host:port (port {AGENT_PORT})")
+    fleet.add_argument("--hosts-file", type=Path, help="file with one host[:port] per line")
+    fleet.add_argument("--token", help=f"shared secret (default: ${AGENT_TOKEN_ENV})")
+    fleet.add_argument("--out", type=Path, default=Path.home() / "Desktop",
+                       help="directory for the fleet ZIP (default: Desktop)")
+    fleet.add_argument("--concurrency", type=int, default=FLEET_CONCURRENCY,
+                       help="hosts collected at the same time")
+    fleet.add_argument("--connections", type=int, default=FLEET_CONNECTIONS_PER_HOST,
+                       help="keep-alive connections (parallel artifacts) per host")
+    fleet.add_argument("--timeout", type=float, default=FLEET_HOST_TIMEOUT,
+                       help="seconds allowed per host")
+    fleet.add_argument("--artifacts", help="comma-separated file names (default: all)")
+    fleet.add_argument("--days", type=int, default=EVENT_WINDOW_DAYS,
+                       help="only export events from the last N days")
+    fleet.add_argument("--compresslevel", type=int, default=REPORT_COMPRESSLEVEL)
+    fleet.add_argument("--quiet", action="store_true", help="no progress on stderr")
+
+    bench_events = sub.add_parser(
+        "bench-events",
+        help="benchmark the wevtutil text parser/index on a synthetic dump"
+    )
+    bench_events.add_argument("--count", type=int, default=1_000_000,
+                              help="number of synthetic events (default: 1000000)")
+
+    bench_pipeline = sub.add_parser(
+        "bench-pipeline",
+        help="benchmark the full collection against replayed command output"
+    )
+    bench_pipeline.add_argument("--event-mb", type=float, default=50,
+                                help="MiB returned by each Security event query (default: 50)")
+    bench_pipeline.add_argument("--latency", type=float, default=0.2,
+                                help="base per-command latency in seconds (default: 0.2)")
+    bench_pipeline.add_argument("--workers", type=int, default=DIAG_MAX_WORKERS)
+    bench_pipeline.add_argument("--compresslevel", type=int, default=REPORT_COMPRESSLEVEL)
+    bench_pipeline.add_argument("--keep-folder", action="store_true")
+    bench_pipeline.add_argument("--baseline", type=Path,
+                                help="JSON from a previous run; exit 1 on regression")
+    bench_pipeline.add_argument("--tolerance", type=float, default=0.2,
+                                help="allowed growth over the baseline (default: 0.2)")
+
+    args = parser.parse_args(argv)
+
+    if args.command == "health":
+        unknown = sorted(set(args.checks) - set(HEALTH_CHECKS))
+        if unknown:
+            parser.error(f"unknown health check(s): {', '.join(unknown)}")
+        print(json.dumps(run_health_checks(args.checks or sorted(HEALTH_CHECKS)), indent=2))
+        return 0
+
+    if args.command == "collect":
+        return _cli_collect(args)
+
+    if args.command == "history":
+        until = (datetime.datetime.fromisoformat(args.until).timestamp()
+                 if args.until else time.time())
+        since = (datetime.datetime.fromisoformat(args.since).timestamp()
+                 if args.since else until - args.hours * 3600)
+        records = read_history(since, until, args.file)
+        if args.format == "json":
+            print(json.dumps([
+                dict(r._asdict(), disk=None if math.isnan(r.disk) else r.disk,
+                     temp=None if math.isnan(r.temp) else r.temp) for r in records
+            ]))
+        else:
+            print(",".join(HistoryRecord._fields))
+            for r in records:
+                stamp = datetime.datetime.fromtimestamp(r.time).isoformat(timespec="seconds")
+                temp = "" if math.isnan(r.temp) else f"{r.temp:.1f}"
+                disk = "" if math.isnan(r.disk) else f"{r.disk:.1f}"
+                print(f"{stamp},{r.cpu:.1f},{r.ram:.1f},{disk},{temp},"
+                      f"{r.net_sent},{r.net_recv}")
+        return 0
+
+    if args.command == "diff":
+        import zipfile
+        try:
+            result = diff_reports(args.before, args.after)
+        except (OSError, ValueError, zipfile.BadZipFile) as e:
+            print(f"diff failed: {e}", file=sys.stderr)
+            return 1
+        print(json.dumps(result, indent=2) if args.json else format_report_diff(result), end="")
+        return 0
+
+    if args.command == "reports":
+        return _cli_reports(args)
+
+    if args.command == "clean-temp":
+        root = args.dir or _temp_dir()
+        if not root:
+            parser.error("could not locate TEMP directory; pass --dir")
+        result = clean_temp_dir(root, args.older_than, args.dry_run, args.workers)
+        print(json.dumps(result, indent=2))
+        return 1 if result["failed"] else 0
+
+    if args.command == "probe":
+        return _cli_probe(args)
+
+    if args.command == "metrics":
+        return _cli_metrics(args)
+
+    if args.command == "agent":
+        return _cli_agent(args)
+
+    if args.command == "fleet":
+        return _cli_fleet(args)
+
+    if args.command == "bench-events":
+        print(json.dumps(benchmark_event_index(args.count), indent=2))
+        return 0
+
+    if args.command == "bench-pipeline":
+        result = benchmark_diagnostic_pipeline(
+            args.event_mb, args.latency, args.workers, args.compresslevel, args.keep_folder
+        )
+        print(json.dumps(result, indent=2))
+        if args.baseline:
+            baseline = json.loads(args.baseline.read_text(encoding="utf-8"))
+            regressions = compare_benchmark(result, baseline, args.tolerance)
+            for line in regressions:
+                print(f"REGRESSION {line}", file=sys.stderr)
+            return 1 if regressions else 0
+        return 0
+
+    if not psutil:
+        _load_tk()
         messagebox.showerror(
             "Missing Dependency",
             "psutil is not installed.\n\nRun:\n\n    pip install psutil\n"
         )
-    else:
-        create_gui()
+        return 1
+    create_gui(args.record_history)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,113 @@
+import json
+
+import pytest
+
+import helpdesk_dashboard as hd
+
+
+def snap(t, **metrics):
+    values = dict(cpu=0.0, ram=0.0, disk=0.0, temp=None, hostname="pc", ip="", temp_c=None)
+    values.update(metrics)
+    return hd.StatsSnapshot(taken_at=t, **values)
+
+
+def run(rule, series):
+    """Feed (t, value) pairs for rule.metric; return (state, t) of each event."""
+    events = []
+    engine = hd.AlertEngine([rule], on_event=events.append)
+    for t, value in series:
+        engine.append(snap(t, **{rule.metric: value}))
+    return [(e.state, e.at) for e in events], engine
+
+
+def test_debounce_counts_from_t_zero():
+    rule = hd.AlertRule("CPU high", "cpu", ">", 90, clear=80, for_s=30)
+    events, engine = run(rule, [(t, 95) for t in range(0, 41, 5)])
+    assert events == [("firing", 30)]
+    assert engine.severity("cpu") == "WARNING"
+
+
+def test_debounce_restarts_after_a_dip():
+    rule = hd.AlertRule("CPU high", "cpu", ">", 90, for_s=10)
+    series = [(0, 95), (5, 95), (8, 50), (10, 95), (15, 95), (20, 95)]
+    assert run(rule, series)[0] == [("firing", 20)]
+
+
+def test_hysteresis_holds_between_threshold_and_clear():
+    rule = hd.AlertRule("RAM high", "ram", ">", 85, clear=80)
+    series = [(0, 86), (1, 83), (2, 84), (3, 80), (4, 79), (5, 83), (6, 85)]
+    events, engine = run(rule, series)
+    # 80 is not yet past clear; 83 after resolving does not re-fire.
+    assert events == [("firing", 0), ("resolved", 4), ("firing", 6)]
+    assert "RAM high" in engine.active
+
+
+def test_reaching_the_threshold_matches_threshold_status():
+    for op, value in ((">", 90), ("<", 10)):
+        limit = 90 if op == ">" else 10
+        rule = hd.AlertRule("edge", "disk", op, limit, severity="CRITICAL")
+        assert hd.threshold_status("disk", value, [rule]) == "CRITICAL"
+        assert run(rule, [(0, value)])[0] == [("firing", 0)]
+
+
+def test_below_rule_resolves_above_clear():
+    rule = hd.AlertRule("Disk nearly empty?", "disk", "<", 10, clear=20, for_s=5)
+    series = [(0, 5), (5, 5), (6, 20), (7, 25), (12, 25)]
+    assert run(rule, series)[0] == [("firing", 5), ("resolved", 12)]
+
+
+def test_rate_aggregate_is_per_minute_after_half_a_window():
+    rule = hd.AlertRule("Temperature rising", "temp_c", ">", 10, clear=5, window_s=60,
+                        aggregate="rate")
+    # +0.5 °C/s = 30 °C/min, but nothing is judged before 30 s of data.
+    rising = [(t, 40 + 0.5 * t) for t in range(0, 61, 10)]
+    flat = [(t, 70.0) for t in range(70, 200, 10)]
+    events, engine = run(rule, rising + flat)
+    assert events[0] == ("firing", 30)
+    assert events[1][0] == "resolved"
+    # The window must have dropped enough of the ramp for the rate to fall below 5.
+    assert 60 < events[1][1] <= 120
+    assert engine.active == {}
+
+
+def test_missing_metric_is_skipped():
+    rule = hd.AlertRule("Temperature critical", "temp_c", ">", 90)
+    events = []
+    engine = hd.AlertEngine([rule], on_event=events.append)
+    engine.append(snap(0))
+    assert events == []
+
+
+def write_rules(tmp_path, raw):
+    path = tmp_path / "alert_rules.json"
+    path.write_text(json.dumps(raw), encoding="utf-8")
+    return path
+
+
+def test_load_alert_rules_accepts_a_valid_file(tmp_path):
+    path = write_rules(tmp_path, [
+        {"name": "CPU", "metric": "cpu", "op": ">", "threshold": 50, "for_s": 5},
+        {"name": "Heat", "metric": "temp_c", "op": ">", "threshold": 3, "window_s": 60,
+         "aggregate": "rate", "severity": "CRITICAL"},
+    ])
+    rules = hd.load_alert_rules(path)
+    assert [r.name for r in rules] == ["CPU", "Heat"]
+    assert rules[0].clear is None and rules[0].aggregate == "avg"
+    assert rules[1].severity == "CRITICAL"
+
+
+@pytest.mark.parametrize("raw, message", [
+    ({"name": "x"}, "expected a list"),
+    ([{"name": "x", "metric": "gpu", "op": ">", "threshold": 1}], "unknown metric"),
+    ([{"name": "x", "metric": "cpu", "op": ">=", "threshold": 1}], "op must be"),
+    ([{"name": "x", "metric": "cpu", "op": ">", "threshold": 1, "aggregate": "max"}],
+     "aggregate must be"),
+    ([{"name": "x", "metric": "cpu", "op": ">", "threshold": 1, "severity": "OK"}],
+     "unknown severity"),
+    ([{"name": "x", "metric": "cpu", "op": ">", "threshold": 1, "colour": "red"}],
+     "colour"),
+    ([{"name": "x", "metric": "cpu"}], "threshold"),
+])
+def test_load_alert_rules_rejects(tmp_path, raw, message):
+    with pytest.raises(ValueError, match=message):
+        hd.load_alert_rules(write_rules(tmp_path, raw))
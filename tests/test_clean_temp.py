@@ -0,0 +1,57 @@
+import os
+import time
+
+import pytest
+
+import helpdesk_dashboard as hd
+
+DAY = 86400
+
+
+def make_tree(root):
+    """Four folders; only "old" holds nothing newer than a day."""
+    old = time.time() - 3 * DAY
+    paths = {
+        "old/a.tmp": old,
+        "old/b.tmp": old,
+        "mixed/old.tmp": old,
+        "mixed/new.tmp": None,
+        "nested/inner/new.log": None,
+        "nested/old.log": old,
+        "fresh/x.tmp": None,
+    }
+    for rel, mtime in paths.items():
+        path = root / rel
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(b"x" * 100)
+        if mtime:
+            os.utime(path, (mtime, mtime))
+    for folder in ("old", "mixed", "nested", "nested/inner"):
+        os.utime(root / folder, (old, old))
+
+
+@pytest.mark.parametrize("min_age_hours", [None, 24])
+def test_dry_run_matches_the_real_run(tmp_path, min_age_hours):
+    make_tree(tmp_path)
+    dry = hd.clean_temp_dir(str(tmp_path), min_age_hours, dry_run=True)
+    assert all(p.exists() for p in tmp_path.rglob("*"))
+    real = hd.clean_temp_dir(str(tmp_path), min_age_hours)
+    for key in ("files", "dirs", "bytes", "kept", "failed"):
+        assert dry[key] == real[key], key
+
+
+def test_older_than_keeps_new_files_and_their_folders(tmp_path):
+    make_tree(tmp_path)
+    result = hd.clean_temp_dir(str(tmp_path), 24)
+    assert (result["files"], result["dirs"]) == (4, 1)
+    assert sorted(p.relative_to(tmp_path).as_posix() for p in tmp_path.rglob("*.*")) == [
+        "fresh/x.tmp", "mixed/new.tmp", "nested/inner/new.log"
+    ]
+    assert not (tmp_path / "old").exists()
+
+
+def test_everything_goes_without_a_cutoff(tmp_path):
+    make_tree(tmp_path)
+    result = hd.clean_temp_dir(str(tmp_path))
+    assert (result["files"], result["dirs"], result["kept"]) == (7, 5, 0)
+    assert list(tmp_path.iterdir()) == []
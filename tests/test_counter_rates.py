@@ -0,0 +1,66 @@
+from collections import namedtuple
+
+import helpdesk_dashboard as hd
+
+# Stand-in for psutil's snetio.
+NicCounters = namedtuple("NicCounters", hd._NIC_IO_FIELDS)
+
+
+def rates(counters, previous, dt=1.0, keep=None):
+    return hd._counter_rates(counters, previous, dt, hd._NIC_IO_FIELDS, hd.NicRate, keep)
+
+
+def test_first_sample_only_primes():
+    previous = {}
+    assert rates({"eth0": NicCounters(100, 200, 1, 2)}, previous) == ()
+    assert list(previous["eth0"]) == [100, 200, 1, 2]
+
+
+def test_rates_per_second():
+    previous = {}
+    rates({"eth0": NicCounters(100, 200, 1, 2)}, previous)
+    result = rates({"eth0": NicCounters(300, 1200, 5, 12)}, previous, dt=2.0)
+    assert result == (hd.NicRate("eth0", 100.0, 500.0, 2.0, 5.0),)
+
+
+def test_counter_reset_or_wrap_reads_zero_once():
+    previous = {}
+    rates({"eth0": NicCounters(2**32 - 10, 500, 10, 10)}, previous)
+    wrapped = rates({"eth0": NicCounters(20, 600, 5, 20)}, previous)
+    assert wrapped == (hd.NicRate("eth0", 0.0, 100.0, 0.0, 10.0),)
+    # The next sample measures from the post-wrap values again.
+    after = rates({"eth0": NicCounters(120, 700, 15, 30)}, previous)
+    assert after == (hd.NicRate("eth0", 100.0, 100.0, 10.0, 10.0),)
+
+
+def test_removed_device_is_dropped():
+    previous = {}
+    both = {"eth0": NicCounters(0, 0, 0, 0), "usb0": NicCounters(0, 0, 0, 0)}
+    rates(both, previous)
+    result = rates({"eth0": NicCounters(10, 10, 1, 1)}, previous)
+    assert [r.name for r in result] == ["eth0"]
+    assert set(previous) == {"eth0"}
+    # A device that comes back is primed again rather than diffed against old values.
+    assert [r.name for r in rates(both, previous)] == ["eth0"]
+
+
+def test_removed_device_is_dropped_when_others_are_filtered():
+    # A filtered-out device keeps len(counters) above len(previous), which
+    # used to hide the stale entry.
+    keep = lambda name: not hd.NIC_IO_IGNORE.match(name)
+    previous = {}
+    counters = {"lo": NicCounters(0, 0, 0, 0), "eth0": NicCounters(0, 0, 0, 0),
+                "wlan0": NicCounters(0, 0, 0, 0)}
+    rates(counters, previous, keep=keep)
+    assert set(previous) == {"eth0", "wlan0"}
+    del counters["wlan0"]
+    rates(counters, previous, keep=keep)
+    assert set(previous) == {"eth0"}
+
+
+def test_device_no_longer_kept_is_dropped():
+    previous = {}
+    counters = {"eth0": NicCounters(0, 0, 0, 0), "tap0": NicCounters(0, 0, 0, 0)}
+    rates(counters, previous)
+    rates(counters, previous, keep=lambda name: name != "tap0")
+    assert set(previous) == {"eth0"}
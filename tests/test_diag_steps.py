@@ -0,0 +1,122 @@
+import json
+import queue
+import threading
+import time
+import zipfile
+
+import pytest
+
+import helpdesk_dashboard as hd
+
+
+@pytest.fixture
+def writer(tmp_path):
+    writer = hd.ReportWriter(tmp_path / "report.zip")
+    yield writer
+    writer.close()
+
+
+def run(step, writer, runner=None, cancel=None):
+    lines = []
+    record = hd._run_diag_step(step, writer, lines.append, runner, cancel=cancel)
+    return record, lines
+
+
+def slow(seconds, text="done"):
+    return lambda: time.sleep(seconds) or text
+
+
+def test_callable_ok(writer):
+    record, lines = run(hd.DiagStep("Fast...", slow(0, "hello"), "Fast.txt"), writer)
+    assert (record["status"], record["bytes"]) == ("ok", 5)
+    assert lines[-1] == "OK: Fast.txt"
+
+
+def test_callable_timeout(writer):
+    t0 = time.monotonic()
+    record, lines = run(hd.DiagStep("Slow...", slow(5), "Slow.txt", timeout=0.3), writer)
+    assert record["status"] == "timeout" and record["bytes"] == 0
+    assert time.monotonic() - t0 < 2
+    assert lines[-1].startswith("TIMEOUT: Slow.txt")
+
+
+def test_callable_cancel(writer):
+    cancel = threading.Event()
+    threading.Timer(0.2, cancel.set).start()
+    record, lines = run(hd.DiagStep("Slow...", slow(5), "Slow.txt"), writer, cancel=cancel)
+    assert record["status"] == "cancelled"
+    assert lines[-1] == "CANCELLED: Slow.txt"
+
+
+def test_callable_error(writer):
+    record, lines = run(hd.DiagStep("Broken...", lambda: 1 / 0, "Broken.txt"), writer)
+    assert record["status"] == "error"
+    assert lines[-1].startswith("ERROR Broken.txt")
+
+
+def test_command_timeout_keeps_partial_output(tmp_path):
+    runner = hd.ReplayRunner({"slowtool": hd.Replay(b"x" * 1024, latency=20, size=1 << 20)})
+    writer = hd.ReportWriter(tmp_path / "report.zip")
+    record, lines = run(hd.DiagStep("Slow tool...", "slowtool", "Tool.txt", timeout=0.3),
+                        writer, runner)
+    writer.close()
+    assert record["status"] == "timeout"
+    assert 0 < record["bytes"] < 1 << 20
+    assert lines[-1].startswith("TIMEOUT: Tool.txt")
+    with zipfile.ZipFile(tmp_path / "report.zip") as zf:
+        assert len(zf.read("Tool.txt")) == record["bytes"]
+
+
+def test_cancel_skips_queued_steps(writer):
+    runner = hd.ReplayRunner({"tool": hd.Replay(b"y" * 1024, latency=2, size=1 << 16)})
+    cancel = threading.Event()
+    threading.Timer(0.3, cancel.set).start()
+    steps = [hd.DiagStep(f"Step {i}...", "tool", f"Step{i}.txt") for i in range(4)]
+    records = hd.run_diagnostic_steps(steps, writer, queue.Queue(), max_workers=1,
+                                      runner=runner, cancel=cancel)
+    assert [r["file"] for r in records] == [s.filename for s in steps]
+    assert all(r["status"] == "cancelled" for r in records)
+    assert [r["wall_s"] for r in records[1:]] == [0.0] * 3
+
+
+@pytest.fixture
+def replayed(tmp_path, monkeypatch):
+    runner = hd.ReplayRunner(hd._bench_recordings(32 * 1024, 0.0))
+    previous = hd.set_command_runner(runner)
+    bookmarks = hd.EventBookmarks
+    monkeypatch.setattr(hd, "EventBookmarks", lambda: bookmarks(tmp_path / "bookmarks.json"))
+    yield runner
+    hd.set_command_runner(previous)
+
+
+def read_manifest(zip_path):
+    with zipfile.ZipFile(zip_path) as zf:
+        assert zf.testzip() is None
+        return json.loads(zf.read("manifest.json")), set(zf.namelist())
+
+
+def test_manifest(replayed, tmp_path):
+    zip_path, manifest = hd.collect_report(tmp_path / "out", queue.Queue(), days=7)
+    written, names = read_manifest(zip_path)
+
+    assert written == manifest
+    files = [s.filename for s in hd.build_diag_steps()]
+    assert sorted(r["file"] for r in manifest["steps"]) == sorted(files)
+    totals = manifest["totals"]
+    assert totals["steps"] == len(files)
+    assert totals["ok"] == sum(r["status"] == "ok" for r in manifest["steps"])
+    assert totals["bytes"] == sum(r["bytes"] for r in manifest["steps"])
+    assert (totals["timeout"], totals["cancelled"]) == ([], [])
+    assert manifest["settings"]["days"] == 7 and manifest["settings"]["cancelled"] is False
+    ok = [r["file"] for r in manifest["steps"] if r["status"] == "ok"]
+    assert set(ok) <= names and {"manifest.json", "Diagnostic_Log.txt"} <= names
+
+
+def test_cancelled_collection_is_still_packaged(replayed, tmp_path):
+    cancel = threading.Event()
+    cancel.set()
+    zip_path, manifest = hd.collect_report(tmp_path / "out", queue.Queue(), cancel)
+    written, names = read_manifest(zip_path)
+    assert written["settings"]["cancelled"] is True
+    assert sorted(written["totals"]["cancelled"]) == sorted(r["file"] for r in written["steps"])
+    assert names == {"manifest.json", "Diagnostic_Log.txt"}
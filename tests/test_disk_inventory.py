@@ -0,0 +1,89 @@
+import json
+
+import helpdesk_dashboard as hd
+
+
+def wmic_output(*instances):
+    """Raw `wmic diskdrive get ... /format:list` bytes as text, \\r\\r\\n endings included."""
+    out = "\r\r\n\r\r\n"
+    for fields in instances:
+        out += "".join(f"{key}={value}\r\r\n" for key, value in fields) + "\r\r\n\r\r\n"
+    return out + "\r\r\n"
+
+
+SSD = [("FirmwareRevision", "2B2QEXM7"), ("Index", "0"), ("InterfaceType", "SCSI"),
+       ("MediaType", "Fixed hard disk media"), ("Model", "Samsung SSD 970 EVO Plus 1TB"),
+       ("SerialNumber", "0025_3852_91B0_1234."), ("Size", "1000202273280"), ("Status", "OK")]
+# A USB stick: no serial, and no FirmwareRevision line at all.
+USB = [("Index", "1"), ("InterfaceType", "USB"), ("MediaType", "Removable Media"),
+       ("Model", "SanDisk Cruzer Blade USB Device"), ("SerialNumber", ""),
+       ("Size", "15997532160"), ("Status", "OK")]
+HDD = [("FirmwareRevision", "CC43"), ("Index", "2"), ("InterfaceType", "IDE"),
+       ("MediaType", "Fixed hard disk media"), ("Model", "ST2000DM008-2FR102"),
+       ("SerialNumber", "     ZFL1ABCD"), ("Size", "2000396321280"), ("Status", "Pred Fail")]
+
+
+def test_parse_disk_wmic():
+    disks = hd.parse_disk_wmic(wmic_output(HDD, USB, SSD))
+    assert [d.index for d in disks] == [0, 1, 2]
+    ssd, usb, hdd = disks
+    assert ssd.model == "Samsung SSD 970 EVO Plus 1TB"
+    assert ssd.size == 1000202273280 and ssd.firmware == "2B2QEXM7"
+    assert usb.serial == "" and usb.firmware == "" and usb.interface == "USB"
+    assert hdd.serial == "ZFL1ABCD" and hdd.status == "Pred Fail"
+    assert all(d.health == "" and d.operational == "" for d in disks)
+
+
+def test_missing_leading_key_does_not_merge_instances():
+    # USB lacks FirmwareRevision, the first key of the next instance; that
+    # key must not be credited to USB.
+    usb, hdd = hd.parse_disk_wmic(wmic_output(USB, HDD))
+    assert usb.firmware == "" and hdd.firmware == "CC43"
+
+
+def test_parse_wmic_list_after_newline_translation():
+    # Text-mode decoding turns every \r\r\n into two newlines.
+    text = wmic_output(USB, HDD).replace("\r\r\n", "\r\n\n").replace("\r\n", "\n")
+    blocks = hd.parse_wmic_list(text)
+    assert [b["Index"] for b in blocks] == ["1", "2"]
+    assert "FirmwareRevision" not in blocks[0]
+
+
+def test_parse_wmic_list_empty():
+    assert hd.parse_wmic_list("\r\r\n\r\r\n") == []
+    assert hd.parse_disk_wmic("") == []
+
+
+def test_parse_disk_cim_json_joins_physical_disks_on_device_id():
+    text = json.dumps({
+        "drives": [
+            {"Index": 1, "Model": "ST2000DM008-2FR102", "SerialNumber": "  ZFL1ABCD ",
+             "Size": 2000396321280, "FirmwareRevision": "CC43", "Status": "OK",
+             "InterfaceType": "IDE", "MediaType": "Fixed hard disk media"},
+            {"Index": 0, "Model": "Samsung SSD 970 EVO Plus 1TB", "SerialNumber": None,
+             "Size": "1000202273280", "FirmwareRevision": "2B2QEXM7", "Status": "OK",
+             "InterfaceType": "SCSI", "MediaType": "Fixed hard disk media"},
+            {"Index": 2, "Model": "SanDisk Cruzer Blade USB Device", "Size": None,
+             "Status": "OK", "InterfaceType": "USB"},
+        ],
+        # DeviceId is a string in Get-PhysicalDisk output.
+        "physical": [
+            {"DeviceId": "0", "MediaType": "SSD", "BusType": "NVMe",
+             "HealthStatus": "Healthy", "OperationalStatus": "OK"},
+            {"DeviceId": "1", "MediaType": "HDD", "BusType": "SATA",
+             "HealthStatus": "Warning", "OperationalStatus": "Predictive Failure"},
+        ],
+    })
+    ssd, hdd, usb = hd.parse_disk_cim_json(text)
+    assert (ssd.index, ssd.interface, ssd.media_type, ssd.health) == (0, "NVMe", "SSD", "Healthy")
+    assert ssd.serial == "" and ssd.size == 1000202273280
+    assert (hdd.index, hdd.media_type, hdd.operational) == (1, "HDD", "Predictive Failure")
+    assert hdd.serial == "ZFL1ABCD"
+    # No physical-disk match: the Win32_DiskDrive fields are used as they are.
+    assert (usb.interface, usb.media_type, usb.health, usb.size) == ("USB", "", "", None)
+
+
+def test_parse_disk_cim_json_single_drive_without_physical():
+    text = json.dumps({"drives": [{"Index": 0, "Model": "VBOX HARDDISK"}], "physical": []})
+    (disk,) = hd.parse_disk_cim_json(text)
+    assert disk.model == "VBOX HARDDISK" and disk.health == ""
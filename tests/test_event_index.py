@@ -0,0 +1,166 @@
+import datetime
+import io
+
+import pytest
+
+import helpdesk_dashboard as hd
+
+# `wevtutil qe Security /f:text` excerpt, \r\n endings.
+SECURITY_DUMP = """Event[0]:
+  Log Name: Security
+  Source: Microsoft-Windows-Security-Auditing
+  Date: 2026-10-16T08:15:02.1230000Z
+  Event ID: 4625
+  Task: Logon
+  Level: Information
+  Opcode: Info
+  Keyword: Audit Failure
+  User: N/A
+  Computer: HD-LAPTOP-042.corp.example.com
+  Description:
+An account failed to log on.
+
+Subject:
+	Security ID:		S-1-0-0
+	Account Name:		-
+	Account Domain:		-
+	Logon ID:		0x0
+
+Account For Which Logon Failed:
+	Security ID:		S-1-0-0
+	Account Name:		jsmith
+	Account Domain:		CORP
+
+Network Information:
+	Workstation Name:	KIOSK-7
+	Source Network Address:	10.20.30.77
+	Source Port:		51234
+
+Event[1]:
+  Log Name: Security
+  Source: Microsoft-Windows-Security-Auditing
+  Date: 2026-10-16T08:15:40.0000000Z
+  Event ID: 4625
+  Level: Information
+  Description:
+An account failed to log on.
+
+Account For Which Logon Failed:
+	Account Name:		jsmith
+
+Network Information:
+	Source Network Address:	10.20.30.77
+
+Event[2]:
+  Log Name: Security
+  Source: Microsoft-Windows-Security-Auditing
+  Date: 2026-10-16T08:16:05.5000000Z
+  Event ID: 4624
+  Level: Information
+  Description:
+An account was successfully logged on.
+
+Subject:
+	Account Name:		HD-LAPTOP-042$
+
+New Logon:
+	Account Name:		jsmith
+	Account Domain:		CORP
+
+Network Information:
+	Source Network Address:	::1
+
+Event[3]:
+  Log Name: Security
+  Source: Microsoft-Windows-Security-Auditing
+  Date: 2026-10-16T10:02:00.0000000Z
+  Event ID: 4625
+  Level: Information
+  Description:
+Account For Which Logon Failed:
+	Account Name:		administrator
+Network Information:
+	Source Network Address:	203.0.113.9
+""".replace("\n", "\r\n").encode("utf-8")
+
+
+def utc(hour, minute, second):
+    return datetime.datetime(2026, 10, 16, hour, minute, second,
+                             tzinfo=datetime.timezone.utc).timestamp()
+
+
+def blocks(data, chunk_size):
+    return [(bytes(buf[start:end]), offset)
+            for buf, start, end, offset in hd.iter_event_blocks(io.BytesIO(data), chunk_size)]
+
+
+def test_event_blocks_do_not_depend_on_chunk_boundaries():
+    expected = blocks(SECURITY_DUMP, len(SECURITY_DUMP) + 1)
+    assert len(expected) == 4
+    for text, offset in expected:
+        assert SECURITY_DUMP[offset:offset + len(text)] == text
+        assert text.startswith(b"Event[")
+    # Every chunk size puts a boundary somewhere else, including inside
+    # an "Event[N]:" marker and between the \r and \n of a line end.
+    for chunk_size in range(1, 400):
+        assert blocks(SECURITY_DUMP, chunk_size) == expected, chunk_size
+
+
+def test_marker_split_across_a_chunk_is_still_a_boundary():
+    marker = SECURITY_DUMP.index(b"Event[2]:")
+    chunk_size = marker + 3  # first read ends with "Eve"
+    offsets = [offset for _, offset in blocks(SECURITY_DUMP, chunk_size)]
+    assert marker in offsets
+
+
+def test_event_marker_must_start_a_line():
+    data = b"Event[0]:\n  Description: see Event[5]: in the log\nEvent[1]:\n"
+    assert [offset for _, offset in blocks(data, 7)] == [0, data.index(b"Event[1]")]
+
+
+def test_preamble_and_empty_stream():
+    assert blocks(b"", 16) == []
+    assert blocks(b"no events here\r\n", 4) == []
+
+
+@pytest.mark.parametrize("chunk_size", [64, hd.PARSE_CHUNK_SIZE])
+def test_parsed_fields(chunk_size):
+    events = list(hd.iter_wevtutil_events(io.BytesIO(SECURITY_DUMP), chunk_size=chunk_size))
+    first, second, logon, admin = events
+    assert (first.event_id, first.log, first.source, first.level) == (
+        4625, "Security", "Microsoft-Windows-Security-Auditing", "Information")
+    # The target account, not the "-" Subject; wevtutil placeholders count as empty.
+    assert (first.account, first.ip) == ("jsmith", "10.20.30.77")
+    assert first.time == utc(8, 15, 2)
+    assert (logon.event_id, logon.account, logon.ip) == (4624, "jsmith", "")
+    assert (admin.account, admin.ip, admin.time) == ("administrator", "203.0.113.9",
+                                                     utc(10, 2, 0))
+    assert [e.offset for e in events] == [SECURITY_DUMP.index(b"Event[%d]:" % n)
+                                          for n in range(4)]
+
+
+def test_event_index_queries(tmp_path):
+    path = tmp_path / "Security_Logons_4625.txt"
+    path.write_bytes(SECURITY_DUMP)
+    index = hd.EventIndex.from_file(path, bucket_seconds=60)
+    assert len(index) == 4
+    assert index.latest_time == utc(10, 2, 0)
+
+    assert index.count_by("event_id") == {4625: 3, 4624: 1}
+    assert index.count_by("account", event_id=4625) == {"jsmith": 2, "administrator": 1}
+    assert index.count_by("ip") == {"10.20.30.77": 2, "203.0.113.9": 1}
+    assert list(index.rows(account="jsmith", event_id=4624)) == [2]
+    assert list(index.rows(ip="198.51.100.1")) == []
+    assert list(index.rows(since=utc(8, 15, 30), until=utc(8, 16, 30))) == [1, 2]
+
+    # The last hour before the newest event only holds the administrator failure;
+    # two hours reach back to the jsmith ones.
+    assert index.failed_logons_by_account() == {"administrator": 1}
+    assert index.failed_logons_by_account(seconds=7200) == {"jsmith": 2, "administrator": 1}
+
+    record = index.record(3)
+    assert (record.event_id, record.account, record.ip, record.log) == (
+        4625, "administrator", "203.0.113.9", "Security")
+    with path.open("rb") as f:
+        f.seek(record.offset)
+        assert f.read(9) == b"Event[3]:"
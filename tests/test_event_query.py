@@ -0,0 +1,108 @@
+import zipfile
+
+import pytest
+
+import helpdesk_dashboard as hd
+
+PROBE = b"<Event><System><EventRecordID>1000</EventRecordID></System></Event>"
+EXPORT = b"Event[0]:\n  Log Name: Security\n  Event ID: 4625\n"
+
+
+@pytest.fixture
+def bookmarks(tmp_path):
+    return hd.EventBookmarks(tmp_path / "event_bookmarks.json")
+
+
+def replay(probe=PROBE, export=EXPORT):
+    return hd.ReplayRunner({"/f:xml": probe, "/f:text": export})
+
+
+def query(bookmarks, runner, incremental=True, days=None):
+    return hd.EventQuery("Security", 4625, incremental, days, bookmarks, runner)
+
+
+def test_without_bookmarks_exports_everything():
+    runner = replay()
+    q = query(None, runner)
+    assert q.prepare() == ('wevtutil qe Security /q:"*[System[(EventID=4625)]]" /f:text')
+    q.commit()
+    assert runner.calls == []
+
+
+def test_first_run_is_bounded_by_the_probe(bookmarks):
+    runner = replay()
+    q = query(bookmarks, runner)
+    cmd = q.prepare()
+    assert "(EventRecordID<=1000)" in cmd and "EventRecordID>" not in cmd
+    assert "/c:1 /rd:true /f:xml" in runner.calls[0]
+    q.commit()
+    assert bookmarks.get("Security:4625") == 1000
+
+
+def test_incremental_run_starts_after_the_bookmark(bookmarks):
+    bookmarks.set("Security:4625", 600)
+    q = query(bookmarks, replay())
+    assert "(EventRecordID>600) and (EventRecordID<=1000)" in q.prepare()
+    q.commit()
+    assert bookmarks.get("Security:4625") == 1000
+
+
+def test_non_incremental_ignores_the_bookmark(bookmarks):
+    bookmarks.set("Security:4625", 600)
+    cmd = query(bookmarks, replay(), incremental=False).prepare()
+    assert "EventRecordID>" not in cmd and "(EventRecordID<=1000)" in cmd
+
+
+def test_rollover_exports_from_the_start(bookmarks):
+    bookmarks.set("Security:4625", 5000)
+    q = query(bookmarks, replay())
+    cmd = q.prepare()
+    assert "EventRecordID>" not in cmd and "(EventRecordID<=1000)" in cmd
+    q.commit()
+    assert bookmarks.get("Security:4625") == 1000
+
+
+@pytest.mark.parametrize("probe", [hd.Replay(b"Access is denied.", returncode=5),
+                                   b"<Events/>"])
+def test_probe_failure_keeps_the_bookmark(bookmarks, probe):
+    bookmarks.set("Security:4625", 600)
+    q = query(bookmarks, replay(probe=probe))
+    cmd = q.prepare()
+    assert "(EventRecordID>600)" in cmd and "EventRecordID<=" not in cmd
+    q.commit()
+    assert bookmarks.get("Security:4625") == 600
+
+
+def test_days_window(bookmarks):
+    cmd = query(bookmarks, replay(), days=2).prepare()
+    assert "TimeCreated[timediff(@SystemTime) <= 172800000]" in cmd
+    assert "(EventRecordID<=1000)" in cmd
+    assert "timediff" not in query(bookmarks, replay()).prepare()
+
+
+def test_bookmarks_round_trip(bookmarks):
+    bookmarks.set("Security:4625", 42)
+    bookmarks.save()
+    assert hd.EventBookmarks(bookmarks.path).get("Security:4625") == 42
+    assert hd.EventBookmarks(bookmarks.path.with_name("missing.json")).get("x") is None
+
+
+@pytest.mark.parametrize("export, status, expected", [
+    (EXPORT, "ok", 1000),
+    (hd.Replay(b"", returncode=15007), "error", 600),
+])
+def test_step_commits_only_after_a_good_export(tmp_path, bookmarks, export, status, expected):
+    bookmarks.set("Security:4625", 600)
+    runner = replay(export=export)
+    step = hd.DiagStep("Exporting failed logons...", query(bookmarks, runner), "Failed.txt")
+    writer = hd.ReportWriter(tmp_path / "report.zip")
+    try:
+        record = hd._run_diag_step(step, writer, lambda text: None, runner)
+    finally:
+        writer.close()
+    assert record["status"] == status
+    assert bookmarks.get("Security:4625") == expected
+    assert "(EventRecordID>600) and (EventRecordID<=1000)" in runner.calls[-1]
+    if status == "ok":
+        with zipfile.ZipFile(tmp_path / "report.zip") as zf:
+            assert zf.read("Failed.txt") == EXPORT
@@ -0,0 +1,187 @@
+import json
+import socket
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+import zipfile
+
+import pytest
+
+import helpdesk_dashboard as hd
+
+TOKEN = "S3cret"
+SECURITY = "Security_Logons_4624.txt"
+
+
+@pytest.fixture
+def runner():
+    runner = hd.ReplayRunner(hd._bench_recordings(64 * 1024, 0.01), latency=0.01)
+    previous = hd.set_command_runner(runner)
+    yield runner
+    hd.set_command_runner(previous)
+
+
+@pytest.fixture
+def start_agent(runner):
+    servers = []
+
+    def start(token=TOKEN):
+        server = hd.create_agent_server("127.0.0.1", 0, token, runner)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        servers.append(server)
+        return hd.parse_probe_target(f"127.0.0.1:{server.server_address[1]}")
+
+    yield start
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+
+def get(target, path, token=TOKEN):
+    request = urllib.request.Request(f"http://127.0.0.1:{target.port}{path}",
+                                     headers={hd.AGENT_TOKEN_HEADER: token})
+    try:
+        with urllib.request.urlopen(request, timeout=10) as response:
+            return response.status, response.read()
+    except urllib.error.HTTPError as e:
+        return e.code, e.read()
+
+
+def test_collects_several_agents(start_agent, tmp_path):
+    targets = [start_agent() for _ in range(3)]
+    zip_path, manifest = hd.collect_fleet(targets, tmp_path, token=TOKEN, connections=2)
+
+    assert manifest["totals"]["ok"] == 3 and manifest["totals"]["failed"] == []
+    expected = [s.filename for s in hd.build_diag_steps()]
+    with zipfile.ZipFile(zip_path) as zf:
+        names = set(zf.namelist())
+    for target, record in zip(targets, manifest["hosts"]):
+        prefix = hd._fleet_member_prefix(target)
+        assert record["status"] == "ok"
+        assert sorted(s["file"] for s in record["steps"]) == sorted(expected)
+        assert f"{prefix}/health.json" in names
+        assert {f"{prefix}/{name}" for name in expected} <= names
+    assert "fleet_manifest.json" in names
+
+
+def test_failed_hosts_do_not_hold_up_the_others(start_agent, tmp_path):
+    good = start_agent()
+    wrong_token = start_agent(token="other")
+    sock = socket.socket()
+    sock.bind(("127.0.0.1", 0))
+    closed = hd.parse_probe_target(f"127.0.0.1:{sock.getsockname()[1]}")
+    sock.close()
+    _, manifest = hd.collect_fleet([good, wrong_token, closed], tmp_path, token=TOKEN,
+                                   artifacts=["RAM_Health.txt"], host_timeout=10)
+
+    assert manifest["totals"]["ok"] == 1
+    assert manifest["totals"]["failed"] == [wrong_token.label, closed.label]
+    ok, denied, refused = manifest["hosts"]
+    assert [s["file"] for s in ok["steps"]] == ["RAM_Health.txt"]
+    assert denied["status"] == "error" and "HTTP 403" in denied["error"]
+    assert refused["status"] == "error" and refused["steps"] == []
+
+
+def test_steps_rejects_bad_days(start_agent):
+    target = start_agent()
+    for days in ("abc", "0", "-3"):
+        status, body = get(target, f"/steps?days={days}")
+        assert status == 400 and b"days" in body
+    status, _ = get(target, "/health")
+    assert status == 200
+
+
+def test_runs_are_kept_apart(start_agent):
+    target = start_agent()
+    _, first = get(target, "/steps")
+    _, second = get(target, "/steps?days=7")
+    first, second = json.loads(first), json.loads(second)
+    assert first["run"] != second["run"]
+
+    status, body = get(target, f"/artifact/RAM_Health.txt?run={first['run']}")
+    assert status == 200 and body
+    status, _ = get(target, f"/artifact/RAM_Health.txt?run={second['run']}")
+    assert status == 200
+    assert get(target, "/artifact/RAM_Health.txt?run=nope")[0] == 404
+    assert get(target, "/artifact/RAM_Health.txt")[0] == 400
+    assert get(target, f"/artifact/Nope.txt?run={first['run']}")[0] == 404
+
+
+def test_old_runs_are_dropped(start_agent, monkeypatch):
+    monkeypatch.setattr(hd, "AGENT_MAX_RUNS", 2)
+    target = start_agent()
+    runs = [json.loads(get(target, "/steps")[1])["run"] for _ in range(3)]
+    assert get(target, f"/artifact/RAM_Health.txt?run={runs[0]}")[0] == 404
+    assert get(target, f"/artifact/RAM_Health.txt?run={runs[2]}")[0] == 200
+
+
+def test_wrong_token(start_agent):
+    target = start_agent()
+    assert get(target, "/health", token="wrong")[0] == 403
+
+
+def test_slow_agent_times_out_alone(start_agent, tmp_path):
+    fast = start_agent()
+    slow_runner = hd.ReplayRunner(hd._bench_recordings(64 * 1024, 5.0), latency=5.0)
+    slow = hd.create_agent_server("127.0.0.1", 0, TOKEN, slow_runner)
+    threading.Thread(target=slow.serve_forever, daemon=True).start()
+    try:
+        slow_target = hd.parse_probe_target(f"127.0.0.1:{slow.server_address[1]}")
+        zip_path, manifest = hd.collect_fleet([fast, slow_target], tmp_path, token=TOKEN,
+                                              artifacts=[SECURITY], host_timeout=1.5)
+    finally:
+        slow.shutdown()
+        slow.server_close()
+
+    ok, timed_out = manifest["hosts"]
+    assert ok["status"] == "ok" and timed_out["status"] == "timeout"
+    assert manifest["totals"]["failed"] == [slow_target.label]
+    with zipfile.ZipFile(zip_path) as zf:
+        assert zf.testzip() is None
+        assert f"{hd._fleet_member_prefix(fast)}/{SECURITY}" in zf.namelist()
+
+
+def test_timeout_during_archive_keeps_the_member_whole(start_agent, tmp_path, monkeypatch):
+    target = start_agent()
+    _, expected = get(target, f"/artifact/{SECURITY}?run="
+                              f"{json.loads(get(target, '/steps')[1])['run']}")
+    real_open = hd.ReportWriter.open
+
+    def slow_open(self, name):
+        if name.endswith(SECURITY):
+            time.sleep(1.0)  # the host timeout fires while the member is being appended
+        return real_open(self, name)
+
+    monkeypatch.setattr(hd.ReportWriter, "open", slow_open)
+    zip_path, manifest = hd.collect_fleet([target], tmp_path, token=TOKEN,
+                                          artifacts=[SECURITY], host_timeout=0.5)
+
+    assert manifest["hosts"][0]["status"] == "timeout"
+    with zipfile.ZipFile(zip_path) as zf:
+        assert zf.testzip() is None
+        assert zf.read(f"{hd._fleet_member_prefix(target)}/{SECURITY}") == expected
+
+
+class _Broken:
+    def write(self, data):
+        raise ConnectionResetError("collector went away")
+
+
+class _KeepProc(hd.SubprocessRunner):
+    def open(self, cmd):
+        self.proc = super().open(cmd)
+        return self.proc
+
+
+def test_failed_send_kills_the_command():
+    runner = _KeepProc()
+    cancel = threading.Event()
+    chatty = [sys.executable, "-c", "import sys\nwhile True: sys.stdout.write('x' * 4096)"]
+    lines = []
+    stats = hd.run_command_to_report(chatty, "out.txt", hd._AgentStream(_Broken(), cancel),
+                                     lines.append, runner, timeout=30)
+    assert stats.returncode is None and cancel.is_set()
+    assert runner.proc.poll() is not None
+    assert lines and lines[-1].startswith("ERROR writing out.txt")
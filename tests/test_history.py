@@ -0,0 +1,134 @@
+import math
+import os
+import time
+
+import helpdesk_dashboard as hd
+
+T0 = time.time() - 3600
+
+
+def snap(i, temp_c=40.0, disk=50.0):
+    return hd.StatsSnapshot(cpu=float(i), ram=60.0, disk=disk, temp=None, hostname="pc",
+                            ip="", taken_at=T0 + i, temp_c=temp_c, net_sent=1000 * i,
+                            net_recv=2000 * i)
+
+
+def writer(tmp_path, **kwargs):
+    kwargs.setdefault("flush_records", 1000)
+    kwargs.setdefault("flush_seconds", 1e9)
+    return hd.HistoryWriter(tmp_path, **kwargs)
+
+
+def times(records):
+    return [round(r.time - T0) for r in records]
+
+
+def test_append_flush_read_round_trip(tmp_path):
+    w = writer(tmp_path)
+    for i in range(10):
+        w.append(snap(i, temp_c=None if i == 5 else 40.0, disk=None if i == 6 else 50.0))
+    assert hd.read_history(directory=tmp_path) == []
+    w.close()
+
+    records = hd.read_history(directory=tmp_path)
+    assert times(records) == list(range(10))
+    r = records[3]
+    assert (r.cpu, r.ram, r.disk, r.temp, r.net_sent, r.net_recv) == (3, 60, 50, 40, 3000, 6000)
+    assert math.isnan(records[5].temp) and math.isnan(records[6].disk)
+
+
+def test_read_history_bounds_are_start_inclusive_end_exclusive(tmp_path):
+    w = writer(tmp_path)
+    for i in range(10):
+        w.append(snap(i))
+    w.flush()
+    assert times(hd.read_history(T0 + 3, T0 + 7, tmp_path)) == [3, 4, 5, 6]
+    assert times(hd.read_history(T0 + 2.5, T0 + 3.5, tmp_path)) == [3]
+    assert times(hd.read_history(None, T0 + 2, tmp_path)) == [0, 1]
+    assert times(hd.read_history(T0 + 8, None, tmp_path)) == [8, 9]
+    assert hd.read_history(T0 + 20, None, tmp_path) == []
+    assert hd.read_history(T0 + 5, T0 + 5, tmp_path) == []
+    assert hd.read_history(T0 + 7, T0 + 3, tmp_path) == []
+
+
+def test_flushes_after_flush_records(tmp_path):
+    w = writer(tmp_path, flush_records=4)
+    for i in range(6):
+        w.append(snap(i))
+    assert times(hd.read_history(directory=tmp_path)) == [0, 1, 2, 3]
+
+
+def test_segments_rotate_and_read_back_in_order(tmp_path):
+    w = writer(tmp_path, flush_records=2, segment_records=4)
+    for i in range(10):
+        w.append(snap(i))
+    w.close()
+    segments = sorted(tmp_path.glob("metrics_*.bin"))
+    assert len(segments) == 3
+    assert [len(hd._read_history_segment(p)) for p in segments] == [4, 4, 2]
+    assert times(hd.read_history(directory=tmp_path)) == list(range(10))
+    assert times(hd.read_history(T0 + 2, T0 + 9, tmp_path)) == list(range(2, 9))
+
+
+def test_rotation_prunes_old_segments(tmp_path):
+    old = tmp_path / "metrics_20000101_000000.bin"
+    old.write_bytes(b"")
+    os.utime(old, (0, 0))
+    w = writer(tmp_path, retention_days=1)
+    w.append(snap(0))
+    w.flush()
+    assert not old.exists()
+    assert len(list(tmp_path.glob("metrics_*.bin"))) == 1
+
+
+def test_torn_trailing_record_is_ignored(tmp_path):
+    w = writer(tmp_path)
+    for i in range(3):
+        w.append(snap(i))
+    w.flush()
+    (segment,) = tmp_path.glob("metrics_*.bin")
+    with segment.open("ab") as f:
+        f.write(hd._HISTORY_RECORD.pack(T0 + 3, 1, 2, 3, 4, 5, 6)[:-7])
+    assert times(hd.read_history(directory=tmp_path)) == [0, 1, 2]
+    assert times(hd.read_history(T0 + 1, T0 + 99, tmp_path)) == [1, 2]
+
+
+def test_bad_magic_or_record_size_is_skipped(tmp_path):
+    w = writer(tmp_path)
+    w.append(snap(0))
+    w.flush()
+    record = hd._HISTORY_RECORD.pack(T0 + 1, 1, 2, 3, 4, 5, 6)
+    bad_magic = tmp_path / "metrics_19990101_000000.bin"
+    bad_magic.write_bytes(hd._HISTORY_HEADER.pack(b"XXXX", 1, len(record)) + record)
+    bad_size = tmp_path / "metrics_19990101_000001.bin"
+    bad_size.write_bytes(hd._HISTORY_HEADER.pack(hd._HISTORY_MAGIC, 1, 16) + record)
+    header_only = tmp_path / "metrics_19990101_000002.bin"
+    header_only.write_bytes(b"HDM")
+    assert hd._read_history_segment(bad_magic) == []
+    assert hd._read_history_segment(bad_size, raw=True) == b""
+    assert hd._read_history_segment(header_only) == []
+    assert times(hd.read_history(directory=tmp_path)) == [0]
+
+
+def test_report_bytes_read_back_as_one_file(tmp_path):
+    w = writer(tmp_path / "history", flush_records=2, segment_records=4)
+    for i in range(7):
+        w.append(snap(i))
+    data = hd.history_report_bytes(hours=2, directory=tmp_path / "history")
+    exported = tmp_path / "metrics_history.bin"
+    exported.write_bytes(data)
+    assert times(hd.read_history(directory=exported)) == list(range(7))
+    assert times(hd.read_history(T0 + 5, None, exported)) == [5, 6]
+
+
+def test_failed_write_starts_a_new_segment(tmp_path):
+    w = writer(tmp_path)
+    w.append(snap(0))
+    w.flush()
+    w._segment = tmp_path / "gone" / "metrics_x.bin"
+    w.append(snap(1))
+    w.flush()
+    w.append(snap(2))
+    w.flush()
+    assert len(list(tmp_path.glob("metrics_*.bin"))) == 2
+    assert times(hd.read_history(directory=tmp_path)) == [0, 2]
@@ -0,0 +1,55 @@
+from collections import deque
+
+import helpdesk_dashboard as hd
+
+
+class FakeText:
+    """The few tk.Text calls LogPanel._insert makes, on a list of lines."""
+
+    def __init__(self):
+        self.lines = [""]
+
+    def insert(self, index, text, tag=None):
+        assert index == hd.tk.END
+        head, *rest = text.split("\n")
+        self.lines[-1] += head
+        self.lines.extend(rest)
+
+    def delete(self, start, end):
+        assert start == "1.0" and end.endswith(".0")
+        del self.lines[:int(end[:-2]) - 1]
+
+    def yview(self):
+        return (0.0, 1.0)
+
+    def see(self, index):
+        pass
+
+    def content(self):
+        return "\n".join(self.lines)
+
+
+def panel(max_lines):
+    hd._load_tk()  # for tk.END; no display is needed
+    log = hd.LogPanel.__new__(hd.LogPanel)
+    log.max_lines = max_lines
+    log._shown = deque()
+    log.text = FakeText()
+    return log
+
+
+def test_trims_whole_multi_line_entries():
+    log = panel(max_lines=3)
+    log._insert([("OK", "one\n"), ("ERROR", "two\n  detail a\n  detail b\n"),
+                 ("OK", "three\n")])
+    log._insert([("OK", "four\n")])
+    assert log.text.content() == "two\n  detail a\n  detail b\nthree\nfour\n"
+    log._insert([("OK", "five\n"), ("OK", "six\n")])
+    assert log.text.content() == "four\nfive\nsix\n"
+    assert list(log._shown) == [1, 1, 1]
+
+
+def test_trims_within_one_batch():
+    log = panel(max_lines=2)
+    log._insert([("OK", f"line {i}\nmore {i}\n") for i in range(5)])
+    assert log.text.content() == "line 3\nmore 3\nline 4\nmore 4\n"
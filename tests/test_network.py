@@ -0,0 +1,77 @@
+import helpdesk_dashboard as hd
+
+# `ipconfig /all` from a Windows 11 laptop (addresses changed), \r\n endings.
+IPCONFIG_ALL = """
+Windows IP Configuration
+
+   Host Name . . . . . . . . . . . . : HD-LAPTOP-042
+   Primary Dns Suffix  . . . . . . . : corp.example.com
+   Node Type . . . . . . . . . . . . : Hybrid
+   IP Routing Enabled. . . . . . . . : No
+   WINS Proxy Enabled. . . . . . . . : No
+   DNS Suffix Search List. . . . . . : corp.example.com
+                                       example.com
+
+Ethernet adapter Ethernet:
+
+   Connection-specific DNS Suffix  . : corp.example.com
+   Description . . . . . . . . . . . : Intel(R) Ethernet Connection (7) I219-V
+   Physical Address. . . . . . . . . : 3C-52-82-1A-2B-3C
+   DHCP Enabled. . . . . . . . . . . : Yes
+   Autoconfiguration Enabled . . . . : Yes
+   IPv6 Address. . . . . . . . . . . : 2001:db8:10::25(Preferred)
+   Temporary IPv6 Address. . . . . . : 2001:db8:10::a1b2(Deprecated)
+   Link-local IPv6 Address . . . . . : fe80::1c2d:3e4f:5a6b:7c8d%12(Preferred)
+   IPv4 Address. . . . . . . . . . . : 10.20.30.42(Preferred)
+   Subnet Mask . . . . . . . . . . . : 255.255.254.0
+   Lease Obtained. . . . . . . . . . : Friday, 16 October 2026 08:01:12
+   Lease Expires . . . . . . . . . . : Saturday, 17 October 2026 08:01:11
+   Default Gateway . . . . . . . . . : fe80::1%12
+                                       10.20.30.1
+   DHCP Server . . . . . . . . . . . : 10.20.0.5
+   DHCPv6 IAID . . . . . . . . . . . : 104616578
+   DNS Servers . . . . . . . . . . . : 10.20.0.10
+                                       10.20.0.11
+                                       2001:db8::53
+   NetBIOS over Tcpip. . . . . . . . : Enabled
+
+Wireless LAN adapter Wi-Fi:
+
+   Media State . . . . . . . . . . . : Media disconnected
+   Connection-specific DNS Suffix  . :
+   Description . . . . . . . . . . . : Intel(R) Wi-Fi 6 AX201 160MHz
+   Physical Address. . . . . . . . . : 7C-B2-7D-11-22-33
+   DHCP Enabled. . . . . . . . . . . : Yes
+
+Unknown adapter VPN - Corp:
+
+   Connection-specific DNS Suffix  . :
+   Description . . . . . . . . . . . : Corp VPN Virtual Adapter
+   Physical Address. . . . . . . . . :
+   IPv4 Address. . . . . . . . . . . : 172.16.5.9(Preferred)
+   Subnet Mask . . . . . . . . . . . : 255.255.255.255
+   Default Gateway . . . . . . . . . :
+   DNS Servers . . . . . . . . . . . : 172.16.0.53
+""".replace("\n", "\r\n")
+
+
+def test_parse_ipconfig():
+    ethernet, wifi, vpn = hd.parse_ipconfig(IPCONFIG_ALL)
+
+    assert ethernet.name == "Ethernet"
+    assert (ethernet.ip, ethernet.mask) == ("10.20.30.42", "255.255.254.0")
+    assert ethernet.ipv6 == ("2001:db8:10::25", "2001:db8:10::a1b2", "fe80::1c2d:3e4f:5a6b:7c8d")
+    assert ethernet.gateway == ("fe80::1%12", "10.20.30.1")
+    assert ethernet.dns == ("10.20.0.10", "10.20.0.11", "2001:db8::53")
+    assert ethernet.mac == "3C-52-82-1A-2B-3C" and ethernet.is_up
+
+    assert wifi.name == "Wi-Fi" and not wifi.is_up
+    assert (wifi.ip, wifi.mask, wifi.gateway, wifi.dns) == ("N/A", "N/A", (), ())
+
+    assert vpn.name == "VPN - Corp" and vpn.is_up
+    assert (vpn.ip, vpn.mac, vpn.gateway, vpn.dns) == ("172.16.5.9", "N/A", (), ("172.16.0.53",))
+
+
+def test_parse_ipconfig_without_adapters():
+    assert hd.parse_ipconfig("") == []
+    assert hd.parse_ipconfig("Windows IP Configuration\r\n\r\n   Host Name . . : PC\r\n") == []
@@ -0,0 +1,125 @@
+import asyncio
+import socket
+import sys
+import threading
+
+import pytest
+
+import helpdesk_dashboard as hd
+
+
+@pytest.fixture
+def listener():
+    """A local TCP port that accepts and immediately closes connections."""
+    sock = socket.socket()
+    sock.bind(("127.0.0.1", 0))
+    sock.listen(16)
+    stop = threading.Event()
+
+    def serve():
+        sock.settimeout(0.1)
+        while not stop.is_set():
+            try:
+                conn, _ = sock.accept()
+            except OSError:
+                continue
+            conn.close()
+
+    thread = threading.Thread(target=serve, daemon=True)
+    thread.start()
+    yield sock.getsockname()[1]
+    stop.set()
+    thread.join()
+    sock.close()
+
+
+def closed_port() -> int:
+    sock = socket.socket()
+    sock.bind(("127.0.0.1", 0))
+    port = sock.getsockname()[1]
+    sock.close()
+    return port
+
+
+def test_parse_probe_target():
+    assert hd.parse_probe_target("fileserver:445") == hd.ProbeTarget("fileserver:445",
+                                                                     "fileserver", 445)
+    assert hd.parse_probe_target("8.8.8.8").port == hd.PROBE_DEFAULT_PORT
+    assert hd.parse_probe_target("[::1]:80") == hd.ProbeTarget("[::1]:80", "::1", 80)
+
+
+def test_tcp_probe_local_listener(listener):
+    target = hd.ProbeTarget("local", "127.0.0.1", listener)
+    seen = []
+    [status] = hd.probe_targets([target], mode="tcp", count=3, interval=0.01, timeout=1,
+                                on_status=seen.append)
+    assert (status.sent, status.received, status.error) == (3, 3, None)
+    assert status.p50_ms is not None and status.p50_ms <= status.p95_ms
+    assert [s.sent for s in seen] == [1, 2, 3]
+
+
+def test_tcp_refused_counts_as_reply():
+    target = hd.ProbeTarget("refused", "127.0.0.1", closed_port())
+    [status] = hd.probe_targets([target], mode="tcp", count=2, interval=0.01, timeout=1)
+    assert status.received == 2
+
+
+def test_tcp_probes_run_concurrently(listener):
+    targets = [hd.ProbeTarget(f"t{i}", "127.0.0.1", listener) for i in range(5)]
+    results = hd.probe_targets(targets, mode="tcp", count=2, interval=0.01, timeout=1)
+    assert [s.target.label for s in results] == [t.label for t in targets]
+    assert all(s.received == 2 for s in results)
+
+
+def test_missing_ping_only_fails_that_target(monkeypatch):
+    real_exec = asyncio.create_subprocess_exec
+
+    async def fake_exec(*cmd, **kwargs):
+        if cmd[-1] == "broken":
+            raise FileNotFoundError(2, "No such file or directory", "ping")
+        return await real_exec(sys.executable, "-c", "print('time=1.5 ms')", **kwargs)
+
+    monkeypatch.setattr(asyncio, "create_subprocess_exec", fake_exec)
+    ok, broken = hd.probe_targets(
+        [hd.ProbeTarget("ok", "good", 0), hd.ProbeTarget("broken", "broken", 0)],
+        mode="icmp", count=2, interval=0.01, timeout=1
+    )
+    assert (ok.received, ok.p50_ms, ok.error) == (2, 1.5, None)
+    assert broken.received == 0 and "No such file" in broken.error
+    assert hd.format_probe_status(broken)[3:5] == ("100%", "unavailable")
+
+
+def test_unknown_mode():
+    with pytest.raises(ValueError):
+        hd.probe_targets([], mode="udp")
+
+
+def test_icmp_goes_through_the_command_runner():
+    runner = hd.ReplayRunner({
+        "up": b"64 bytes from 10.0.0.1: icmp_seq=1 ttl=64 time=2.25 ms\n",
+        "fast": b"Reply from 10.0.0.2: bytes=32 time<1ms TTL=128\r\n",
+        "down": hd.Replay(b"1 packets transmitted, 0 received\n", returncode=1),
+    })
+    previous = hd.set_command_runner(runner)
+    try:
+        up, fast, down = hd.probe_targets(
+            [hd.ProbeTarget(name, name, 0) for name in ("up", "fast", "down")],
+            mode="icmp", count=2, interval=0, timeout=1
+        )
+    finally:
+        hd.set_command_runner(previous)
+    assert (up.received, up.p50_ms) == (2, 2.25)
+    assert (fast.received, fast.p50_ms) == (2, 1.0)
+    assert (down.sent, down.received) == (2, 0)
+    assert len(runner.calls) == 6 and all(call.startswith("ping ") for call in runner.calls)
+
+
+def test_subprocess_run_async_timeout_kills_the_child():
+    import asyncio
+    import subprocess
+    cmd = [sys.executable, "-c", "import time; time.sleep(30)"]
+    with pytest.raises(subprocess.TimeoutExpired):
+        asyncio.run(hd.SubprocessRunner().run_async(cmd, timeout=0.2))
+    result = asyncio.run(hd.SubprocessRunner().run_async(
+        [sys.executable, "-c", "print('time=0.5 ms')"], timeout=10))
+    assert (result.returncode, result.stdout.strip()) == (0, "time=0.5 ms")
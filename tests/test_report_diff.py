@@ -0,0 +1,65 @@
+import io
+
+import helpdesk_dashboard as hd
+
+
+def dump(count):
+    return io.BytesIO("".join(hd._synthetic_events(count, start=1e9)).encode("utf-8"))
+
+
+def test_new_and_gone_events():
+    result = hd.diff_event_streams(dump(50), dump(80))
+    assert (result["a_events"], result["b_events"]) == (50, 80)
+    assert (result["new"], result["gone"]) == (30, 0)
+    assert sum(result["new_by_id"].values()) == 30
+
+
+def test_samples_are_the_newest_new_events():
+    result = hd.diff_event_streams(dump(50), dump(80))
+    newest = [rec.time for rec in hd.iter_wevtutil_events(dump(80))][-hd.DIFF_EVENT_SAMPLES:]
+    assert len(result["new_samples"]) == hd.DIFF_EVENT_SAMPLES
+    assert [s["time"] for s in result["new_samples"]] == [
+        hd.datetime.datetime.fromtimestamp(t).isoformat(timespec="seconds") for t in newest
+    ]
+
+
+def test_fingerprint_ignores_the_record_number():
+    a = b"Event[0]:\n  Event ID: 4624\n"
+    b = b"Event[7]:\n  Event ID: 4624\n"
+    assert hd._event_fingerprint(a, 0, len(a)) == hd._event_fingerprint(b, 0, len(b))
+    assert isinstance(hd._event_fingerprint(a, 0, len(a)), int)
+
+
+LOGON = "Event[{n}]:\n  Log Name: Security\n  Event ID: 4624\n  Account Name:\tbob\n"
+
+
+def logons(count):
+    return io.BytesIO("".join(LOGON.format(n=n) for n in range(count)).encode("utf-8"))
+
+
+def test_identical_events_are_counted_as_a_multiset():
+    result = hd.diff_event_streams(logons(2), logons(3))
+    assert (result["new"], result["gone"]) == (1, 0)
+    assert result["new_by_id"] == {"4624": 1}
+    assert [s["account"] for s in result["new_samples"]] == ["bob"]
+
+    result = hd.diff_event_streams(logons(3), logons(1))
+    assert (result["new"], result["gone"]) == (0, 2)
+
+
+def test_partitions_do_not_change_the_result(monkeypatch):
+    expected = hd.diff_event_streams(dump(300), dump(500))
+    monkeypatch.setattr(hd, "DIFF_PARTITIONS", 1)
+    monkeypatch.setattr(hd, "DIFF_SPOOL_BYTES", 64)
+    assert hd.diff_event_streams(dump(300), dump(500)) == expected
+
+
+def test_reads_zip_members(tmp_path):
+    import zipfile
+    name = hd.EVENT_STEPS[0][3]
+    for label, count in (("a", 40), ("b", 45)):
+        with zipfile.ZipFile(tmp_path / f"{label}.zip", "w", zipfile.ZIP_DEFLATED) as zf:
+            zf.writestr(name, dump(count).getvalue())
+    events = hd.diff_reports(tmp_path / "a.zip", tmp_path / "b.zip")["events"][name]
+    assert (events["new"], events["gone"]) == (5, 0)
+    assert len(events["new_samples"]) == 5
@@ -0,0 +1,93 @@
+import random
+import zipfile
+
+import pytest
+
+import helpdesk_dashboard as hd
+
+
+@pytest.fixture
+def store(tmp_path):
+    return hd.ReportStore(tmp_path / "store")
+
+
+def dump(lines=70_000, seed=1) -> bytes:
+    rng = random.Random(seed)
+    return b"".join(b"Event[%d]: id=%d account=user%04d\n" % (n, rng.randint(1, 5000),
+                                                               rng.randint(0, 9999))
+                    for n in range(lines))
+
+
+def save(store, name, files, chunk_sizes=(65536,)):
+    writer = hd.StoreReportWriter(store, name)
+    for entry, data in files.items():
+        with writer.open(entry) as out:
+            pos = 0
+            for i in range(0, len(data), 65536):
+                size = chunk_sizes[i // 65536 % len(chunk_sizes)]
+                out.write(data[pos:pos + size])
+                pos += size
+            out.write(data[pos:])
+    writer.close()
+    return writer
+
+
+def test_chunks_do_not_depend_on_write_sizes(store):
+    data = dump()
+    a = hd._Chunker(store)
+    a.write(data)
+    b = hd._Chunker(store)
+    for i in range(0, len(data), 1000):
+        b.write(data[i:i + 1000])
+    assert a.close() == b.close()
+    assert all(len(store.get(d)) <= hd.STORE_CHUNK_MAX for d in a.chunks)
+
+
+def test_insert_only_adds_the_chunks_around_it(store):
+    data = dump()
+    save(store, "r1", {"Security.txt": data})
+    first = store.new_bytes
+    lines = data.splitlines(keepends=True)
+    changed = b"".join(lines[:100] + [b"Event[x]: inserted line\n"] + lines[100:])
+
+    store.new_bytes = 0
+    save(store, "r2", {"Security.txt": changed})
+    assert store.new_bytes < first / 10
+    old = set(store.load("r1")["files"]["Security.txt"]["chunks"])
+    new = store.load("r2")["files"]["Security.txt"]["chunks"]
+    assert len([d for d in new if d not in old]) <= 2
+
+
+def test_iter_file_and_export_zip_round_trip(store, tmp_path):
+    files = {"Security.txt": dump(), "empty.txt": b"", "SystemInfo.txt": b"Host Name: PC01\r\n"}
+    writer = save(store, "r1", files, chunk_sizes=(1, 70_000, 4096))
+    assert writer.bytes_written == sum(map(len, files.values()))
+    for entry, data in files.items():
+        assert b"".join(store.iter_file("r1", entry)) == data
+        info = store.load("r1")["files"][entry]
+        assert info["size"] == len(data)
+        assert info["sha256"] == hd.hashlib.sha256(data).hexdigest()
+
+    zip_path = store.export_zip("r1", tmp_path / "r1.zip")
+    with zipfile.ZipFile(zip_path) as zf:
+        assert zf.testzip() is None
+        assert {n: zf.read(n) for n in zf.namelist()} == files
+
+
+def test_gc_keeps_shared_chunks(store):
+    shared = dump(seed=1)
+    save(store, "r1", {"a.txt": shared, "b.txt": dump(seed=2)})
+    save(store, "r2", {"a.txt": shared})
+    before = store.stats()
+    assert before["reports"] == 2
+    assert before["stored_bytes"] < before["logical_bytes"]
+
+    store.delete("r1")
+    result = store.gc()
+    assert result["chunks_removed"] > 0
+    assert b"".join(store.iter_file("r2", "a.txt")) == shared
+    assert store.stats()["chunks"] == len(set(store.load("r2")["files"]["a.txt"]["chunks"]))
+
+    store.delete("r2")
+    store.gc()
+    assert store.stats()["chunks"] == 0
@@ -0,0 +1,72 @@
+import os
+import threading
+import zipfile
+
+import pytest
+
+import helpdesk_dashboard as hd
+
+
+def entries(count=6, size=300_000):
+    return {f"entry{i}.txt": (f"line {i}\n".encode() * size)[:size] + os.urandom(1000)
+            for i in range(count)}
+
+
+def write_concurrently(writer, data):
+    """Open every entry at once, so one streams directly and the rest are spooled."""
+    opened = threading.Barrier(len(data))
+
+    def write(name, payload):
+        with writer.open(name) as out:
+            opened.wait()
+            for i in range(0, len(payload), 65536):
+                out.write(payload[i:i + 65536])
+
+    threads = [threading.Thread(target=write, args=item) for item in data.items()]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+
+@pytest.mark.parametrize("compresslevel", [0, 1, 6])
+def test_concurrent_entries_round_trip(tmp_path, compresslevel):
+    data = entries()
+    writer = hd.ReportWriter(tmp_path / "r.zip", compresslevel)
+    write_concurrently(writer, data)
+    writer.close()
+
+    assert writer.bytes_written == sum(map(len, data.values()))
+    with zipfile.ZipFile(tmp_path / "r.zip") as zf:
+        assert zf.testzip() is None
+        assert sorted(zf.namelist()) == sorted(data)
+        for name, payload in data.items():
+            assert zf.read(name) == payload
+            expected = zipfile.ZIP_DEFLATED if compresslevel else zipfile.ZIP_STORED
+            assert zf.getinfo(name).compress_type == expected
+
+
+def test_spool_holds_compressed_bytes(tmp_path, monkeypatch):
+    monkeypatch.setattr(hd, "SPOOL_MAX_MEMORY", 1024)
+    data = entries(count=3, size=2_000_000)
+    writer = hd.ReportWriter(tmp_path / "r.zip")
+    write_concurrently(writer, data)
+    writer.close()
+
+    raw = sum(map(len, data.values()))
+    assert 0 < writer.spilled_bytes < raw / 10
+    assert writer.peak_spill_bytes <= writer.spilled_bytes
+    with zipfile.ZipFile(tmp_path / "r.zip") as zf:
+        assert zf.testzip() is None
+
+
+def test_failed_entry_is_left_out(tmp_path):
+    writer = hd.ReportWriter(tmp_path / "r.zip")
+    with writer.open("ok.txt") as out, pytest.raises(RuntimeError):
+        out.write(b"kept")
+        with writer.open("broken.txt") as other:  # spooled: ok.txt holds the ZIP
+            other.write(b"partial")
+            raise RuntimeError("step failed")
+    writer.close()
+    with zipfile.ZipFile(tmp_path / "r.zip") as zf:
+        assert zf.namelist() == ["ok.txt"] and zf.read("ok.txt") == b"kept"
@@ -0,0 +1,92 @@
+import pytest
+
+import helpdesk_dashboard as hd
+
+
+class FakeClock:
+    """Stands in for the time module and the ticker's wake event."""
+
+    def __init__(self, oversleep=0.0):
+        self.now = 0.0
+        self.oversleep = oversleep
+
+    def monotonic(self):
+        return self.now
+
+    def thread_time(self):
+        return self.now
+
+    # threading.Event interface used by _Ticker
+    def wait(self, timeout):
+        self.now += timeout + self.oversleep
+        return False
+
+    def set(self):
+        pass
+
+    def clear(self):
+        pass
+
+
+def run_ticker(monkeypatch, costs, interval=1.0, oversleep=0.0):
+    """Run a ticker whose n-th tick takes costs[n] seconds; return tick start times."""
+    clock = FakeClock(oversleep)
+    monkeypatch.setattr(hd, "time", clock)
+    ticker = hd._Ticker(interval)
+    ticker._wake = clock
+    stop = hd.threading.Event()
+    starts, lates = [], []
+
+    def tick():
+        starts.append(clock.now)
+        lates.append(ticker.late_s)
+        clock.now += costs[len(starts) - 1]
+        if len(starts) == len(costs):
+            stop.set()
+
+    ticker.run(stop, tick)
+    return starts, lates, ticker
+
+
+def test_tick_cost_does_not_drift(monkeypatch):
+    starts, lates, ticker = run_ticker(monkeypatch, [0.3] * 5)
+    assert starts == [0.0, 1.0, 2.0, 3.0, 4.0]
+    assert lates == [0.0] * 5
+    assert ticker.wall_s == pytest.approx(0.3)
+
+
+def test_late_wakeups_do_not_accumulate(monkeypatch):
+    starts, lates, _ = run_ticker(monkeypatch, [0.25] * 5, oversleep=0.05)
+    assert starts == pytest.approx([0.0, 1.05, 2.05, 3.05, 4.05])
+    assert lates[1:] == pytest.approx([0.05] * 4)
+
+
+def test_stall_skips_missed_ticks_instead_of_bursting(monkeypatch):
+    # The second tick stalls for 3.5 s (1.0 -> 4.5): the ticks due at 2, 3
+    # and 4 are dropped and the schedule resumes on the grid at 5.
+    starts, lates, _ = run_ticker(monkeypatch, [0.1, 3.5, 0.1, 0.1])
+    assert starts == pytest.approx([0.0, 1.0, 5.0, 6.0])
+    assert lates == pytest.approx([0.0] * 4)
+
+
+def test_tick_exactly_one_interval_long_runs_back_to_back(monkeypatch):
+    starts, _, _ = run_ticker(monkeypatch, [1.0, 1.0, 1.0])
+    assert starts == [0.0, 1.0, 2.0]
+
+
+def test_tick_errors_do_not_stop_the_loop(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(hd, "time", clock)
+    ticker = hd._Ticker(1.0)
+    ticker._wake = clock
+    stop = hd.threading.Event()
+    calls = []
+
+    def tick():
+        calls.append(clock.now)
+        if len(calls) == 3:
+            stop.set()
+        raise RuntimeError("sensor gone")
+
+    ticker.run(stop, tick)
+    assert calls == [0.0, 1.0, 2.0]